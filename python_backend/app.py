@@ -1,28 +1,183 @@
 # python_backend/app.py
 import os
-from flask import Flask, request, send_file, jsonify
+from flask import Flask, request, send_file, jsonify, url_for
 import matplotlib
 from matplotlib.patches import Rectangle
-from matplotlib.collections import PatchCollection
+from matplotlib.collections import PolyCollection
 matplotlib.use('Agg') 
-import matplotlib.pyplot as plt
 import io
+import functools
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from matplotlib.figure import Figure
 from flask_cors import CORS
-import random
-import base64
+import numpy as np
+from design import Placement
+from bookshelf import read_buffer, parse_design
+from hpwl import NetRanking, net_hpwl, total_hpwl, single_net_hpwl, subset_hpwl
+from legality import check_legality
+from rowindex import RowCapacity
+from snapshot import SnapshotCache, content_key
+from store import DesignStore
+from renders import RenderCache, render_key
+from jobs import JobQueue
+from legalize import Segments, abacus_legalize, displacement_stats, free_segments
+from placer import global_place
+from randomplace import MODES as RANDOM_MODES, new_seed, random_coordinates, random_placed
+from montecarlo import random_baseline
+from versions import placement_diff
+from report import placement_report
+import raster
+import tempfile
 
 
 
 app = Flask(__name__)
 CORS(app)
 
-# Global variables for parsed data
-nodes = {}
-placements = {}
-rows = []
-nets = []
-nets_file_path = None
-last_legality_report = None
+# Parsed designs by design id. DESIGN_STORE_SHARED_DIR (e.g. /dev/shm/bookshelf-designs)
+# lets several worker processes map the same designs instead of each parsing its own.
+# PLACEMENT_VERSIONS caps the saved placement versions kept per design
+designs = DesignStore(
+    int(os.environ.get("DESIGN_STORE_MB", 4096)) * (1 << 20),
+    os.environ.get("DESIGN_STORE_SHARED_DIR"),
+    max_versions=int(os.environ.get("PLACEMENT_VERSIONS", 1024)),
+)
+
+# Parsed designs cached on disk by upload content, so repeat uploads skip parsing
+snapshots = SnapshotCache(
+    os.environ.get("SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "bookshelf-snapshots")),
+    int(os.environ.get("SNAPSHOT_CACHE_MB", 2048)) * (1 << 20),
+)
+
+# Rendered images served by reference from /render/<key>.png. RENDER_CACHE_DIR
+# keeps them on disk as well so any worker process can serve them
+renders = RenderCache(
+    int(os.environ.get("RENDER_CACHE_MB", 256)) * (1 << 20),
+    os.environ.get("RENDER_CACHE_DIR"),
+)
+
+def request_design():
+    # The design named by ?design_id=, the X-Design-Id header or a "design_id"
+    # JSON field (the latest upload if none)
+    design_id = request.args.get('design_id') or request.headers.get('X-Design-Id')
+    if design_id is None and request.is_json:
+        design_id = (request.get_json(silent=True) or {}).get('design_id')
+    return design_id, designs.get(design_id)
+
+
+def with_design(view):
+    # Runs the view on the request's design, holding that design's lock
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        design_id, design = request_design()
+        if design is None:
+            return jsonify({"error": f"Design {design_id} not found"}), 404
+        with design.lock:
+            design.sync()
+            return view(design, *args, **kwargs)
+    return wrapper
+
+
+def requested_placement(design):
+    # (placements, error response) for ?version=<id>, a saved version (read-only),
+    # or else ?placement= (placement, the .pl one by default, random or global).
+    # Either may also come in the JSON body
+    version_id = requested_option('version', None, str)
+    if version_id is not None:
+        if not version_id.isdigit() or int(version_id) not in design.history:
+            return None, (jsonify({"error": f"Version {version_id} not found"}), 404)
+        return design.history.placement(int(version_id)), None
+    name = requested_option('placement', 'placement')
+    placements = design.placement_named(name)
+    if placements is None:
+        return None, (jsonify({"error": f"Unknown placement {name}"}), 400)
+    return placements, None
+
+
+def with_placement(view):
+    # Runs the view on the requested placement or version, holding the design's lock
+    @functools.wraps(view)
+    @with_design
+    def wrapper(design, *args, **kwargs):
+        placements, error = requested_placement(design)
+        if error is not None:
+            return error
+        return view(design, placements, *args, **kwargs)
+    return wrapper
+
+
+def with_design_unlocked(view):
+    # For views that hand the design to a job, which takes the lock itself
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        design_id, design = request_design()
+        if design is None:
+            return jsonify({"error": f"Design {design_id} not found"}), 404
+        return view(design, *args, **kwargs)
+    return wrapper
+
+
+# Parses the files of one upload concurrently
+parse_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("PARSE_WORKERS", 4)))
+
+# Uploads, global placement, legalization, detailed placement and random baselines run here, at most JOB_WORKERS at a time
+jobs = JobQueue(int(os.environ.get("JOB_WORKERS", 2)))
+
+
+def wants_async():
+    # ?async=1, or "async": true in the JSON body (or form field for uploads)
+    flag = request.args.get('async') or request.form.get('async')
+    if flag is None and request.is_json:
+        flag = (request.get_json(silent=True) or {}).get('async')
+    return str(flag).lower() in ('1', 'true', 'yes')
+
+
+def requested_option(name, default=None, type=str):
+    # ?name= or "name" in the JSON body
+    value = request.args.get(name)
+    if value is None and request.is_json:
+        value = (request.get_json(silent=True) or {}).get(name)
+    return default if value is None else type(value)
+
+
+def job_result(result):
+    # Image keys become /render URLs here, where there is a request to build them from
+    result = dict(result)
+    if 'image_key' in result:
+        result['image_url'] = url_for('rendered_image', key=result.pop('image_key'), _external=True)
+    return result
+
+
+def job_response(job):
+    # 202 with the job while it runs in the background, otherwise wait for its result
+    if wants_async():
+        response = jsonify(job.to_dict())
+        response.status_code = 202
+        response.headers['Location'] = url_for('job_status', job_id=job.id)
+        return response
+    job.wait()
+    if job.status == 'failed':
+        return jsonify({"error": job.error}), 500
+    return jsonify(job_result(job.result))
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job {job_id} not found"}), 404
+    data = job.to_dict()
+    if job.status == 'done':
+        data['result'] = job_result(job.result)
+    return jsonify(data)
+
+
+@app.route('/job_stats', methods=['GET'])
+def job_stats():
+    return jsonify(jobs.stats())
+
 
 @app.route('/', methods=['GET'])
 def home():
@@ -30,23 +185,12 @@ def home():
 
 @app.route('/process', methods=['POST'])
 def process_files():
-    global nodes, placements, rows, nets, nets_file_path
     try:
         if 'files' not in request.files:
             return jsonify({"message": "No files uploaded (missing 'files' field)"}), 400
          
         files = request.files.getlist('files')
-        nodes = {}
-        placements = {}
-        rows = []
-        nets = None
-
-        required_found = {
-            "nodes": False,
-            "pl": False,
-            "scl": False,
-            "nets": False
-        }
+        uploads = {}
 
         for file in files:
             filename = file.filename
@@ -54,30 +198,42 @@ def process_files():
             if filename.startswith("._"):
                 continue
 
-            if filename.endswith('.nodes'):
-                nodes = parse_nodes(file)
-                required_found["nodes"] = True
-            elif filename.endswith('.pl'):
-                placements = parse_placements(file)
-                required_found["pl"] = True
-            elif filename.endswith('.scl'):
-                rows = parse_scl(file)
-                required_found["scl"] = True
-            elif filename.endswith('.nets'):
-                nets = parse_nets(file)
-                required_found["nets"] = True
-
-        missing_files = [ext for ext, found in required_found.items() if not found]
+            for ext in ("nodes", "pl", "scl", "nets"):
+                if filename.endswith('.' + ext):
+                    uploads[ext] = file
+
+        missing_files = [ext for ext in ("nodes", "pl", "scl", "nets") if ext not in uploads]
         if missing_files:
             return (
                 f"Error: Missing required file(s): {', '.join('.' + ext for ext in missing_files)}",
                 400,
             )
 
-        img = visualize_layout(nodes, placements, rows)
-        print("Visualization generated successfully.")
-
-        return send_file(img, mimetype='image/png')
+        start = time.perf_counter()
+        buffers = {ext: read_buffer(file) for ext, file in uploads.items()}
+        key = content_key(buffers)
+        hash_time = time.perf_counter() - start
+        renderer = requested_renderer()
+        background = wants_async()
+        if background:
+            # The upload's buffers go away with the request
+            buffers = {ext: np.array(buf) for ext, buf in buffers.items()}
+
+        # Every upload gets a design of its own, so only the parsing is shared
+        job = jobs.submit('process', None, lambda job: load_upload(job, buffers, key, hash_time, renderer))
+        if background:
+            return job_response(job)
+        job.wait()
+        if job.status == 'failed':
+            raise job.exception
+
+        result = job.result
+        response = send_render(result['image_key'])
+        response.headers['X-Design-Id'] = result['design_id']
+        response.headers['X-Snapshot-Cache'] = result['snapshot_cache']
+        response.headers['Server-Timing'] = ", ".join(
+            f"{name};dur={ms:.1f}" for name, ms in result['timings'].items())
+        return response
 
     except KeyError as e:
         print(f"KeyError: Missing key {e}")
@@ -87,134 +243,124 @@ def process_files():
         return f"Error occurred during processing: {e}", 500
 
 
-def is_float(value):
+# Uploads being parsed, by content key: identical uploads arriving together
+# wait for the first one's result instead of parsing again
+parsing = {}
+parsing_lock = threading.Lock()
+
+
+def parse_upload(buffers, key):
+    # (nodes, placements, nets, rows, timings, snapshot hit) of an upload. The
+    # placement is the caller's own; the other parts are read-only and shared
+    with parsing_lock:
+        future = parsing.get(key)
+        first = future is None
+        if first:
+            future = parsing[key] = Future()
+    if not first:
+        nodes, placements, nets, rows, timings, cached = future.result()
+        return nodes, placements.copy(), nets, rows, timings, cached
+
     try:
-        float(value)
-        return True
-    except ValueError:
-        return False
+        start = time.perf_counter()
+        timings = {}
+        cached = snapshots.load(key)
+        if cached is not None:
+            nodes, placements, nets, rows = cached
+            timings['snapshot'] = time.perf_counter() - start
+        else:
+            nodes, placements, nets, rows, parse_timings = parse_design(buffers, parse_pool)
+            timings.update(parse_timings)
+            snapshots.store(key, nodes, placements, nets, rows)
+        parsed = nodes, placements, nets, rows, timings, cached is not None
+        # Waiters copy the placement before this request can move its cells
+        future.set_result((nodes, placements.copy(), nets, rows, timings, cached is not None))
+        return parsed
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with parsing_lock:
+            del parsing[key]
+
+
+def load_upload(job, buffers, key, hash_time, renderer):
+    # Snapshot or parse, register the design and render it; runs as a job
+    start = time.perf_counter()
+    nodes, placements, nets, rows, parse_timings, cached = parse_upload(buffers, key)
+    job.report(0.1)
+    timings = {'hash': hash_time, **parse_timings}
+    timings['total'] = time.perf_counter() - start + hash_time
+    print("Parse timings: " + ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in timings.items()))
+    job.report(0.7)
+
+    design = designs.add(nodes, placements, nets, rows)
+    with design.lock:
+        image_key = cached_render(design, design.placements, 'placement', design.version(design.placements), renderer)
+    print("Visualization generated successfully.")
+    return {
+        "design_id": design.id,
+        "image_key": image_key,
+        "snapshot_cache": 'hit' if cached else 'miss',
+        "timings": {name: round(seconds * 1000, 1) for name, seconds in timings.items()},
+    }
 
 
-def parse_nodes(file):
-    nodes = {}
+def requested_renderer():
+    # ?renderer=matplotlib|raster|auto (or "renderer" in the JSON body), read while
+    # there is a request so jobs can be handed the choice
+    renderer = request.args.get('renderer')
+    if renderer is None and request.is_json:
+        renderer = (request.get_json(silent=True) or {}).get('renderer')
+    return renderer or os.environ.get("RENDERER", "auto")
 
-    for line in file:
-        line = line.decode('utf-8').strip()
-        parts = line.split()
 
-        if len(parts) < 3:
-            continue
+def layout_renderer(placements, renderer=None):
+    # "auto" uses the NumPy rasterizer once a design has more than RASTER_AUTO_CELLS cells
+    renderer = renderer or requested_renderer()
+    if renderer == 'auto':
+        renderer = 'raster' if len(placements) > int(os.environ.get("RASTER_AUTO_CELLS", 20000)) else 'matplotlib'
+    return renderer
 
-        try:
-            node_id = parts[0].strip().lower()  
-            width = float(parts[1])
-            height = float(parts[2])
-            is_terminal = len(parts) == 4 and parts[3].lower() == 'terminal'
-            nodes[node_id] = {'width': width, 'height': height, 'is_terminal': is_terminal}
-        except ValueError:
-            print(f"Skipping comments: {line}")
-            continue
 
-    return nodes
+def render_layout(design, placements, renderer=None):
+    if layout_renderer(placements, renderer) == 'raster':
+        return io.BytesIO(raster.render_layout(design.nodes, placements, design.row_index))
+    return visualize_layout(design.nodes, placements, design.rows)
 
 
-def parse_placements(file):
-    placements = {}
-    for line in file:
-        line = line.decode('utf-8').strip()
-        parts = line.split()
+def cached_render(design, placements, label, version, renderer=None):
+    # Render key of `placements`, drawn only if (label, version, renderer) is new.
+    # label/version name the state: a stored placement and its edit count, or
+    # a derived one such as the legalized .pl placement
+    renderer = layout_renderer(placements, renderer)
+    key = render_key(design.id, label, version, renderer)
+    return renders.render(key, lambda: render_layout(design, placements, renderer).getvalue())
 
-        if len(parts) >= 3 and is_float(parts[1]) and is_float(parts[2]):
-            node_id = parts[0]
-            x = float(parts[1])
-            y = float(parts[2])
-            placements[node_id] = {'x': x, 'y': y}
-    return placements
 
+def render_url(design, placements, label, version):
+    return url_for('rendered_image', key=cached_render(design, placements, label, version), _external=True)
 
-def parse_scl(file):
-    rows = []
-    in_row = False
-    row = {}
 
-    for line in file:
-        line = line.decode('utf-8').strip()
-        line = ' '.join(line.split())  
-        line = line.replace("NumSites", "Numsites")  
+def send_render(key):
+    # Keys name immutable images, so clients may cache them for good
+    png = renders.get(key)
+    if png is None:
+        return jsonify({"error": f"Render {key} not found"}), 404
+    response = send_file(io.BytesIO(png), mimetype='image/png', etag=key, max_age=365 * 24 * 3600)
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
 
-        if 'CoreRow Horizontal' in line:
-            in_row = True
-            row = {}
-            continue
-        elif 'End' in line and in_row:
-            if 'coordinate' in row and 'height' in row and 'sitewidth' in row and 'subrow_origin' in row and 'numsites' in row:
-                rows.append(row)
-            else:
-                print("Warning: Incomplete row skipped ->", row)
-            in_row = False
-            continue
 
-        if in_row:
-            if 'Coordinate :' in line:
-                try:
-                    row['coordinate'] = float(line.split(':')[1].strip())
-                except ValueError:
-                    print("Warning: Invalid coordinate in line:", line)
-            elif 'Height :' in line:
-                try:
-                    row['height'] = float(line.split(':')[1].strip())
-                except ValueError:
-                    print("Warning: Invalid height in line:", line)
-            elif 'Sitewidth :' in line:
-                try:
-                    row['sitewidth'] = float(line.split(':')[1].strip())
-                except ValueError:
-                    print("Warning: Invalid sitewidth in line:", line)
-            elif 'Sitespacing :' in line:
-                try:
-                    row['sitespacing'] = float(line.split(':')[1].strip())
-                except ValueError:
-                    print("Warning: Invalid sitespacing in line:", line)
-            elif 'SubrowOrigin :' in line and 'Numsites :' in line:
-                try:
-                    parts = line.split('SubrowOrigin :')[1].split('Numsites :')
-                    row['subrow_origin'] = float(parts[0].strip())
-                    row['numsites'] = float(parts[1].strip())
-                except (ValueError, IndexError):
-                    print("Warning: Could not parse SubrowOrigin or Numsites from line:", line)
-
-    return rows
-
-def parse_nets(file):
-    nets = []
-    current_net = None
-    net_counter = 0
-
-    for line in file:
-        line = line.decode('utf-8').strip()
-        parts = line.split()
-
-        if "NetDegree" in line:
-            if current_net:
-                nets.append(current_net)
-            net_id = f"n{net_counter}" 
-            net_counter += 1
-            current_net = {"net_id": net_id, "nodes": []}
-        elif parts:
-            node_id = parts[0].strip().lower() 
-            if current_net:
-                current_net["nodes"].append(node_id)
-
-    if current_net:
-        nets.append(current_net)
-
-    return nets
+@app.route('/render/<key>.png', methods=['GET'])
+def rendered_image(key):
+    return send_render(key)
 
 
 def visualize_layout(nodes, placements, rows):
-    plt.figure(figsize=(10, 10))
-    ax = plt.gca()
-    x_mins, x_maxs, y_mins, y_maxs = [], [], [], []
+    # Figure objects rather than pyplot state, so designs can be drawn from several threads
+    fig = Figure(figsize=(10, 10))
+    ax = fig.add_subplot()
 
     for row in rows:
         if all(k in row for k in ('subrow_origin', 'coordinate', 'height', 'numsites', 'sitewidth')):
@@ -224,76 +370,89 @@ def visualize_layout(nodes, placements, rows):
             width = row['numsites'] * row['sitewidth']
             ax.add_patch(Rectangle((subrow_origin, y), width, height, edgecolor='grey', facecolor='lightgrey', alpha=0.3))
 
-    regular_patches = []
-    terminal_patches = []
     min_terminal_size = 1.0
 
-    for node_id, placement in placements.items():
-        if node_id not in nodes:
-            continue
-        x, y = placement.get('x'), placement.get('y')
-        if x is None or y is None:
-            continue
+    ids = placements.placed_ids
+    x = placements.x[ids]
+    y = placements.y[ids]
+    width = np.abs(nodes.width[ids])
+    height = np.abs(nodes.height[ids])
+    is_terminal = nodes.is_terminal[ids]
+
+    width = np.where(is_terminal, np.maximum(width, min_terminal_size), width)
+    height = np.where(is_terminal, np.maximum(height, min_terminal_size), height)
+
+    # One (4, 2) corner polygon per cell, built for all cells at once
+    verts = np.stack([
+        np.column_stack([x, y]),
+        np.column_stack([x + width, y]),
+        np.column_stack([x + width, y + height]),
+        np.column_stack([x, y + height])
+    ], axis=1)
+
+    ax.add_collection(PolyCollection(verts[~is_terminal], facecolor='skyblue', edgecolor='blue', alpha=0.7))
+    ax.add_collection(PolyCollection(verts[is_terminal], facecolor='red', edgecolor='red', alpha=0.8))
+
+    if len(ids):
+        ax.set_xlim(x.min() - 10, (x + width).max() + 10)
+        ax.set_ylim(y.min() - 10, (y + height).max() + 10)
+    ax.set_aspect('equal', 'box')
+    ax.set_xlabel('X Position')
+    ax.set_ylabel('Y Position')
+    ax.set_title('Bookshelf Layout Visualization')
 
-        node = nodes[node_id]
-        width = abs(node.get('width', 1))
-        height = abs(node.get('height', 1))
-        is_terminal = node.get("is_terminal", False)
+    img = io.BytesIO()
+    fig.savefig(img, format='png', dpi=300)
+    img.seek(0)
+    return img
 
-        if is_terminal:
-            width = max(width, min_terminal_size)
-            height = max(height, min_terminal_size)
-            terminal_patches.append(Rectangle((x, y), width, height))
-        else:
-            regular_patches.append(Rectangle((x, y), width, height))
 
-        x_mins.append(x)
-        x_maxs.append(x + width)
-        y_mins.append(y)
-        y_maxs.append(y + height)
+def calculate_total_wire_length(nets, placements):
+    return total_hpwl(nets, placements)
 
-    ax.add_collection(PatchCollection(regular_patches, facecolor='skyblue', edgecolor='blue', alpha=0.7))
-    ax.add_collection(PatchCollection(terminal_patches, facecolor='red', edgecolor='red', alpha=0.8))
 
-    if x_mins and x_maxs and y_mins and y_maxs:
-        plt.xlim(min(x_mins) - 10, max(x_maxs) + 10)
-        plt.ylim(min(y_mins) - 10, max(y_maxs) + 10)
 
-    ax.set_aspect('equal', 'box')
-    plt.xlabel('X Position')
-    plt.ylabel('Y Position')
-    plt.title('Bookshelf Layout Visualization')
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    return jsonify(snapshots.stats())
 
-    img = io.BytesIO()
-    plt.savefig(img, format='png', dpi=300)
-    plt.close()
-    img.seek(0)
-    return img
 
+@app.route('/render_stats', methods=['GET'])
+def render_stats():
+    return jsonify(renders.stats())
 
-def calculate_total_wire_length(nets, placements):
-    total_length = 0
 
-    for net in nets:
-        valid_nodes = [node for node in net["nodes"] if node in placements]
-        if len(valid_nodes) < 2:
-            continue  
+@app.route('/design_stats', methods=['GET'])
+def design_stats():
+    return jsonify(designs.stats())
 
-        min_x = min(placements[node]['x'] for node in valid_nodes)
-        max_x = max(placements[node]['x'] for node in valid_nodes)
-        min_y = min(placements[node]['y'] for node in valid_nodes)
-        max_y = max(placements[node]['y'] for node in valid_nodes)
 
-        wire_length = (max_x - min_x) + (max_y - min_y)
-        total_length += wire_length
+@app.route('/tiles/info', methods=['GET'])
+@with_design
+def tile_info(design):
+    layer = design.tile_layer(request.args.get('placement', 'placement'))
+    if layer is None:
+        return jsonify({"error": "Unknown placement"}), 400
+    return jsonify({**layer.info(), **layer.stats()})
 
-    return total_length
 
+@app.route('/tiles/<int:z>/<int:x>/<int:y>.png', methods=['GET'])
+@with_design
+def layout_tile(design, z, x, y):
+    # ?placement=random serves the random placement instead of the .pl one
+    layer = design.tile_layer(request.args.get('placement', 'placement'))
+    if layer is None:
+        return jsonify({"error": "Unknown placement"}), 400
+    png = layer.tile(z, x, y)
+    if png is None:
+        return jsonify({"error": f"Tile {z}/{x}/{y} is outside the layout"}), 404
+    return send_file(io.BytesIO(png), mimetype='image/png')
 
 
 @app.route('/calculate_wire_length', methods=['GET'])
-def calculate_wire_length():
-    global nets, placements
+@with_placement
+def calculate_wire_length(design, placements):
+    nets = design.nets
 
     if not nets:
         print("Error: nets data is empty or not parsed.")
@@ -303,7 +462,7 @@ def calculate_wire_length():
         return jsonify({"error": "No .pl file parsed"}), 400
     
     try:
-        total_length = calculate_total_wire_length(nets, placements)
+        total_length = design.total_length(placements)
         print(f"Total wire length: {total_length}")
         return jsonify({"total_length": total_length})
     except Exception as e:
@@ -313,235 +472,358 @@ def calculate_wire_length():
 
 
 @app.route('/calculate_net_length/<net_id>', methods=['GET'])
-def calculate_net_length_hpwl(net_id):
-    global nets, placements
+@with_placement
+def calculate_net_length_hpwl(design, placements, net_id):
+    nets = design.nets
 
-    net = next((n for n in nets if n['net_id'] == net_id), None)
-    if not net:
+    net_index = nets.index_of(net_id)
+    if net_index is None:
         return jsonify({"error": f"Net {net_id} not found"}), 404
 
-    valid_nodes = [node for node in net['nodes'] if node in placements]
-    if len(valid_nodes) < 2:
+    wire_length, valid_count = single_net_hpwl(nets, placements, net_index)
+    if valid_count < 2:
         return jsonify({"error": f"Not enough valid nodes in net {net_id} to calculate wire length"}), 400
 
-    min_x = min(placements[node]['x'] for node in valid_nodes)
-    max_x = max(placements[node]['x'] for node in valid_nodes)
-    min_y = min(placements[node]['y'] for node in valid_nodes)
-    max_y = max(placements[node]['y'] for node in valid_nodes)
+    return jsonify({"wire_length": wire_length})
 
-    wire_length = (max_x - min_x) + (max_y - min_y)
 
-    return jsonify({"wire_length": wire_length})
+# Most ids a bulk query may list
+MAX_BULK_IDS = int(os.environ.get("MAX_BULK_IDS", 1000000))
 
 
-@app.route('/get_node_coordinates/<node_id>', methods=['GET'])
-def get_node_coordinates(node_id):
-    global placements
+def requested_ids(field):
+    # The list of ids in the JSON body's `field`, or an error response
+    ids = (request.get_json(silent=True) or {}).get(field)
+    if not isinstance(ids, list) or not all(isinstance(i, (str, int)) for i in ids):
+        return None, (jsonify({"error": f"{field} must be a list of ids"}), 400)
+    if len(ids) > MAX_BULK_IDS:
+        return None, (jsonify({"error": f"At most {MAX_BULK_IDS} ids per request"}), 400)
+    return ids, None
+
+
+@app.route('/calculate_net_lengths', methods=['POST'])
+@with_placement
+def calculate_net_lengths(design, placements):
+    # HPWL of every net in "net_ids" (ordinal n{k} ids or .nets names), in
+    # request order; wire_length is null for nets with fewer than two placed pins
+    nets = design.nets
+    net_ids, error = requested_ids('net_ids')
+    if error is not None:
+        return error
+
+    net_indices = nets.lookup(net_ids)
+    found = net_indices >= 0
+    hpwl, counts = subset_hpwl(nets, placements, net_indices[found], with_counts=True)
+    return jsonify({
+        "nets": [
+            {
+                "net_id": nets.net_ids[k],
+                "net_name": nets.net_names[k],
+                "wire_length": float(length) if count >= 2 else None,
+                "placed_pins": int(count)
+            }
+            for k, length, count in zip(net_indices[found].tolist(), hpwl, counts)
+        ],
+        "missing": [net_ids[i] for i in np.flatnonzero(~found)]
+    })
+
 
+@app.route('/get_nodes_coordinates', methods=['POST'])
+@with_placement
+def get_nodes_coordinates(design, placements):
+    # Coordinates of every node in "node_ids", in request order; unknown or
+    # unplaced nodes are listed under "missing"
+    nodes = design.nodes
+    node_ids, error = requested_ids('node_ids')
+    if error is not None:
+        return error
+
+    names = [str(i) for i in node_ids]
+    ids = nodes.lookup(names)
+    found = ids >= 0
+    found[found] = placements.placed[ids[found]]
+    return jsonify({
+        "nodes": [
+            {"node_id": names[i], "x": x, "y": y}
+            for i, x, y in zip(np.flatnonzero(found).tolist(),
+                               placements.x[ids[found]].tolist(), placements.y[ids[found]].tolist())
+        ],
+        "missing": [names[i] for i in np.flatnonzero(~found)]
+    })
+
+
+@app.route('/get_node_coordinates/<node_id>', methods=['GET'])
+@with_placement
+def get_node_coordinates(design, placements, node_id):
     if node_id not in placements:
         print(f"Node {node_id} not found in placements.")
         return jsonify({"error": f"Node {node_id} not found"}), 404
 
-    coordinates = placements[node_id]
+    coordinates = placements.get(node_id)
     return jsonify({"coordinates": coordinates})
 
 
 @app.route('/node_size_statistics', methods=['GET'])
-def node_size_statistics():
-    global nodes
-
-    node_sizes = [
-        {"node_id": node_id, "area": node["width"] * node["height"]}
-        for node_id, node in nodes.items()
+@with_design
+def node_size_statistics(design):
+    nodes = design.nodes
+
+    areas = nodes.width * nodes.height
+    order = np.argsort(-areas, kind='stable')
+    sorted_node_sizes = [
+        {"node_id": nodes.names[i], "area": float(areas[i])}
+        for i in order
     ]
-    sorted_node_sizes = sorted(node_sizes, key=lambda x: x["area"], reverse=True)
 
     return jsonify(sorted_node_sizes)
 
 
 
-@app.route('/sorted_nets', methods=['GET'])
-def sorted_nets_by_wirelength():
-    global nets, placements
+@app.route('/report', methods=['GET'])
+@with_placement
+def placement_report_view(design, placements):
+    # Total HPWL, largest/smallest net, an HPWL histogram of ?bins= bins
+    # (default 20), node area statistics, bin density overflow over
+    # ?target_density= (default 1) and legality counts, in one response that is
+    # kept until the placement changes
+    try:
+        bins = request.args.get('bins', 20, type=int)
+        target_density = float(request.args.get('target_density', 1.0))
+    except ValueError:
+        return jsonify({"error": "target_density must be a number"}), 400
+    if not 1 <= bins <= 1000 or not 0 < target_density <= 1:
+        return jsonify({"error": "bins must be in [1, 1000] and target_density in (0, 1]"}), 400
 
-    if not nets or not placements:
-        return jsonify({"error": "No nets or placements available"}), 400
+    report = design.memo(('report', bins, target_density), placements, lambda: placement_report(
+        design.nodes, design.nets, design.row_index, placements, design.net_lengths(placements),
+        bins, target_density))
+    return jsonify(report)
 
-    def calculate_net_hpwl(net):
-        valid_nodes = [node for node in net['nodes'] if node in placements]
-        if len(valid_nodes) < 2:
-            return 0 
 
-        min_x = min(placements[node]['x'] for node in valid_nodes)
-        max_x = max(placements[node]['x'] for node in valid_nodes)
-        min_y = min(placements[node]['y'] for node in valid_nodes)
-        max_y = max(placements[node]['y'] for node in valid_nodes)
+@app.route('/sorted_nets', methods=['GET'])
+@with_placement
+def sorted_nets_by_wirelength(design, placements):
+    # Every net by default, with its nodes; ?limit=, ?offset=, ?min_hpwl= and
+    # ?pins=false page through the ranking instead (X-Total-Count has its length)
+    nets = design.nets
 
-        return (max_x - min_x) + (max_y - min_y)
+    if not nets or not placements:
+        return jsonify({"error": "No nets or placements available"}), 400
 
-    sorted_nets = sorted(
-        [
-            {
-                "net_id": net["net_id"],
-                "hpwl": calculate_net_hpwl(net),
-                "nodes": net["nodes"]
-            }
-            for net in nets
-        ],
-        key=lambda n: n["hpwl"],
-        reverse=True
-    )
+    return ranked_nets_response(design, placements)
 
-    return jsonify(sorted_nets)
 
+@app.route('/net_ranking', methods=['GET'])
+@with_placement
+def net_ranking(design, placements):
+    # Page of the nets by decreasing HPWL: ?limit= (default 100), ?offset=,
+    # ?min_hpwl= and ?pins=true to list each net's nodes
+    if not design.nets or not placements:
+        return jsonify({"error": "No nets or placements available"}), 400
+    try:
+        page = ranking_page(design, placements, default_limit=100, default_pins=False)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    total, offset, limit, nets = page
+    return jsonify({"total": total, "offset": offset, "limit": limit, "nets": nets})
 
 
-random_placements = {}
 
 @app.route('/random_placement', methods=['POST'])
-def random_placement():
-    global nodes, rows, random_placements
-    random_placements = {}  
-
-    max_width = max(row['subrow_origin'] + row['numsites'] * row['sitewidth'] for row in rows)
-    max_height = max(row['coordinate'] + row['height'] for row in rows)
+@with_design
+def random_placement(design):
+    # ?seed= and ?mode=free|rows (or the same in the JSON body). free draws
+    # anywhere on the die, rows on a site of a random row. Without a seed a
+    # fresh one is drawn and returned, so the placement can be made again
+    nodes, placements, random_placements = design.nodes, design.placements, design.random_placements
+    try:
+        seed = requested_option('seed', None, int)
+    except (TypeError, ValueError):
+        return jsonify({"error": "seed must be an integer"}), 400
+    mode = requested_option('mode', 'free')
+    if mode not in RANDOM_MODES:
+        return jsonify({"error": f"Unknown mode {mode}, expected one of {', '.join(RANDOM_MODES)}"}), 400
+    if not len(design.row_index):
+        return jsonify({"error": "No .scl rows parsed"}), 400
+    if seed is None:
+        seed = new_seed()
+
+    # Terminals keep their .pl position, every movable cell is drawn at once
+    xs, ys = random_coordinates(nodes, design.row_index, placements, seed, mode=mode)
+    random_placements.assign(Placement(nodes, xs[0], ys[0], random_placed(nodes, placements)))
+
+    design.random_wirelength.refresh()
+    version_id = design.changed(random_placements, label=f'random-{mode}')
+    return jsonify({"success": True, "seed": seed, "mode": mode, "version_id": version_id})
+
+
+# Largest /random_baseline run a request may ask for
+MAX_BASELINE_SAMPLES = int(os.environ.get("MAX_BASELINE_SAMPLES", 100000))
+
+
+@app.route('/random_baseline', methods=['POST'])
+@with_design_unlocked
+def random_baseline_stats(design):
+    # HPWL and legality statistics over ?samples= random placements (default
+    # 100), drawn like /random_placement from ?seed= and ?mode=. Runs as a job
+    # on a process pool; with ?async=1 /jobs/<id> reports its progress
+    try:
+        samples = requested_option('samples', 100, int)
+        seed = requested_option('seed', None, int)
+    except (TypeError, ValueError):
+        return jsonify({"error": "samples and seed must be integers"}), 400
+    mode = requested_option('mode', 'free')
+    if mode not in RANDOM_MODES:
+        return jsonify({"error": f"Unknown mode {mode}, expected one of {', '.join(RANDOM_MODES)}"}), 400
+    if not 1 <= samples <= MAX_BASELINE_SAMPLES:
+        return jsonify({"error": f"samples must be between 1 and {MAX_BASELINE_SAMPLES}"}), 400
+    if not len(design.row_index):
+        return jsonify({"error": "No .scl rows parsed"}), 400
+    if seed is None:
+        seed = new_seed()
+
+    def run(job):
+        placements, _, _ = placement_snapshot(design)
+        start = time.perf_counter()
+        _, summary = random_baseline(design.nodes, design.nets, design.rows, placements, samples, seed, mode,
+                                     progress=job.report)
+        return {
+            "samples": samples,
+            "seed": seed,
+            "mode": mode,
+            "seconds": round(time.perf_counter() - start, 3),
+            **summary
+        }
 
-    for node_id, node in nodes.items():
-        is_terminal = node.get('is_terminal', False)
-        node_width = abs(node.get('width', 1))
-        node_height = abs(node.get('height', 1))
+    # Terminals come from the .pl placement, so its version is part of the key
+    job = jobs.submit('baseline', ('baseline', design.id, design.version(design.placements), samples, seed, mode), run)
+    return job_response(job)
 
-        if is_terminal:
-            random_placements[node_id] = placements[node_id]
-        else:
-            random_x = random.uniform(0, max_width - node_width)
-            random_y = random.uniform(0, max_height - node_height)
 
-            random_placements[node_id] = {'x': random_x, 'y': random_y}
-    return jsonify({"success": True})
 
+@app.route('/visualize_layout', methods=['GET'])
+@with_placement
+def visualize_placement(design, placements):
+    if not design.is_stored(placements):
+        # Version ids are numbered per process; the positions themselves name the image
+        return send_render(cached_render(design, placements, 'version', placements.digest()))
+    name = request.args.get('placement', 'placement')
+    return send_render(cached_render(design, placements, name, design.version(placements)))
 
 
 @app.route('/random_visualize_layout', methods=['GET'])
-def random_visualize_layout():
-    global nodes, random_placements, rows
-    img = visualize_layout(nodes, random_placements, rows) 
-    return send_file(img, mimetype='image/png')
+@with_design
+def random_visualize_layout(design):
+    random_placements = design.random_placements
+    return send_render(cached_render(design, random_placements, 'random', design.version(random_placements)))
 
 
 @app.route('/random_calculate_wire_length', methods=['GET'])
-def random_calculate_wire_length():
-    total_length = calculate_total_wire_length(nets, random_placements)
+@with_design
+def random_calculate_wire_length(design):
+    total_length = design.random_wirelength.total
     return jsonify({"total_length": total_length})
 
 
 @app.route('/random_calculate_net_length/<net_id>', methods=['GET'])
-def random_calculate_net_length(net_id):
-    global nets, random_placements
+@with_design
+def random_calculate_net_length(design, net_id):
+    nets, random_placements = design.nets, design.random_placements
 
-    net = next((n for n in nets if n['net_id'] == net_id), None)
-    if not net:
+    net_index = nets.index_of(net_id)
+    if net_index is None:
         return jsonify({"error": f"Net {net_id} not found"}), 404
 
-    valid_nodes = [node for node in net['nodes'] if node in random_placements]
-    if len(valid_nodes) < 2:
+    wire_length, valid_count = single_net_hpwl(nets, random_placements, net_index)
+    if valid_count < 2:
         return jsonify({"error": f"Not enough valid nodes in net {net_id} to calculate wire length"}), 400
-
-    min_x = min(random_placements[node]['x'] for node in valid_nodes)
-    max_x = max(random_placements[node]['x'] for node in valid_nodes)
-    min_y = min(random_placements[node]['y'] for node in valid_nodes)
-    max_y = max(random_placements[node]['y'] for node in valid_nodes)
-
-    wire_length = (max_x - min_x) + (max_y - min_y)
     return jsonify({"wire_length": wire_length})
 
 
 @app.route('/random_node_coordinates', methods=['GET'])
-def random_node_coordinates():
+@with_design
+def random_node_coordinates(design):
+    random_placements = design.random_placements
     node_id = request.args.get('node_id')
     if not node_id:
         return jsonify({"error": "Node ID is required"}), 400
 
     if node_id in random_placements:
-        coordinates = random_placements[node_id]
+        coordinates = random_placements.get(node_id)
         return jsonify({"x": coordinates['x'], "y": coordinates['y']})
     else:
         return jsonify({"error": f"Node {node_id} not found in random placements"}), 404
 
 
-def calculate_net_hpwl(net, placements):
-    
-    valid_nodes = [node for node in net['nodes'] if node in placements]
-
-    if len(valid_nodes) < 2:
-        return 0
-
-    min_x = min(placements[node]['x'] for node in valid_nodes)
-    max_x = max(placements[node]['x'] for node in valid_nodes)
-    min_y = min(placements[node]['y'] for node in valid_nodes)
-    max_y = max(placements[node]['y'] for node in valid_nodes)
+def ranking_page(design, placements, default_limit=None, default_pins=True):
+    # (total, offset, limit, nets) of the ?offset=/?limit=/?min_hpwl= page of a
+    # placement's net ranking, which is built once per placement state
+    nodes, nets = design.nodes, design.nets
+    try:
+        offset = requested_option('offset', 0, int)
+        limit = requested_option('limit', default_limit, int)
+        min_hpwl = requested_option('min_hpwl', None, float)
+    except (TypeError, ValueError):
+        raise ValueError("offset and limit must be integers, min_hpwl a number")
+    if offset < 0 or (limit is not None and limit < 0):
+        raise ValueError("offset and limit must not be negative")
+    pins = str(requested_option('pins', default_pins)).lower() in ('1', 'true', 'yes')
+
+    ranking = design.memo('ranking', placements, lambda: NetRanking(design.net_lengths(placements)))
+    total, order = ranking.page(offset, limit, min_hpwl)
+    page = []
+    for k in order.tolist():
+        entry = {"net_id": nets.net_ids[k], "hpwl": float(ranking.hpwl[k])}
+        if pins:
+            entry["nodes"] = nets.net_nodes(k, nodes)
+        page.append(entry)
+    return total, offset, limit, page
+
+
+def ranked_nets_response(design, placements):
+    # The old /sorted_nets array, optionally paged
+    try:
+        total, _, _, page = ranking_page(design, placements)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    response = jsonify(page)
+    response.headers['X-Total-Count'] = str(total)
+    return response
+
+
+def largest_smallest_nets_data(nodes, nets, placements):
+    hpwl = net_hpwl(nets, placements)
+
+    def net_data(k):
+        return {
+            "net_id": nets.net_ids[k],
+            "hpwl": float(hpwl[k]),
+            "nodes": nets.net_nodes(k, nodes)
+        }
 
-    hpwl = (max_x - min_x) + (max_y - min_y)
-    return hpwl
+    return {
+        "largest_net": net_data(int(np.argmax(hpwl))),
+        "smallest_net": net_data(int(np.argmin(hpwl)))
+    }
 
 
 @app.route('/largest_smallest_nets_hpwl', methods=['GET'])
-def largest_smallest_nets_hpwl_combined():
-    global nets, placements
+@with_placement
+def largest_smallest_nets_hpwl_combined(design, placements):
+    nodes, nets = design.nodes, design.nets
     if not nets or not placements:
         return jsonify({"error": "Nets or placements data is not available"}), 400
 
-    placements = {key.strip().lower(): value for key, value in placements.items()}
-
-    for net in nets:
-        net['nodes'] = [node.strip().lower() for node in net['nodes']]
-
-    net_hpwl_data = []
-
-    for net in nets:
-        hpwl = calculate_net_hpwl(net, placements)
-        net_hpwl_data.append({
-            "net_id": net['net_id'],
-            "hpwl": hpwl,
-            "nodes": net['nodes']
-        })
-
-    largest_net = max(net_hpwl_data, key=lambda n: n["hpwl"], default=None)
-    smallest_net = min(net_hpwl_data, key=lambda n: n["hpwl"], default=None)
-
-    return jsonify({
-        "largest_net": largest_net,
-        "smallest_net": smallest_net
-    })
+    return jsonify(largest_smallest_nets_data(nodes, nets, placements))
 
 @app.route('/random_largest_smallest_nets_hpwl', methods=['GET'])
-def random_largest_smallest_nets_hpwl():
-    global nets, random_placements
+@with_design
+def random_largest_smallest_nets_hpwl(design):
+    nodes, nets, random_placements = design.nodes, design.nets, design.random_placements
     if not nets or not random_placements:
         return jsonify({"error": "Nets or placements data is not available"}), 400
 
-    random_placements = {key.strip().lower(): value for key, value in random_placements.items()}
-
-    for net in nets:
-        net['nodes'] = [node.strip().lower() for node in net['nodes']]
-
-    net_hpwl_data = []
-
-    for net in nets:
-        hpwl = calculate_net_hpwl(net, random_placements)
-        net_hpwl_data.append({
-            "net_id": net['net_id'],
-            "hpwl": hpwl,
-            "nodes": net['nodes']
-        })
-
-    largest_net = max(net_hpwl_data, key=lambda n: n["hpwl"], default=None)
-    smallest_net = min(net_hpwl_data, key=lambda n: n["hpwl"], default=None)
-
-    return jsonify({
-        "largest_net": largest_net,
-        "smallest_net": smallest_net
-    })
+    return jsonify(largest_smallest_nets_data(nodes, nets, random_placements))
 
 
 # @app.route('/legality_check', methods=['GET'])
@@ -641,211 +923,51 @@ def random_largest_smallest_nets_hpwl():
 
 #     return jsonify(issues)
 
-@app.route('/legality_check', methods=['GET'])
-def legality_check():
-    global nodes, placements, rows
-
-    issues = {
-        "overlaps": 0,
-        "misaligned": 0,
-        "out_of_bounds": 0
-    }
-
-    # --- Overlap check ---
-    node_rects = []
-    for node_id, placement in placements.items():
-        if nodes.get(node_id, {}).get("is_terminal", False):
-            continue
-
-        width = abs(nodes[node_id].get("width", 1))
-        height = abs(nodes[node_id].get("height", 1))
-        rect = {
-            "id": node_id,
-            "x_min": placement["x"],
-            "x_max": placement["x"] + width,
-            "y_min": placement["y"],
-            "y_max": placement["y"] + height
-        }
-
-        for prev in node_rects:
-            if not (
-                rect["x_max"] <= prev["x_min"] or
-                rect["x_min"] >= prev["x_max"] or
-                rect["y_max"] <= prev["y_min"] or
-                rect["y_min"] >= prev["y_max"]
-            ):
-                issues["overlaps"] += 1
-
-        node_rects.append(rect)
-
-    # --- Misalignment check ---
-    for node_id, placement in placements.items():
-        if nodes.get(node_id, {}).get("is_terminal", False):
-            continue
-
-        width = abs(nodes[node_id].get("width", 1))
-        height = abs(nodes[node_id].get("height", 1))
-        aligned = False
-
-        for row in rows:
-            x0 = row["subrow_origin"]
-            x1 = x0 + row["numsites"] * row["sitewidth"]
-            y0 = row["coordinate"]
-            y1 = y0 + row["height"]
-
-            if (
-                x0 <= placement["x"] and (placement["x"] + width) <= x1 and
-                y0 <= placement["y"] and (placement["y"] + height) <= y1
-            ):
-                aligned = True
-                break
-
-        if not aligned:
-            issues["misaligned"] += 1
-
-    # --- Out of bounds check ---
-    max_x = max(r["subrow_origin"] + r["numsites"] * r["sitewidth"] for r in rows)
-    max_y = max(r["coordinate"] + r["height"] for r in rows)
-
-    for node_id, placement in placements.items():
-        if nodes.get(node_id, {}).get("is_terminal", False):
-            continue
-
-        width = abs(nodes[node_id].get("width", 1))
-        height = abs(nodes[node_id].get("height", 1))
-
-        if not (
-            0 <= placement["x"] <= max_x - width and
-            0 <= placement["y"] <= max_y - height
-        ):
-            issues["out_of_bounds"] += 1
+def legality_response(message, nodes, placements, row_index):
+    # ?pairs=true also lists the overlapping node pairs, capped by ?max_pairs
+    if request.args.get('pairs', 'false').lower() not in ('1', 'true', 'yes'):
+        return jsonify({
+            "message": message,
+            "summary": check_legality(nodes, placements, row_index)
+        })
 
-    # --- Return counts only ---
+    max_pairs = request.args.get('max_pairs', 1000, type=int)
+    issues, pairs = check_legality(nodes, placements, row_index, return_pairs=True)
     return jsonify({
-        "message": "Legality check completed",
-        "summary": issues
+        "message": message,
+        "summary": issues,
+        "overlap_pairs": [
+            {"node1": nodes.names[a], "node2": nodes.names[b]}
+            for a, b in pairs[:max_pairs].tolist()
+        ]
     })
-    
-
-@app.route('/random_legality_check', methods=['GET'])
-def random_legality_check():
-    global nodes, random_placements, rows
-
-    issues = {
-        "overlaps": 0,
-        "misaligned": 0,
-        "out_of_bounds": 0
-    }
-
-    node_rects = []
-
-    # Overlap check
-    for node_id, placement in random_placements.items():
-        if nodes.get(node_id, {}).get("is_terminal", False):
-            continue
-
-        width = abs(nodes[node_id].get("width", 1))
-        height = abs(nodes[node_id].get("height", 1))
-        rect = {
-            "id": node_id,
-            "x_min": placement["x"],
-            "x_max": placement["x"] + width,
-            "y_min": placement["y"],
-            "y_max": placement["y"] + height
-        }
-
-        for other in node_rects:
-            if not (
-                rect["x_max"] <= other["x_min"] or
-                rect["x_min"] >= other["x_max"] or
-                rect["y_max"] <= other["y_min"] or
-                rect["y_min"] >= other["y_max"]
-            ):
-                issues["overlaps"] += 1
-        node_rects.append(rect)
-
-    # Misalignment check
-    for node_id, placement in random_placements.items():
-        if nodes.get(node_id, {}).get("is_terminal", False):
-            continue
-
-        width = abs(nodes[node_id].get("width", 1))
-        height = abs(nodes[node_id].get("height", 1))
-        aligned = False
-
-        for row in rows:
-            x0 = row["subrow_origin"]
-            x1 = x0 + row["numsites"] * row["sitewidth"]
-            y0 = row["coordinate"]
-            y1 = y0 + row["height"]
-
-            if (
-                x0 <= placement["x"] and (placement["x"] + width) <= x1 and
-                y0 <= placement["y"] and (placement["y"] + height) <= y1
-            ):
-                aligned = True
-                break
-
-        if not aligned:
-            issues["misaligned"] += 1
 
-    # Out-of-bounds check
-    max_x = max(r["subrow_origin"] + r["numsites"] * r["sitewidth"] for r in rows)
-    max_y = max(r["coordinate"] + r["height"] for r in rows)
 
-    for node_id, placement in random_placements.items():
-        if nodes.get(node_id, {}).get("is_terminal", False):
-            continue
+@app.route('/legality_check', methods=['GET'])
+@with_placement
+def legality_check(design, placements):
+    nodes, row_index = design.nodes, design.row_index
 
-        width = abs(nodes[node_id].get("width", 1))
-        height = abs(nodes[node_id].get("height", 1))
+    return legality_response("Legality check completed", nodes, placements, row_index)
+    
 
-        if not (
-            0 <= placement["x"] <= max_x - width and
-            0 <= placement["y"] <= max_y - height
-        ):
-            issues["out_of_bounds"] += 1
+@app.route('/random_legality_check', methods=['GET'])
+@with_design
+def random_legality_check(design):
+    nodes, random_placements, row_index = design.nodes, design.random_placements, design.row_index
 
-    # Return compact summary
-    return jsonify({
-        "message": "Random legality check completed",
-        "summary": issues
-    })
+    return legality_response("Random legality check completed", nodes, random_placements, row_index)
 
 
 @app.route('/random_sorted_nets', methods=['GET'])
-def sorted_nets_by_wirelength_random():
-    global nets, random_placements
+@with_design
+def sorted_nets_by_wirelength_random(design):
+    nets, random_placements = design.nets, design.random_placements
 
     if not nets or not random_placements:
         return jsonify({"error": "No nets available"}), 400
 
-    def calculate_net_hpwl(net):
-        valid_nodes = [node for node in net['nodes'] if node in random_placements]
-        if len(valid_nodes) < 2:
-            return 0 
-
-        min_x = min(random_placements[node]['x'] for node in valid_nodes)
-        max_x = max(random_placements[node]['x'] for node in valid_nodes)
-        min_y = min(random_placements[node]['y'] for node in valid_nodes)
-        max_y = max(random_placements[node]['y'] for node in valid_nodes)
-
-        return (max_x - min_x) + (max_y - min_y)
-
-    sorted_nets = sorted(
-        [
-            {
-                "net_id": net["net_id"],
-                "hpwl": calculate_net_hpwl(net),
-                "nodes": net["nodes"]
-            }
-            for net in nets
-        ],
-        key=lambda n: n["hpwl"],
-        reverse=True
-    )
-
-    return jsonify(sorted_nets)
+    return ranked_nets_response(design, random_placements)
 
 
 # @app.route('/modify_node_coordinates', methods=['POST'])
@@ -872,9 +994,17 @@ def sorted_nets_by_wirelength_random():
 #         print(f"Error modifying node coordinates: {e}")
 #         return jsonify({"error": str(e)}), 500
 
+def affected_nets_data(nets, tracker, affected_nets):
+    return [{
+        "net_id": nets.net_ids[k],
+        "length": round(float(tracker.hpwl[k]), 2)
+    } for k in affected_nets]
+
+
 @app.route('/modify_node_coordinates', methods=['POST'])
-def modify_node_coordinates():
-    global placements, nodes, nets, rows
+@with_design
+def modify_node_coordinates(design):
+    placements, nodes, nets, wirelength = design.placements, design.nodes, design.nets, design.wirelength
 
     try:
         data = request.get_json()
@@ -885,39 +1015,25 @@ def modify_node_coordinates():
         if node_id not in placements:
             return jsonify({"error": f"Node {node_id} not found"}), 404
 
-        # Apply change
-        placements[node_id]['x'] = new_x
-        placements[node_id]['y'] = new_y
-
-        # Identify affected nets
-        affected_nets = [net for net in nets if node_id in net["nodes"]]
-
-        # Half-Perimeter Wirelength (HPWL) for a net
-        def hpwl(net):
-            coords = [(placements[n]["x"], placements[n]["y"]) for n in net["nodes"] if n in placements]
-            if not coords:
-                return 0
-            xs, ys = zip(*coords)
-            return (max(xs) - min(xs)) + (max(ys) - min(ys))
-
-        # Total wirelength after the change
-        total_wirelength = sum(hpwl(net) for net in nets)
+        # Apply change; only the nets on this node are recomputed
+        node_index = nodes.id_of(node_id)
+        design.before_move(placements, [node_index])
+        affected_nets = wirelength.move(node_index, new_x, new_y)
+        version_id = design.changed(placements, [node_index])
+        total_wirelength = wirelength.total
 
         # Affected net lengths
-        affected_info = [{
-            "net_id": net["net_id"],
-            "length": round(hpwl(net), 2)
-        } for net in affected_nets]
+        affected_info = affected_nets_data(nets, wirelength, affected_nets)
 
-        # Redraw
-        img = visualize_layout(nodes, placements, rows)
-        img_url = f"data:image/png;base64,{base64.b64encode(img.getvalue()).decode()}"
+        # Redraw, or reuse the image of this exact state
+        img_url = render_url(design, placements, 'placement', design.version(placements))
 
         return jsonify({
             "message": f"Node {node_id} updated successfully.",
             "image_url": img_url,
             "updated_total_wirelength": round(total_wirelength, 2),
-            "affected_nets": affected_info
+            "affected_nets": affected_info,
+            "version_id": version_id
         })
 
     except Exception as e:
@@ -926,8 +1042,10 @@ def modify_node_coordinates():
     
 
 @app.route('/random_modify_node_coordinates', methods=['POST'])
-def random_modify_node_coordinates():
-    global random_placements
+@with_design
+def random_modify_node_coordinates(design):
+    nodes, nets = design.nodes, design.nets
+    random_placements, random_wirelength = design.random_placements, design.random_wirelength
 
     try:
         data = request.get_json()
@@ -938,124 +1056,383 @@ def random_modify_node_coordinates():
         if node_id not in random_placements:
             return jsonify({"error": f"Node {node_id} not found in random placements"}), 404
 
-        random_placements[node_id]['x'] = new_x
-        random_placements[node_id]['y'] = new_y
+        node_index = nodes.id_of(node_id)
+        design.before_move(random_placements, [node_index])
+        affected_nets = random_wirelength.move(node_index, new_x, new_y)
+        version_id = design.changed(random_placements, [node_index])
 
-        img = visualize_layout(nodes, random_placements, rows)
-        img_url = f"data:image/png;base64,{base64.b64encode(img.getvalue()).decode()}"
+        img_url = render_url(design, random_placements, 'random', design.version(random_placements))
 
-        return jsonify({"message": f"Node {node_id} updated successfully", "image_url": img_url})
+        return jsonify({
+            "message": f"Node {node_id} updated successfully",
+            "image_url": img_url,
+            "updated_total_wirelength": round(random_wirelength.total, 2),
+            "affected_nets": affected_nets_data(nets, random_wirelength, affected_nets),
+            "version_id": version_id
+        })
     except Exception as e:
         print(f"Error modifying random node coordinates: {e}")
         return jsonify({"error": str(e)}), 500
     
 
-@app.route('/legalize_placement', methods=['POST'])
-def legalize_placement():
-    global nodes, placements, rows
+@app.route('/versions', methods=['GET'])
+@with_design
+def list_versions(design):
+    # Saved placement versions, oldest first; ?version=<id> on the query
+    # endpoints reads one of them
+    return jsonify({
+        "versions": design.history.list(),
+        "heads": dict(design.history.heads)
+    })
+
 
+def version_or_head(design, value):
+    # Version id of a ?from=/?to= value: an id, or a placement name for its head
+    if value is None:
+        return None
+    if value.isdigit():
+        return int(value) if int(value) in design.history else None
+    placements = design.placement_named(value)
+    return design.head(placements) if placements is not None else None
+
+
+@app.route('/diff', methods=['GET'])
+@with_design
+def diff_versions(design):
+    # Per-cell displacement and HPWL change from version ?from= to ?to= (ids,
+    # or placement names for their latest version). ?limit= caps the listed
+    # cells and nets, largest change first
+    nodes, nets = design.nodes, design.nets
+    from_id = version_or_head(design, request.args.get('from'))
+    to_id = version_or_head(design, request.args.get('to'))
+    if from_id is None or to_id is None:
+        return jsonify({"error": "from and to must name saved versions or placements"}), 404
+    limit = request.args.get('limit', 100, type=int)
+
+    before, after = design.history.placement(from_id), design.history.placement(to_id)
+    changed, distance, affected, hpwl_before, hpwl_after = placement_diff(nets, before, after)
+    total_before = total_hpwl(nets, before)
+    total_after = total_hpwl(nets, after)
+    moved = ~np.isnan(distance) & (distance > 0)
+
+    cells = np.argsort(-np.nan_to_num(distance, nan=-1.0), kind='stable')[:limit]
+    delta = hpwl_after - hpwl_before
+    net_order = np.argsort(-np.abs(delta), kind='stable')[:limit]
+    return jsonify({
+        "from": from_id,
+        "to": to_id,
+        "summary": {
+            "changed_cells": int(len(changed)),
+            "moved_cells": int(moved.sum()),
+            "total_displacement": float(distance[moved].sum()),
+            "max_displacement": float(distance[moved].max()) if moved.any() else 0.0,
+            "avg_displacement": float(distance[moved].mean()) if moved.any() else 0.0,
+            "hpwl_before": total_before,
+            "hpwl_after": total_after,
+            "hpwl_delta": total_after - total_before,
+            "changed_nets": int(np.count_nonzero(delta)),
+        },
+        "cells": [
+            {
+                "node_id": nodes.names[changed[k]],
+                "from": before.get(nodes.names[changed[k]]),
+                "to": after.get(nodes.names[changed[k]]),
+                "displacement": None if np.isnan(distance[k]) else float(distance[k]),
+            }
+            for k in cells
+        ],
+        "nets": [
+            {
+                "net_id": nets.net_ids[affected[k]],
+                "hpwl_before": float(hpwl_before[k]),
+                "hpwl_after": float(hpwl_after[k]),
+                "hpwl_delta": float(delta[k]),
+            }
+            for k in net_order
+        ]
+    })
+
+
+def parse_moves(moves):
+    # (names, xs, ys) of a list of {"node_id", "x", "y"} objects or [node_id, x, y] triples
+    if not isinstance(moves, list):
+        raise ValueError("moves must be a list")
+    triples = [(m.get('node_id'), m.get('x'), m.get('y')) if isinstance(m, dict) else tuple(m) for m in moves]
+    if any(len(t) != 3 for t in triples):
+        raise ValueError("every move needs a node_id, x and y")
+    names = [str(t[0]) for t in triples]
+    xs = np.array([t[1] for t in triples], dtype=np.float64)
+    ys = np.array([t[2] for t in triples], dtype=np.float64)
+    if not (np.isfinite(xs).all() and np.isfinite(ys).all()):
+        raise ValueError("x and y must be finite numbers")
+    return names, xs, ys
+
+
+@app.route('/batch_modify_node_coordinates', methods=['POST'])
+@with_design
+def batch_modify_node_coordinates(design):
+    # Applies "moves" ({"node_id", "x", "y"} objects or [node_id, x, y] triples)
+    # to the "placement" (default the .pl one) all at once or not at all. A node
+    # moved twice ends at its last position. Only the union of the nets on the
+    # moved nodes is recomputed; "render": true also draws the result once.
+    # "max_nets" caps the listed affected nets (default 1000)
+    data = request.get_json(silent=True) or {}
+    name = data.get('placement', 'placement')
+    placements = design.placement_named(name)
+    if placements is None:
+        return jsonify({"error": f"Unknown placement {name}"}), 400
     try:
-        legalized_placements, skipped = tetris_legalize(nodes, rows, placements)
-        img = visualize_layout(nodes, legalized_placements, rows)
-        img_url = f"data:image/png;base64,{base64.b64encode(img.getvalue()).decode()}"
+        names, xs, ys = parse_moves(data.get('moves'))
+        max_nets = int(data.get('max_nets', 1000))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid moves: {e}"}), 400
+    nodes, nets = design.nodes, design.nets
+    wirelength = design.wirelength_of(placements)
+
+    node_ids = nodes.lookup(names)
+    unknown = node_ids < 0
+    unknown[~unknown] = ~placements.placed[node_ids[~unknown]]
+    if unknown.any():
+        missing = [names[k] for k in np.flatnonzero(unknown)[:100]]
+        return jsonify({"error": f"{int(unknown.sum())} nodes not found", "missing": missing}), 404
+
+    # Last move of each node wins
+    _, last = np.unique(node_ids[::-1], return_index=True)
+    keep = len(node_ids) - 1 - last
+    node_ids, xs, ys = node_ids[keep], xs[keep], ys[keep]
+
+    design.before_move(placements, node_ids)
+    affected_nets = wirelength.move_many(node_ids, xs, ys)
+    version_id = design.changed(placements, node_ids, label='batch')
+
+    img_url = None
+    if str(data.get('render', False)).lower() in ('1', 'true', 'yes'):
+        img_url = render_url(design, placements, name, design.version(placements))
 
-        return jsonify({
-            "message": "Legalization completed.",
-            "image_url": img_url,
-            "skipped_nodes": skipped
-        })
-    except Exception as e:
-        print("Error during legalization:", str(e))
-        return jsonify({"error": str(e)}), 500
-    
-def tetris_legalize(nodes, rows, placements):
-    legalized = {}
-    skipped_nodes = []
-    row_x_positions = {i: row['subrow_origin'] for i, row in enumerate(rows)}
+    return jsonify({
+        "message": f"{len(node_ids)} nodes updated successfully.",
+        "moved_nodes": int(len(node_ids)),
+        "image_url": img_url,
+        "updated_total_wirelength": round(wirelength.total, 2),
+        "affected_net_count": int(len(affected_nets)),
+        "affected_nets": affected_nets_data(nets, wirelength, affected_nets[:max_nets]),
+        "version_id": version_id
+    })
 
-    for node_id, node in nodes.items():
-        if node.get("is_terminal", False):
-            legalized[node_id] = placements[node_id]
-            continue
 
-        width = abs(node.get("width", 1))
-        height = abs(node.get("height", 1))
-        placed = False
+def placement_snapshot(design, name='placement'):
+    # Copy of a placement, its edit count and the id of the version holding it,
+    # so a job can work without the lock
+    with design.lock:
+        design.sync()
+        placements = design.placement_named(name)
+        return placements.copy(), design.version(placements), design.head(placements)
 
 
-        for i, row in enumerate(rows):
-            row_y = row['coordinate']
-            row_height = row['height']
-            start_x = row_x_positions[i]
-            end_x = row['subrow_origin'] + row['numsites'] * row['sitewidth']
+def version_snapshot(design, version_id):
+    # The saved version itself: it is read-only, so jobs can share it. Its
+    # digest stands in for the edit count, as version ids are per process
+    with design.lock:
+        placements = design.history.placement(version_id)
+    return placements, placements.digest(), version_id
 
-            if height > row_height:
-                continue
 
-            if start_x + width <= end_x:
-                legalized[node_id] = {"x": start_x, "y": row_y}
-                row_x_positions[i] += width
-                placed = True
-                break
+def requested_source(design):
+    # (label, snapshot function, dedupe version, error) of the placement a job
+    # starts from: ?version=<id>, else ?placement= (the .pl one by default)
+    version_id = requested_option('version', None, str)
+    if version_id is not None:
+        if not version_id.isdigit() or int(version_id) not in design.history:
+            return None, None, None, (jsonify({"error": f"Version {version_id} not found"}), 404)
+        version_id = int(version_id)
+        return f'version-{version_id}', lambda: version_snapshot(design, version_id), ('v', version_id), None
+    name = requested_option('placement', 'placement')
+    source = design.placement_named(name)
+    if source is None:
+        return None, None, None, (jsonify({"error": f"Unknown placement {name}"}), 400)
+    return name, lambda: placement_snapshot(design, name), (name, design.version(source)), None
+
+
+def save_version(design, placements, parent, label):
+    # Keeps a job's result as a version under the one it started from
+    with design.lock:
+        return design.history.commit(placements, parent, label, owned=True)
+
 
-        if not placed:
-            print(f"FAILED to place node {node_id}")
-            skipped_nodes.append(node_id)
+# "algorithm" values of /legalize_placement
+LEGALIZERS = {
+    'tetris': lambda design, placements, progress: tetris_legalize(design.nodes, design.row_index, placements, progress),
+    'abacus': lambda design, placements, progress: abacus_legalize(design.nodes, Segments(design.row_index), placements, progress),
+    'abacus_sites': lambda design, placements, progress: abacus_legalize(
+        design.nodes, free_segments(design.row_index, design.nodes, placements), placements, progress),
+}
+
+
+@app.route('/legalize_placement', methods=['POST'])
+@with_design_unlocked
+def legalize_placement(design):
+    # ?algorithm= (or "algorithm" in the JSON body): tetris (default) packs rows from
+    # the left, abacus moves every cell as little as possible from its .pl position,
+    # abacus_sites does the same on whole sites around the fixed terminals.
+    # ?placement=global legalizes the global placer's result instead of the .pl
+    # one, ?version=<id> a saved version. The result is saved as a new version
+    renderer = requested_renderer()
+    algorithm = requested_option('algorithm', 'tetris')
+    if algorithm not in LEGALIZERS:
+        return jsonify({"error": f"Unknown algorithm {algorithm}, expected one of {', '.join(LEGALIZERS)}"}), 400
+    name, snapshot, source_version, error = requested_source(design)
+    if error is not None:
+        return error
+    label = f'legalized-{algorithm}' if name == 'placement' else f'{name}-legalized-{algorithm}'
+
+    def run(job):
+        placements, version, parent = snapshot()
+        legalized_placements, skipped = LEGALIZERS[algorithm](design, placements, lambda f: job.report(0.9 * f))
+        return {
+            "message": "Legalization completed.",
+            "algorithm": algorithm,
+            "placement": name,
+            "image_key": cached_render(design, legalized_placements, label, version, renderer),
+            "skipped_nodes": skipped,
+            "version_id": save_version(design, legalized_placements, parent, label),
+            "parent_version": parent,
+            **displacement_stats(design.nodes, design.nets, placements, legalized_placements)
+        }
+
+    job = jobs.submit('legalize', ('legalize', algorithm, design.id, source_version, renderer), run)
+    return job_response(job)
+
+def tetris_legalize(nodes, row_index, placements, progress=None):
+    legalized = Placement(nodes)
+    skipped_nodes = []
+    # Rows are tried bottom-up; the tree finds the first one with room in O(log rows)
+    row_x_positions = row_index.x0.copy()
+    capacity = RowCapacity(row_index, row_index.x1 - row_x_positions)
+
+    for node_index in range(len(nodes)):
+        if progress and node_index % 4096 == 0:
+            progress(node_index / len(nodes))
+        if nodes.is_terminal[node_index]:
+            legalized.x[node_index] = placements.x[node_index]
+            legalized.y[node_index] = placements.y[node_index]
+            legalized.placed[node_index] = placements.placed[node_index]
+            continue
+
+        width = abs(nodes.width[node_index])
+        height = abs(nodes.height[node_index])
+
+        i = capacity.first_fit(width, height)
+        if i < 0:
+            print(f"FAILED to place node {nodes.names[node_index]}")
+            skipped_nodes.append(nodes.names[node_index])
+            continue
+
+        legalized.move(node_index, row_x_positions[i], row_index.y0[i])
+        row_x_positions[i] += width
+        capacity.update(i, row_index.x1[i] - row_x_positions[i])
 
     return legalized, skipped_nodes
 
 @app.route('/detailed_placement', methods=['POST'])
-def detailed_placement():
-    global nodes, placements, rows
+@with_design_unlocked
+def detailed_placement(design):
+    renderer = requested_renderer()
+
+    def run(job):
+        placements, version, parent = placement_snapshot(design)
+        legalized, failed_nodes = detailed_legalize(design.nodes, design.row_index, placements,
+                                                    lambda f: job.report(0.9 * f))
+        return {
+            "message": f"Legalization complete. {len(failed_nodes)} nodes failed to place." if failed_nodes else "All nodes placed successfully.",
+            "image_key": cached_render(design, legalized, 'detailed', version, renderer),
+            "failed_nodes": failed_nodes,
+            "version_id": save_version(design, legalized, parent, 'detailed'),
+            "parent_version": parent
+        }
+
+    job = jobs.submit('detailed', ('detailed', design.id, design.version(design.placements), renderer), run)
+    return job_response(job)
+
 
-    legalized = {}
+def detailed_legalize(nodes, row_index, placements, progress=None):
+    legalized = Placement(nodes)
     failed_nodes = []
 
-    row_end_positions = {
-        i: row['subrow_origin'] + row['numsites'] * row['sitewidth']
-        for i, row in enumerate(rows)
-    }
+    row_end_positions = row_index.x1.copy()
+    capacity = RowCapacity(row_index, row_end_positions - row_index.x0)
 
-    movable_nodes = [
-        (node_id, placements[node_id]['x'])
-        for node_id in nodes
-        if node_id in placements and not nodes[node_id].get("is_terminal", False)
-    ]
-    movable_nodes.sort(key=lambda x: -x[1])  
+    movable = placements.placed & ~nodes.is_terminal
+    movable_ids = np.flatnonzero(movable)
+    movable_ids = movable_ids[np.argsort(-placements.x[movable_ids], kind='stable')]
 
-    for node_id, _ in movable_nodes:
-        node = nodes[node_id]
-        width = abs(node.get("width", 1))
-        height = abs(node.get("height", 1))
-        placed = False
+    for k, node_index in enumerate(movable_ids):
+        if progress and k % 4096 == 0:
+            progress(k / len(movable_ids))
+        width = abs(nodes.width[node_index])
+        height = abs(nodes.height[node_index])
 
-        for i, row in enumerate(rows):
-            row_y = row['coordinate']
-            row_height = row['height']
-            end_x = row_end_positions[i]
-            start_x = end_x - width  
+        i = capacity.first_fit(width, height)
+        if i < 0:
+            failed_nodes.append(nodes.names[node_index])
+            continue
 
-            if height <= row_height and start_x >= row['subrow_origin']:
-                legalized[node_id] = {"x": start_x, "y": row_y}
-                row_end_positions[i] -= width 
-                placed = True
-                break
+        row_end_positions[i] -= width
+        legalized.move(node_index, row_end_positions[i], row_index.y0[i])
+        capacity.update(i, row_end_positions[i] - row_index.x0[i])
 
-        if not placed:
-            failed_nodes.append(node_id)
+    fixed = placements.placed & nodes.is_terminal
+    legalized.x[fixed] = placements.x[fixed]
+    legalized.y[fixed] = placements.y[fixed]
+    legalized.placed[fixed] = True
+    return legalized, failed_nodes
 
-    for node_id, data in placements.items():
-        if nodes.get(node_id, {}).get("is_terminal", False):
-            legalized[node_id] = data
 
-    img = visualize_layout(nodes, legalized, rows)
-    img_url = f"data:image/png;base64,{base64.b64encode(img.getvalue()).decode()}"
+@app.route('/global_placement', methods=['POST'])
+@with_design_unlocked
+def global_placement(design):
+    # Places the movable cells from scratch around the fixed terminals and stores
+    # the result as the "global" placement (?placement=global on the query
+    # endpoints). Options: iterations, target_density, seed
+    renderer = requested_renderer()
+    try:
+        options = {
+            'iterations': requested_option('iterations', 30, int),
+            'target_density': requested_option('target_density', 1.0, float),
+            'seed': requested_option('seed', 0, int),
+        }
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid option: {e}"}), 400
+    if options['iterations'] < 1 or not 0 < options['target_density'] <= 1:
+        return jsonify({"error": "iterations must be at least 1 and target_density in (0, 1]"}), 400
+    if not len(design.row_index):
+        return jsonify({"error": "No .scl rows parsed"}), 400
+
+    def run(job):
+        placements, _, _ = placement_snapshot(design)
+        start = time.perf_counter()
+        placed, stats = global_place(design.nodes, design.nets, design.row_index, placements,
+                                     progress=lambda f: job.report(0.9 * f), **options)
+        elapsed = time.perf_counter() - start
+        with design.lock:
+            target = design.global_placements
+            target.assign(placed)
+            design.wirelength_of(target).refresh()
+            version_id = design.changed(target, label='global')
+            image_key = cached_render(design, target, 'global', design.version(target), renderer)
+            total_length = design.wirelength_of(target).total
+        return {
+            "message": "Global placement completed.",
+            "image_key": image_key,
+            "total_length": total_length,
+            "version_id": version_id,
+            "seconds": round(elapsed, 3),
+            **stats
+        }
 
-    return jsonify({
-        "message": f"Legalization complete. {len(failed_nodes)} nodes failed to place." if failed_nodes else "All nodes placed successfully.",
-        "image_url": img_url,
-        "failed_nodes": failed_nodes
-    })
+    job = jobs.submit('global', ('global', design.id, design.version(design.placements),
+                                 tuple(sorted(options.items())), renderer),
+                      run, reuse_finished=False)
+    return job_response(job)
 
 
 if __name__ == '__main__':
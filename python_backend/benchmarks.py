@@ -0,0 +1,496 @@
+# python_backend/benchmarks.py
+#
+# Synthetic Bookshelf designs and micro-benchmarks for the backend engines.
+#
+#   python benchmarks.py generate <dir> [--cells N]
+#   python benchmarks.py memory [--cells N]
+#   python benchmarks.py hpwl [--cells N] [--nets N]
+#   python benchmarks.py overlap [--cells N ...] [--loop-limit N]
+#   python benchmarks.py parse <dir>/<design>
+#   python benchmarks.py render [--cells N ...] [--matplotlib-limit N]
+#   python benchmarks.py tiles [--cells N] [--zoom Z ...]
+#   python benchmarks.py legalize [--cells N ...] [--tetris-limit N]
+#   python benchmarks.py place [--cells N ...]
+#   python benchmarks.py random [--cells N] [--samples K]
+#   python benchmarks.py baseline [--cells N] [--samples K] [--workers W ...]
+import argparse
+import os
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from design import NodeTable, Placement
+from netlist import Netlist
+from hpwl import total_hpwl
+from overlap import find_overlaps
+import bookshelf
+
+
+def generate_design(num_cells, num_terminals=None, seed=0):
+    # Returns column arrays for a square die with roughly 70% utilisation
+    rng = np.random.default_rng(seed)
+    if num_terminals is None:
+        num_terminals = max(num_cells // 100, 4)
+
+    row_height = 12.0
+    site_width = 1.0
+    widths = rng.integers(2, 9, size=num_cells).astype(np.float64)
+    heights = np.full(num_cells, row_height)
+    die = float(np.ceil(np.sqrt(widths.sum() * row_height / 0.7) / row_height) * row_height)
+    num_rows = int(die // row_height)
+
+    names = [f"o{i}" for i in range(num_cells)] + [f"p{i}" for i in range(num_terminals)]
+    widths = np.concatenate([widths, np.ones(num_terminals)])
+    heights = np.concatenate([heights, np.ones(num_terminals)])
+    terminals = np.concatenate([np.zeros(num_cells, dtype=bool), np.ones(num_terminals, dtype=bool)])
+
+    xs = np.concatenate([rng.uniform(0, die - widths[:num_cells]), rng.uniform(0, die, num_terminals)])
+    ys = np.concatenate([rng.integers(0, num_rows, num_cells) * row_height, rng.uniform(0, die, num_terminals)])
+
+    rows = [{
+        'coordinate': r * row_height,
+        'height': row_height,
+        'sitewidth': site_width,
+        'sitespacing': site_width,
+        'subrow_origin': 0.0,
+        'numsites': die / site_width
+    } for r in range(num_rows)]
+
+    return {
+        'names': names,
+        'width': widths,
+        'height': heights,
+        'is_terminal': terminals,
+        'x': xs,
+        'y': ys,
+        'rows': rows,
+        'die': die
+    }
+
+
+def generate_nets(num_nodes, num_nets, seed=0):
+    # Net degrees follow the usual heavy-tailed 2..~20 pin distribution.
+    # Pins are drawn near a random anchor so nets stay mostly local.
+    rng = np.random.default_rng(seed + 1)
+    degrees = np.minimum(2 + rng.geometric(0.45, size=num_nets) - 1, 40)
+    anchors = np.repeat(rng.integers(0, num_nodes, num_nets), degrees)
+    pins = (anchors + rng.integers(-500, 500, size=anchors.size)) % num_nodes
+    offsets = np.concatenate([[0], np.cumsum(degrees)])
+    return offsets, pins
+
+
+def write_bookshelf(directory, num_cells, num_nets=None, seed=0, name='synth'):
+    design = generate_design(num_cells, seed=seed)
+    names = design['names']
+    if num_nets is None:
+        num_nets = num_cells
+    offsets, pins = generate_nets(len(names), num_nets, seed=seed)
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, name)
+
+    with open(base + '.nodes', 'w') as f:
+        f.write("UCLA nodes 1.0\n\n")
+        f.write(f"NumNodes : {len(names)}\nNumTerminals : {int(design['is_terminal'].sum())}\n")
+        for node, w, h, t in zip(names, design['width'], design['height'], design['is_terminal']):
+            f.write(f"  {node} {w:g} {h:g}{' terminal' if t else ''}\n")
+
+    with open(base + '.pl', 'w') as f:
+        f.write("UCLA pl 1.0\n\n")
+        for node, x, y, t in zip(names, design['x'], design['y'], design['is_terminal']):
+            f.write(f"{node} {x:.2f} {y:.2f} : N{' /FIXED' if t else ''}\n")
+
+    with open(base + '.scl', 'w') as f:
+        f.write(f"UCLA scl 1.0\n\nNumRows : {len(design['rows'])}\n\n")
+        for row in design['rows']:
+            f.write("CoreRow Horizontal\n")
+            f.write(f"  Coordinate : {row['coordinate']:g}\n")
+            f.write(f"  Height : {row['height']:g}\n")
+            f.write(f"  Sitewidth : {row['sitewidth']:g}\n")
+            f.write(f"  Sitespacing : {row['sitespacing']:g}\n")
+            f.write("  Siteorient : 1\n  Sitesymmetry : 1\n")
+            f.write(f"  SubrowOrigin : {row['subrow_origin']:g} NumSites : {row['numsites']:g}\n")
+            f.write("End\n")
+
+    with open(base + '.nets', 'w') as f:
+        f.write(f"UCLA nets 1.0\n\nNumNets : {num_nets}\nNumPins : {len(pins)}\n\n")
+        for n in range(num_nets):
+            start, end = offsets[n], offsets[n + 1]
+            f.write(f"NetDegree : {end - start}   net{n}\n")
+            for p in pins[start:end]:
+                f.write(f"  {names[p]} I : 0.000000 0.000000\n")
+
+    return base
+
+
+def _traced(build, peak=False):
+    # Bytes still allocated after build() (or the peak while it ran) and its run time
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - t0
+    size, peak_size = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak_size if peak else size, elapsed
+
+
+def bench_memory(num_cells):
+    design = generate_design(num_cells)
+    names = design['names']
+    widths = design['width'].tolist()
+    heights = design['height'].tolist()
+    terminals = design['is_terminal'].tolist()
+    xs = design['x'].tolist()
+    ys = design['y'].tolist()
+
+    # The name strings and the parsed floats exist in both cases, so they are
+    # allocated before tracing starts and only the containers are measured.
+    def build_dicts():
+        nodes = {}
+        placements = {}
+        for node, w, h, t, x, y in zip(names, widths, heights, terminals, xs, ys):
+            nodes[node] = {'width': w, 'height': h, 'is_terminal': t}
+            placements[node] = {'x': x, 'y': y}
+        return nodes, placements
+
+    def build_columns():
+        nodes = NodeTable(names, widths, heights, terminals)
+        return nodes, Placement(nodes, xs, ys, np.ones(len(names), dtype=bool))
+
+    _, dict_bytes, dict_time = _traced(build_dicts)
+    (nodes, placement), column_bytes, column_time = _traced(build_columns)
+
+    n = len(names)
+    print(f"nodes: {n}")
+    print(f"dict-of-dicts : {dict_bytes / 2**20:8.1f} MiB  {dict_bytes / n:6.1f} B/cell  built in {dict_time:.2f}s")
+    print(f"columnar      : {column_bytes / 2**20:8.1f} MiB  {column_bytes / n:6.1f} B/cell  built in {column_time:.2f}s")
+    print(f"  of which arrays: {(nodes.nbytes() + placement.nbytes()) / n:.1f} B/cell, rest is the name -> id index")
+
+
+def load_design(num_cells, num_nets=None, seed=0):
+    design = generate_design(num_cells, seed=seed)
+    nodes = NodeTable(design['names'], design['width'], design['height'], design['is_terminal'])
+    placement = Placement(nodes, design['x'], design['y'], np.ones(len(nodes), dtype=bool))
+    offsets, pins = generate_nets(len(nodes), num_cells if num_nets is None else num_nets, seed=seed)
+    netlist = Netlist([f"n{k}" for k in range(len(offsets) - 1)], offsets, pins)
+    return design, nodes, placement, netlist
+
+
+def _best_of(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return result, best
+
+
+def bench_hpwl(num_cells, num_nets):
+    design, nodes, placement, netlist = load_design(num_cells, num_nets)
+    names = nodes.names
+    placements = {name: {'x': x, 'y': y} for name, x, y in zip(names, design['x'].tolist(), design['y'].tolist())}
+    net_nodes = [[names[p] for p in netlist.pins[s:e]] for s, e in zip(netlist.offsets[:-1], netlist.offsets[1:])]
+
+    def per_net_loop():
+        total = 0
+        for pins in net_nodes:
+            valid_nodes = [node for node in pins if node in placements]
+            if len(valid_nodes) < 2:
+                continue
+            min_x = min(placements[node]['x'] for node in valid_nodes)
+            max_x = max(placements[node]['x'] for node in valid_nodes)
+            min_y = min(placements[node]['y'] for node in valid_nodes)
+            max_y = max(placements[node]['y'] for node in valid_nodes)
+            total += (max_x - min_x) + (max_y - min_y)
+        return total
+
+    # The same nets with pins at the cell centres plus a small offset
+    rng = np.random.default_rng(1)
+    pins = netlist.pins
+    pinned = Netlist(netlist.net_ids, netlist.offsets, pins, pin_dx=nodes.width[pins] / 2 + rng.uniform(-1, 1, len(pins)),
+                     pin_dy=nodes.height[pins] / 2 + rng.uniform(-1, 1, len(pins)))
+
+    loop_total, loop_time = _best_of(per_net_loop, repeat=1)
+    csr_total, csr_time = _best_of(lambda: total_hpwl(netlist, placement))
+    pin_total, pin_time = _best_of(lambda: total_hpwl(pinned, placement))
+    print(f"nets: {len(netlist)}  pins: {len(netlist.pins)}")
+    print(f"per-net loop : {loop_time * 1000:9.1f} ms  total={loop_total:.1f}")
+    print(f"CSR reduceat : {csr_time * 1000:9.1f} ms  total={csr_total:.1f}")
+    print(f"  pin offsets: {pin_time * 1000:9.1f} ms  total={pin_total:.1f}")
+
+
+def bench_overlap(cell_counts, loop_limit):
+    for num_cells in cell_counts:
+        design = generate_design(num_cells)
+        movable = ~design['is_terminal']
+        x_min = design['x'][movable]
+        y_min = design['y'][movable]
+        x_max = x_min + design['width'][movable]
+        y_max = y_min + design['height'][movable]
+
+        count, sweep_time = _best_of(lambda: find_overlaps(x_min, y_min, x_max, y_max))
+        line = f"cells: {num_cells:8d}  sweep: {sweep_time * 1000:9.1f} ms  overlaps={count}"
+
+        if num_cells <= loop_limit:
+            node_rects = []
+            rects = list(zip(x_min.tolist(), x_max.tolist(), y_min.tolist(), y_max.tolist()))
+
+            def pairwise_loop():
+                overlaps = 0
+                node_rects.clear()
+                for rect in rects:
+                    for prev in node_rects:
+                        if not (rect[1] <= prev[0] or rect[0] >= prev[1] or rect[3] <= prev[2] or rect[2] >= prev[3]):
+                            overlaps += 1
+                    node_rects.append(rect)
+                return overlaps
+
+            loop_count, loop_time = _best_of(pairwise_loop, repeat=1)
+            line += f"  pairwise loop: {loop_time * 1000:9.1f} ms  overlaps={loop_count}"
+        print(line)
+
+
+def bench_parse(base):
+    parsers = {
+        '.nodes': bookshelf.parse_nodes,
+        '.pl': bookshelf.parse_placements,
+        '.scl': bookshelf.parse_scl,
+        '.nets': bookshelf.parse_nets
+    }
+    for ext, parse in parsers.items():
+        path = base + ext
+        size = os.path.getsize(path)
+
+        def bulk():
+            with open(path, 'rb') as f:
+                return parse(f)
+
+        def line_loop():
+            # What every line-at-a-time parser pays before doing any real work
+            count = 0
+            with open(path, 'rb') as f:
+                for line in f:
+                    count += len(line.decode('utf-8').strip().split())
+            return count
+
+        _, bulk_time = _best_of(bulk)
+        _, loop_time = _best_of(line_loop, repeat=1)
+        print(f"{ext:6s} {size / 2**20:8.1f} MiB  bulk: {size / 2**20 / bulk_time:7.1f} MiB/s"
+              f"  line decode+split only: {size / 2**20 / loop_time:6.1f} MiB/s")
+
+    # The whole design, parse plus binding, one file after another vs concurrently
+    buffers = {ext[1:]: bookshelf.read_buffer(open(base + ext, 'rb')) for ext in parsers}
+    total = sum(len(b) for b in buffers.values()) / 2**20
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        for label, executor in (('sequential', None), ('thread pool', pool)):
+            (*_, timings), elapsed = _best_of(lambda: bookshelf.parse_design(buffers, executor), repeat=2)
+            steps = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
+            print(f"design {label:12s} {elapsed:6.2f} s  {total / elapsed:6.1f} MiB/s  ({steps})")
+
+
+def bench_render(sizes, mpl_limit):
+    # The matplotlib view lives in app.py; importing it pulls in Flask as well
+    from app import visualize_layout
+    import raster
+    from rowindex import RowIndex
+
+    for n in sizes:
+        design, nodes, placement, _ = load_design(n)
+        row_index = RowIndex(design['rows'])
+        png, raster_peak, raster_time = _traced(lambda: raster.render_layout(nodes, placement, row_index), peak=True)
+        line = f"cells {n:>9,}  raster: {raster_time:6.2f}s {raster_peak / 2**20:7.1f} MiB peak {len(png) / 2**20:5.1f} MiB png"
+        if n <= mpl_limit:
+            img, mpl_peak, mpl_time = _traced(lambda: visualize_layout(nodes, placement, design['rows']), peak=True)
+            line += (f"  matplotlib: {mpl_time:6.2f}s {mpl_peak / 2**20:7.1f} MiB peak"
+                     f" {len(img.getvalue()) / 2**20:5.1f} MiB png  ({mpl_time / raster_time:.0f}x)")
+        print(line)
+
+
+def bench_tiles(num_cells, zooms, samples=20):
+    import tiles
+    from rowindex import RowIndex
+
+    design, nodes, placement, _ = load_design(num_cells)
+    row_index = RowIndex(design['rows'])
+    layer, build_time = _best_of(lambda: tiles.TileLayer(nodes, placement, row_index), repeat=1)
+    print(f"cells {num_cells:,}  index build: {build_time:.2f}s  grid {layer.grid.size}x{layer.grid.size}"
+          f"  large cells: {len(layer.grid.large)}")
+
+    rng = np.random.default_rng(0)
+    for z in zooms:
+        count = 1 << z
+        coords = rng.integers(0, count, size=(samples, 2))
+        times = []
+        for x, y in coords:
+            start = time.perf_counter()
+            layer.tile(z, int(x), int(y))
+            times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        layer.tile(z, int(coords[0, 0]), int(coords[0, 1]))
+        hit = time.perf_counter() - start
+        times = np.array(times) * 1e3
+        print(f"zoom {z:2d}  render median {np.median(times):6.1f} ms  max {times.max():6.1f} ms"
+              f"  cached {hit * 1e3:5.2f} ms")
+
+    # One move: drop the touched tiles, then re-render one of them
+    node = int(placement.placed_ids[len(placement.placed_ids) // 2])
+    start = time.perf_counter()
+    layer.before_move([node])
+    placement.move(node, float(placement.x[node]) + 1.0, float(placement.y[node]))
+    layer.after_move([node])
+    print(f"move + invalidate: {(time.perf_counter() - start) * 1e3:.2f} ms, {len(layer.tiles)} tiles still cached")
+
+
+def bench_legalize(sizes, tetris_limit):
+    # Tetris lives in app.py; importing it pulls in Flask as well
+    from app import tetris_legalize
+    from legalize import Segments, abacus_legalize, displacement_stats, free_segments
+    from rowindex import RowIndex
+
+    for n in sizes:
+        design, nodes, placement, netlist = load_design(n)
+        row_index = RowIndex(design['rows'])
+        runs = [('abacus', lambda: abacus_legalize(nodes, Segments(row_index), placement)),
+                ('sites', lambda: abacus_legalize(nodes, free_segments(row_index, nodes, placement), placement))]
+        if n <= tetris_limit:
+            runs.append(('tetris', lambda: tetris_legalize(nodes, row_index, placement)))
+        for name, run in runs:
+            (legalized, skipped), elapsed = _best_of(run, repeat=1)
+            stats = displacement_stats(nodes, netlist, placement, legalized)
+            print(f"cells {n:>9,}  {name:6s} {elapsed:7.2f}s  skipped {len(skipped):6d}"
+                  f"  displacement avg {stats['average_displacement']:8.2f} max {stats['max_displacement']:9.2f}"
+                  f"  HPWL {stats['hpwl_delta'] / max(stats['hpwl_before'], 1e-9):+.2%}")
+
+
+def bench_place(sizes):
+    from legalize import Segments, abacus_legalize
+    from placer import global_place
+    from rowindex import RowIndex
+
+    for n in sizes:
+        design, nodes, placement, netlist = load_design(n)
+        row_index = RowIndex(design['rows'])
+        (placed, stats), place_time = _best_of(lambda: global_place(nodes, netlist, row_index, placement), repeat=1)
+        (legalized, skipped), legal_time = _best_of(
+            lambda: abacus_legalize(nodes, Segments(row_index), placed), repeat=1)
+        print(f"cells {n:>9,}  global {place_time:7.2f}s ({stats['iterations']} rounds, overflow {stats['overflow']:.3f})"
+              f"  abacus {legal_time:6.2f}s  skipped {len(skipped)}"
+              f"  HPWL .pl {total_hpwl(netlist, placement):.4g}  global {total_hpwl(netlist, placed):.4g}"
+              f"  legalized {total_hpwl(netlist, legalized):.4g}")
+
+
+def bench_random(num_cells, samples):
+    import random
+    from randomplace import random_coordinates
+    from rowindex import RowIndex
+
+    design, nodes, placement, netlist = load_design(num_cells)
+    row_index = RowIndex(design['rows'])
+    max_x, max_y = row_index.max_x, row_index.max_y
+
+    def per_node_loop():
+        xs, ys = placement.x.copy(), placement.y.copy()
+        for i in nodes.movable_ids:
+            xs[i] = random.uniform(0, max_x - abs(nodes.width[i]))
+            ys[i] = random.uniform(0, max_y - abs(nodes.height[i]))
+        return xs, ys
+
+    _, loop_time = _best_of(per_node_loop, repeat=1)
+    print(f"cells {num_cells:,}  per-node loop: {loop_time * 1000:8.1f} ms / placement")
+    for mode in ('free', 'rows'):
+        (xs, ys), elapsed = _best_of(lambda: random_coordinates(nodes, row_index, placement, 0, samples, mode=mode))
+        totals = [total_hpwl(netlist, Placement(nodes, x, y, placement.placed)) for x, y in zip(xs, ys)]
+        misaligned = [int(np.count_nonzero(row_index.find_rows(x, y, nodes.width, nodes.height)[nodes.movable_ids] < 0))
+                      for x, y in zip(xs, ys)]
+        print(f"{mode:5s} x{samples}: {elapsed / samples * 1000:8.1f} ms / placement"
+              f"  HPWL mean {np.mean(totals):.4g} std {np.std(totals):.3g}  misaligned mean {np.mean(misaligned):.0f}")
+
+
+def bench_baseline(num_cells, samples, worker_counts):
+    from montecarlo import random_baseline
+
+    design, nodes, placement, netlist = load_design(num_cells)
+    for workers in worker_counts:
+        (_, summary), elapsed = _best_of(
+            lambda: random_baseline(nodes, netlist, design['rows'], placement, samples, 0, workers=workers), repeat=1)
+        print(f"cells {num_cells:,}  {samples} samples  workers {workers:2d}: {elapsed:6.2f}s"
+              f"  ({elapsed / samples * 1000:.1f} ms / sample)  HPWL mean {summary['hpwl']['mean']:.4g}"
+              f"  overlaps mean {summary['overlaps']['mean']:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    gen = sub.add_parser('generate', help='write a synthetic .nodes/.pl/.scl/.nets set')
+    gen.add_argument('directory')
+    gen.add_argument('--cells', type=int, default=100_000)
+    gen.add_argument('--nets', type=int, default=None)
+    gen.add_argument('--seed', type=int, default=0)
+
+    mem = sub.add_parser('memory', help='dict-of-dicts vs columnar node/placement storage')
+    mem.add_argument('--cells', type=int, default=1_000_000)
+
+    hp = sub.add_parser('hpwl', help='per-net loop vs vectorized CSR HPWL')
+    hp.add_argument('--cells', type=int, default=1_000_000)
+    hp.add_argument('--nets', type=int, default=None)
+
+    ov = sub.add_parser('overlap', help='pairwise loop vs band sweep overlap counting')
+    ov.add_argument('--cells', type=int, nargs='+', default=[2_000, 10_000, 200_000, 1_000_000])
+    ov.add_argument('--loop-limit', type=int, default=10_000)
+
+    pa = sub.add_parser('parse', help='parse throughput per Bookshelf file type')
+    pa.add_argument('base', help='path prefix of the .nodes/.pl/.scl/.nets files')
+
+    rn = sub.add_parser('render', help='matplotlib vs NumPy raster layout rendering')
+    rn.add_argument('--cells', type=int, nargs='+', default=[2_000, 20_000, 200_000, 1_000_000])
+    rn.add_argument('--matplotlib-limit', type=int, default=200_000)
+
+    tl = sub.add_parser('tiles', help='per-tile render time with the bucket grid index')
+    tl.add_argument('--cells', type=int, default=1_000_000)
+    tl.add_argument('--zoom', type=int, nargs='+', default=[0, 2, 4, 6, 8, 10])
+
+    lg = sub.add_parser('legalize', help='Tetris vs Abacus (free or on sites) legalization: time, displacement, HPWL change')
+    lg.add_argument('--cells', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    lg.add_argument('--tetris-limit', type=int, default=100_000)
+
+    pl = sub.add_parser('place', help='quadratic global placement followed by Abacus: time and HPWL')
+    pl.add_argument('--cells', type=int, nargs='+', default=[10_000, 100_000])
+
+    rp = sub.add_parser('random', help='per-node random.uniform loop vs seeded batched random placement')
+    rp.add_argument('--cells', type=int, default=1_000_000)
+    rp.add_argument('--samples', type=int, default=8)
+
+    bl = sub.add_parser('baseline', help='random-baseline statistics on a process pool')
+    bl.add_argument('--cells', type=int, default=12_000)
+    bl.add_argument('--samples', type=int, default=1000)
+    bl.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+
+    args = parser.parse_args()
+    if args.command == 'generate':
+        print(write_bookshelf(args.directory, args.cells, args.nets, args.seed))
+    elif args.command == 'memory':
+        bench_memory(args.cells)
+    elif args.command == 'hpwl':
+        bench_hpwl(args.cells, args.nets)
+    elif args.command == 'overlap':
+        bench_overlap(args.cells, args.loop_limit)
+    elif args.command == 'parse':
+        bench_parse(args.base)
+    elif args.command == 'render':
+        bench_render(args.cells, args.matplotlib_limit)
+    elif args.command == 'tiles':
+        bench_tiles(args.cells, args.zoom)
+    elif args.command == 'legalize':
+        bench_legalize(args.cells, args.tetris_limit)
+    elif args.command == 'place':
+        bench_place(args.cells)
+    elif args.command == 'random':
+        bench_random(args.cells, args.samples)
+    elif args.command == 'baseline':
+        bench_baseline(args.cells, args.samples, args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,364 @@
+# python_backend/bookshelf.py
+#
+# Bulk Bookshelf parsers. Each file is read as one uint8 buffer (memory-mapped
+# when the upload has been spooled to disk) and tokenized with NumPy: token
+# boundaries come from a whitespace mask, the tokens needed are gathered into
+# fixed-width byte-string arrays, and numbers are converted a column at a time.
+# No per-line Python objects are created for .nodes, .pl or .nets.
+import io
+import mmap
+import os
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from design import NodeTable, Placement
+from netlist import Netlist
+
+MMAP_THRESHOLD = 1 << 20
+
+_SPACE, _NL = 32, 10
+_NUMERIC_START = np.zeros(256, dtype=bool)
+_NUMERIC_START[np.frombuffer(b'0123456789+-.', dtype=np.uint8)] = True
+
+
+def read_buffer(file):
+    # Accepts an uploaded file, a binary stream or a buffer that was already read
+    if isinstance(file, np.ndarray):
+        return file
+    stream = getattr(file, 'stream', file)
+    if isinstance(stream, io.BytesIO):
+        return np.frombuffer(stream.getbuffer(), dtype=np.uint8)
+
+    start = stream.tell()
+    size = stream.seek(0, os.SEEK_END) - start
+    stream.seek(start)
+    if size >= MMAP_THRESHOLD and start == 0:
+        try:
+            mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+            return np.frombuffer(mapped, dtype=np.uint8)
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            pass
+    return np.frombuffer(stream.read(), dtype=np.uint8)
+
+
+class Tokens:
+    # Token boundaries of a whole buffer plus, per line, its first token and token count
+    def __init__(self, buf):
+        self.buf = buf
+        # Space, tab, CR, LF and the other control bytes all count as blanks
+        solid = np.zeros(len(buf) + 2, dtype=bool)
+        np.greater(buf, _SPACE, out=solid[1:-1])
+        # Solid/blank transitions alternate, so starts and ends interleave
+        edges = np.flatnonzero(solid[1:] != solid[:-1])
+        self.starts = edges[0::2]
+        self.ends = edges[1::2]
+
+        # First token at or after each line start; lines without tokens are dropped
+        line_starts = np.concatenate([[0], np.flatnonzero(buf == _NL) + 1])
+        first = np.searchsorted(self.starts, line_starts)
+        line_ends = np.concatenate([line_starts[1:], [len(buf)]])
+        has_token = first < len(self.starts)
+        has_token[has_token] = self.starts[first[has_token]] < line_ends[has_token]
+        self.line_first = first[has_token]
+        self.line_count = np.diff(np.concatenate([self.line_first, [len(self.starts)]]))
+
+    def __len__(self):
+        return len(self.line_first)
+
+    def column(self, lines, k):
+        # Token k of each given line (lines must have more than k tokens)
+        return self.line_first[lines] + k
+
+    def strings(self, token_ids, lower=False):
+        return gather(self.buf, self.starts[token_ids], self.ends[token_ids], lower)
+
+    def floats(self, token_ids):
+        starts = self.starts[token_ids]
+        ends = self.ends[token_ids]
+        values = parse_decimals(gather_matrix(self.buf, starts, ends), ends - starts)
+        if values is None:
+            values = gather(self.buf, starts, ends).astype(np.float64)
+        return values
+
+    def first_byte(self, token_ids):
+        return self.buf[self.starts[token_ids]]
+
+
+def gather_matrix(buf, starts, ends):
+    # Byte ranges copied into the rows of a zero-padded (n, longest) uint8 matrix
+    lengths = ends - starts
+    width = int(lengths.max()) if len(lengths) else 1
+    if len(buf) < width:
+        buf = np.concatenate([buf, np.zeros(width - len(buf), dtype=np.uint8)])
+    # Rows of a sliding window over the buffer; starts too close to the end are
+    # clamped, which only shifts bytes that the padding mask then clears
+    windows = sliding_window_view(buf, width)
+    last = len(windows) - 1
+    out = windows[np.minimum(starts, last)]
+    tail = np.flatnonzero(starts > last)
+    for i in tail:
+        out[i, :ends[i] - starts[i]] = buf[starts[i]:ends[i]]
+    out[np.arange(width) >= lengths[:, None]] = 0
+    return out
+
+
+def gather(buf, starts, ends, lower=False):
+    # Byte ranges as one fixed-width 'S' array
+    out = gather_matrix(buf, starts, ends)
+    if lower:
+        upper = (out >= 65) & (out <= 90)
+        out[upper] += 32
+    return np.ascontiguousarray(out).view(f'S{out.shape[1]}').ravel()
+
+
+def parse_decimals(matrix, lengths):
+    # Plain [+-]digits[.digits] tokens of at most 15 digits are parsed as an exact
+    # integer mantissa divided by a power of ten, which IEEE rounding makes equal
+    # to float(). Returns None when any token needs the general parser.
+    n = len(matrix)
+    mantissa = np.zeros(n, dtype=np.int64)
+    digits = np.zeros(n, dtype=np.int64)
+    dots = np.zeros(n, dtype=np.int64)
+    dot_at = lengths
+    negative = np.zeros(n, dtype=bool)
+    # One pass per character position; the zero padding is neither digit nor dot
+    for col, chars in enumerate(np.ascontiguousarray(matrix.T)):
+        value = chars - np.uint8(48)
+        is_digit = value <= 9
+        is_dot = chars == 46
+        allowed = is_digit | is_dot | (chars == 0)
+        if col == 0:
+            negative = chars == 45
+            allowed |= negative | (chars == 43)
+        if not allowed.all():
+            return None
+        mantissa = np.where(is_digit, mantissa * 10 + value, mantissa)
+        digits += is_digit
+        dots += is_dot
+        dot_at = np.where(is_dot, col, dot_at)
+    if n and (digits.min() < 1 or digits.max() > 15 or dots.max() > 1):
+        return None
+
+    fraction_digits = np.maximum(lengths - dot_at - 1, 0)
+    values = mantissa / 10.0 ** fraction_digits
+    values[negative] *= -1
+    return values
+
+
+def _numeric_lines(tokens, min_tokens, columns):
+    # Lines with enough tokens whose given columns look like numbers
+    lines = np.flatnonzero(tokens.line_count >= min_tokens)
+    for k in columns:
+        lines = lines[_NUMERIC_START[tokens.first_byte(tokens.column(lines, k))]]
+    return lines
+
+
+def _to_floats(tokens, lines, k):
+    # Column k as float64; a line whose token does not parse is reported as NaN
+    try:
+        return tokens.floats(tokens.column(lines, k))
+    except ValueError:
+        strings = tokens.strings(tokens.column(lines, k))
+        values = np.empty(len(strings))
+        for i, s in enumerate(strings.tolist()):
+            try:
+                values[i] = float(s)
+            except ValueError:
+                values[i] = np.nan
+        return values
+
+
+def _parse_columns(tokens, lines, columns):
+    values = [_to_floats(tokens, lines, k) for k in columns]
+    ok = np.ones(len(lines), dtype=bool)
+    for v in values:
+        ok &= ~np.isnan(v)
+    if not ok.all():
+        bad = lines[~ok]
+        print(f"Skipping {len(bad)} malformed line(s)")
+    return lines[ok], [v[ok] for v in values]
+
+
+def decode_names(names):
+    return names.astype('U').tolist()
+
+
+def parse_nodes(file):
+    tokens = Tokens(read_buffer(file))
+    lines = _numeric_lines(tokens, 3, (1, 2))
+    lines, (widths, heights) = _parse_columns(tokens, lines, (1, 2))
+    names = tokens.strings(tokens.column(lines, 0), lower=True)
+
+    terminals = np.zeros(len(lines), dtype=bool)
+    four = np.flatnonzero(tokens.line_count[lines] == 4)
+    if len(four):
+        terminals[four] = tokens.strings(tokens.column(lines[four], 3), lower=True) == b'terminal'
+
+    # A repeated node keeps its first position and its last dimensions
+    order = np.argsort(names, kind='stable')
+    sorted_names = names[order]
+    group_start = np.ones(len(names), dtype=bool)
+    group_start[1:] = sorted_names[1:] != sorted_names[:-1]
+    if not group_start.all():
+        group_end = np.concatenate([np.flatnonzero(group_start)[1:], [len(names)]]) - 1
+        first = np.sort(order[group_start])
+        last = order[group_end][np.argsort(order[group_start])]
+        names = names[first]
+        widths, heights, terminals = widths[last], heights[last], terminals[last]
+
+    return NodeTable(names, widths, heights, terminals)
+
+
+def parse_placements(file):
+    # Returns (names, xs, ys); the names are lowercased like those of .nodes and
+    # .nets and bound to node ids by Placement.from_columns
+    tokens = Tokens(read_buffer(file))
+    lines = _numeric_lines(tokens, 3, (1, 2))
+    lines, (xs, ys) = _parse_columns(tokens, lines, (1, 2))
+    return tokens.strings(tokens.column(lines, 0), lower=True), xs, ys
+
+
+def parse_nets(file):
+    # Returns (net_ids, offsets, pin_names, net_names, (pin_x, pin_y)) in CSR
+    # layout; pin names are bound to node ids by Netlist.from_columns. net_ids
+    # are the ordinal n{k}, net_names the names on the NetDegree lines (n{k}
+    # where a line has none). pin_x/pin_y are the `name I : xoff yoff` offsets
+    # from the node's centre, 0 for pin lines without them
+    tokens = Tokens(read_buffer(file))
+    first = tokens.line_first
+    length = tokens.ends[first] - tokens.starts[first]
+
+    # Lines whose first token starts with NetDegree open a net, however the
+    # colon and degree are spaced (NetDegree : k, NetDegree: k, NetDegree:k)
+    is_degree = np.zeros(len(tokens), dtype=bool)
+    candidates = np.flatnonzero(length >= len(b'NetDegree'))
+    starts = tokens.starts[first[candidates]]
+    is_degree[candidates] = gather(tokens.buf, starts, starts + len(b'NetDegree')) == b'NetDegree'
+    degree_lines = np.flatnonzero(is_degree)
+
+    # Every other line after the first NetDegree is a pin
+    pin_lines = np.flatnonzero(~is_degree)
+    if len(degree_lines):
+        pin_lines = pin_lines[pin_lines > degree_lines[0]]
+    else:
+        pin_lines = pin_lines[:0]
+
+    offsets = np.searchsorted(pin_lines, np.concatenate([degree_lines, [len(tokens)]]))
+    pin_names = tokens.strings(first[pin_lines], lower=True)
+
+    pin_x = np.zeros(len(pin_lines))
+    pin_y = np.zeros(len(pin_lines))
+    with_offsets = np.flatnonzero(tokens.line_count[pin_lines] >= 5)
+    lines = pin_lines[with_offsets]
+    colon = tokens.first_byte(tokens.column(lines, 2)) == ord(':')
+    with_offsets, lines = with_offsets[colon], lines[colon]
+    if len(lines):
+        pin_x[with_offsets] = np.nan_to_num(_to_floats(tokens, lines, 3))
+        pin_y[with_offsets] = np.nan_to_num(_to_floats(tokens, lines, 4))
+
+    net_ids = [f"n{k}" for k in range(len(degree_lines))]
+    net_names = list(net_ids)
+    # The name is the last token, when that is not the degree or its colon
+    named = np.flatnonzero(tokens.line_count[degree_lines] >= 2)
+    if len(named):
+        last = tokens.line_first[degree_lines[named]] + tokens.line_count[degree_lines[named]] - 1
+        for k, name in zip(named.tolist(), decode_names(tokens.strings(last))):
+            if not name.lstrip(':').isdigit() and name != ':':
+                net_names[k] = name
+    return net_ids, offsets.astype(np.int64), pin_names, net_names, (pin_x, pin_y)
+
+
+def parse_scl(file):
+    rows = []
+    in_row = False
+    row = {}
+
+    text = bytes(read_buffer(file)).decode('utf-8')
+    for line in text.splitlines():
+        line = line.strip()
+        line = ' '.join(line.split())
+        line = line.replace("NumSites", "Numsites")
+
+        if 'CoreRow Horizontal' in line:
+            in_row = True
+            row = {}
+            continue
+        elif 'End' in line and in_row:
+            if 'coordinate' in row and 'height' in row and 'sitewidth' in row and 'subrow_origin' in row and 'numsites' in row:
+                rows.append(row)
+            else:
+                print("Warning: Incomplete row skipped ->", row)
+            in_row = False
+            continue
+
+        if in_row:
+            if 'Coordinate :' in line:
+                try:
+                    row['coordinate'] = float(line.split(':')[1].strip())
+                except ValueError:
+                    print("Warning: Invalid coordinate in line:", line)
+            elif 'Height :' in line:
+                try:
+                    row['height'] = float(line.split(':')[1].strip())
+                except ValueError:
+                    print("Warning: Invalid height in line:", line)
+            elif 'Sitewidth :' in line:
+                try:
+                    row['sitewidth'] = float(line.split(':')[1].strip())
+                except ValueError:
+                    print("Warning: Invalid sitewidth in line:", line)
+            elif 'Sitespacing :' in line:
+                try:
+                    row['sitespacing'] = float(line.split(':')[1].strip())
+                except ValueError:
+                    print("Warning: Invalid sitespacing in line:", line)
+            elif 'SubrowOrigin :' in line and 'Numsites :' in line:
+                try:
+                    parts = line.split('SubrowOrigin :')[1].split('Numsites :')
+                    row['subrow_origin'] = float(parts[0].strip())
+                    row['numsites'] = float(parts[1].strip())
+                except (ValueError, IndexError):
+                    print("Warning: Could not parse SubrowOrigin or Numsites from line:", line)
+
+    return rows
+
+
+def _timed(timings, name, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    timings[name] = time.perf_counter() - start
+    return result
+
+
+def parse_design(buffers, pool=None):
+    # buffers: {'nodes': buf, 'pl': buf, 'scl': buf, 'nets': buf}. With a thread
+    # pool the four files are tokenized concurrently (the heavy work is NumPy,
+    # which releases the GIL), then .pl and .nets are bound to node ids as soon
+    # as the .nodes table is ready. Returns (nodes, placement, netlist, rows, timings).
+    timings = {}
+
+    def submit(name, fn, *args):
+        if pool is None:
+            return _Done(_timed(timings, name, fn, *args))
+        return pool.submit(_timed, timings, name, fn, *args)
+
+    nodes_job = submit('nodes', parse_nodes, buffers['nodes'])
+    pl_job = submit('pl', parse_placements, buffers['pl'])
+    nets_job = submit('nets', parse_nets, buffers['nets'])
+    scl_job = submit('scl', parse_scl, buffers['scl'])
+
+    nodes = nodes_job.result()
+    placement_job = submit('bind_pl', Placement.from_columns, nodes, *pl_job.result())
+    netlist_job = submit('bind_nets', Netlist.from_columns, nodes, *nets_job.result())
+    return nodes, placement_job.result(), netlist_job.result(), scl_job.result(), timings
+
+
+class _Done:
+    # Stand-in for a future when no pool is given
+    def __init__(self, value):
+        self.value = value
+
+    def result(self):
+        return self.value
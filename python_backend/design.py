@@ -0,0 +1,216 @@
+# python_backend/design.py
+import hashlib
+
+import numpy as np
+
+
+def lower_ascii(keys):
+    # Copy of a byte-string array with A-Z folded to a-z, the canonical case
+    # the parsers give every node name
+    raw = keys.view(np.uint8).copy()
+    raw[(raw >= 65) & (raw <= 90)] += 32
+    return raw.view(keys.dtype)
+
+
+def as_keys(names):
+    # Node names as a fixed-width utf-8 byte-string array. Byte strings are
+    # taken as already canonical; str names (from requests) are case-folded
+    if isinstance(names, np.ndarray) and names.dtype.kind == 'S':
+        return names
+    names = list(names)
+    if not names:
+        return np.array([], dtype='S1')
+    return lower_ascii(np.char.encode(np.array(names, dtype=str), 'utf-8'))
+
+
+def hash_keys(keys, width):
+    # 64-bit hash of each key, read as zero-padded 8-byte words. Keys of at
+    # most 8 bytes are their own hash.
+    raw = np.zeros((len(keys), width), dtype=np.uint8)
+    raw[:, :keys.itemsize] = keys.view(np.uint8).reshape(len(keys), keys.itemsize)[:, :width]
+    words = raw.view(np.uint64)
+    if words.shape[1] == 1:
+        return words[:, 0].copy()
+    h = np.full(len(keys), 0xcbf29ce484222325, dtype=np.uint64)
+    for k in range(words.shape[1]):
+        h = (h ^ words[:, k]) * np.uint64(0x100000001b3)
+        h ^= h >> np.uint64(29)
+    return h
+
+
+class NameList:
+    # Read-only list of str backed by the byte-string key array
+    def __init__(self, keys):
+        self.keys = keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [k.decode('utf-8') for k in self.keys[i].tolist()]
+        return self.keys[i].decode('utf-8')
+
+    def __iter__(self):
+        for key in self.keys.tolist():
+            yield key.decode('utf-8')
+
+
+class NodeTable:
+    # Columnar view of a .nodes file. Node names are interned to integer ids
+    # (their position in the file) and every attribute lives in one array.
+    # Names are resolved to ids by binary search over a sorted copy of the keys.
+    def __init__(self, names=(), widths=(), heights=(), terminals=()):
+        self.keys = as_keys(names)
+        self.names = NameList(self.keys)
+        self.width = np.asarray(widths, dtype=np.float64)
+        self.height = np.asarray(heights, dtype=np.float64)
+        self.is_terminal = np.asarray(terminals, dtype=bool)
+        self._order = np.argsort(self.keys, kind='stable')
+        self._sorted_keys = self.keys[self._order]
+        self._hashes = None
+
+    @classmethod
+    def from_arrays(cls, keys, widths, heights, terminals, order):
+        # Rebuild from stored columns without sorting the keys again
+        table = cls.__new__(cls)
+        table.keys = keys
+        table.names = NameList(keys)
+        table.width = widths
+        table.height = heights
+        table.is_terminal = terminals
+        table._order = order
+        table._sorted_keys = keys[order]
+        table._hashes = None
+        return table
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, name):
+        return self.id_of(name) is not None
+
+    def lookup(self, names):
+        # Node id for every name, -1 where the name is unknown
+        names = as_keys(names)
+        if not len(self.keys) or not len(names):
+            return np.full(len(names), -1, dtype=np.int64)
+        if len(names) < 64:
+            pos = np.minimum(np.searchsorted(self._sorted_keys, names), len(self.keys) - 1)
+            found = self._sorted_keys[pos] == names
+            return np.where(found, self._order[pos], -1).astype(np.int64)
+
+        # Bulk lookups binary-search integer hashes instead of byte strings
+        width = -(-max(self.keys.itemsize, names.itemsize) // 8) * 8
+        hash_order, sorted_hashes = self._hash_index(width)
+        if hash_order is None:
+            pos = np.minimum(np.searchsorted(self._sorted_keys, names), len(self.keys) - 1)
+            found = self._sorted_keys[pos] == names
+            return np.where(found, self._order[pos], -1).astype(np.int64)
+        # Searching in sorted order keeps the binary searches cache-friendly
+        query = hash_keys(names, width)
+        query_order = np.argsort(query)
+        pos = np.empty(len(names), dtype=np.int64)
+        pos[query_order] = np.searchsorted(sorted_hashes, query[query_order])
+        ids = hash_order[np.minimum(pos, len(self.keys) - 1)]
+        found = self.keys[ids] == names
+        return np.where(found, ids, -1).astype(np.int64)
+
+    def _hash_index(self, width):
+        # (order, sorted hashes) of the node keys, or (None, None) if two keys collide
+        if self._hashes is None or self._hashes[0] != width:
+            hashes = hash_keys(self.keys, width)
+            order = np.argsort(hashes, kind='stable')
+            sorted_hashes = hashes[order]
+            if (sorted_hashes[1:] == sorted_hashes[:-1]).any():
+                order = sorted_hashes = None
+            self._hashes = (width, order, sorted_hashes)
+        return self._hashes[1], self._hashes[2]
+
+    def id_of(self, name):
+        if name is None:
+            return None
+        i = int(self.lookup([name])[0])
+        return i if i >= 0 else None
+
+    def get(self, name):
+        i = self.id_of(name)
+        if i is None:
+            return None
+        return {
+            'width': float(self.width[i]),
+            'height': float(self.height[i]),
+            'is_terminal': bool(self.is_terminal[i])
+        }
+
+    @property
+    def movable_ids(self):
+        return np.flatnonzero(~self.is_terminal)
+
+    def nbytes(self):
+        return self.width.nbytes + self.height.nbytes + self.is_terminal.nbytes
+
+
+class Placement:
+    # x/y coordinates for every node of a NodeTable, indexed by node id.
+    # `placed` marks the nodes that actually have a position.
+    def __init__(self, nodes, x=None, y=None, placed=None):
+        n = len(nodes)
+        self.nodes = nodes
+        self.x = np.zeros(n) if x is None else np.asarray(x, dtype=np.float64)
+        self.y = np.zeros(n) if y is None else np.asarray(y, dtype=np.float64)
+        self.placed = np.zeros(n, dtype=bool) if placed is None else np.asarray(placed, dtype=bool)
+
+    @classmethod
+    def from_columns(cls, nodes, names, xs, ys):
+        placement = cls(nodes)
+        ids = nodes.lookup(names)
+        keep = ids >= 0
+        placement.x[ids[keep]] = np.asarray(xs, dtype=np.float64)[keep]
+        placement.y[ids[keep]] = np.asarray(ys, dtype=np.float64)[keep]
+        placement.placed[ids[keep]] = True
+        return placement
+
+    def __len__(self):
+        return int(np.count_nonzero(self.placed))
+
+    def __bool__(self):
+        return bool(self.placed.any())
+
+    def __contains__(self, name):
+        i = self.nodes.id_of(name)
+        return i is not None and bool(self.placed[i])
+
+    def get(self, name):
+        i = self.nodes.id_of(name)
+        if i is None or not self.placed[i]:
+            return None
+        return {'x': float(self.x[i]), 'y': float(self.y[i])}
+
+    def move(self, node_index, x, y):
+        self.x[node_index] = x
+        self.y[node_index] = y
+        self.placed[node_index] = True
+
+    @property
+    def placed_ids(self):
+        return np.flatnonzero(self.placed)
+
+    def assign(self, other):
+        # Overwrite in place, so arrays shared with other workers stay shared
+        self.x[:] = other.x
+        self.y[:] = other.y
+        self.placed[:] = other.placed
+
+    def copy(self):
+        return Placement(self.nodes, self.x.copy(), self.y.copy(), self.placed.copy())
+
+    def nbytes(self):
+        return self.x.nbytes + self.y.nbytes + self.placed.nbytes
+
+    def digest(self):
+        # Hash of the positions, the same in every worker process
+        digest = hashlib.blake2b(digest_size=16)
+        for column in (self.x, self.y, self.placed):
+            digest.update(np.ascontiguousarray(column).data)
+        return digest.hexdigest()
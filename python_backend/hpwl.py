@@ -0,0 +1,157 @@
+# python_backend/hpwl.py
+#
+# Half-perimeter wirelength for every net of a Netlist in one vectorized pass.
+# Pins whose node has no position are ignored and nets with fewer than two
+# placed pins count as 0, the same rules the per-net loops used to apply.
+# A pin sits at its node's lower-left corner plus the netlist's pin_dx/pin_dy
+# (the node's centre plus the .nets pin offset) when the netlist has them.
+import numpy as np
+
+
+def _segment_hpwl(placement, pins, offsets, with_counts=False, dx=None, dy=None):
+    # with_counts=True also returns the number of placed pins of every segment.
+    # dx/dy, one per pin, are added to the node coordinates
+    num_segments = len(offsets) - 1
+    hpwl = np.zeros(num_segments)
+    if num_segments <= 0:
+        return (hpwl, np.zeros(0, dtype=np.int64)) if with_counts else hpwl
+
+    valid = pins >= 0
+    valid[valid] = placement.placed[pins[valid]]
+    if valid.all():
+        counts = np.diff(offsets)
+        starts = offsets[:-1]
+    else:
+        # After dropping invalid pins, the segments form a new CSR layout
+        pins = pins[valid]
+        if dx is not None:
+            dx, dy = dx[valid], dy[valid]
+        valid_before = np.concatenate([[0], np.cumsum(valid)])
+        counts = valid_before[offsets[1:]] - valid_before[offsets[:-1]]
+        starts = valid_before[offsets[:-1]]
+
+    nonempty = np.flatnonzero(counts > 0)
+    if not len(nonempty):
+        return (hpwl, counts) if with_counts else hpwl
+    starts = starts[nonempty]
+
+    xs = placement.x[pins]
+    ys = placement.y[pins]
+    if dx is not None:
+        xs += dx
+        ys += dy
+    span_x = np.maximum.reduceat(xs, starts) - np.minimum.reduceat(xs, starts)
+    span_y = np.maximum.reduceat(ys, starts) - np.minimum.reduceat(ys, starts)
+
+    hpwl[nonempty] = np.where(counts[nonempty] >= 2, span_x + span_y, 0.0)
+    return (hpwl, counts) if with_counts else hpwl
+
+
+def net_hpwl(netlist, placement):
+    return _segment_hpwl(placement, netlist.pins, netlist.offsets, dx=netlist.pin_dx, dy=netlist.pin_dy)
+
+
+def total_hpwl(netlist, placement):
+    return float(net_hpwl(netlist, placement).sum())
+
+
+def subset_hpwl(netlist, placement, net_indices, with_counts=False):
+    # HPWL of a few nets only: their pin ranges are gathered into a small CSR.
+    # with_counts=True returns (hpwl, number of placed pins) per net
+    net_indices = np.asarray(net_indices, dtype=np.int64)
+    starts = netlist.offsets[net_indices]
+    lengths = netlist.offsets[net_indices + 1] - starts
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    positions = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+    dx = dy = None
+    if netlist.pin_dx is not None:
+        dx, dy = netlist.pin_dx[positions], netlist.pin_dy[positions]
+    return _segment_hpwl(placement, netlist.pins[positions], offsets, with_counts, dx, dy)
+
+
+def single_net_hpwl(netlist, placement, net_index):
+    # Returns (hpwl, number of placed pins) for one net
+    start, end = netlist.offsets[net_index], netlist.offsets[net_index + 1]
+    pins = netlist.pins[start:end]
+    valid = pins >= 0
+    valid[valid] = placement.placed[pins[valid]]
+    pins = pins[valid]
+    if len(pins) < 2:
+        return 0.0, len(pins)
+    xs = placement.x[pins]
+    ys = placement.y[pins]
+    if netlist.pin_dx is not None:
+        xs = xs + netlist.pin_dx[start:end][valid]
+        ys = ys + netlist.pin_dy[start:end][valid]
+    return float((xs.max() - xs.min()) + (ys.max() - ys.min())), len(pins)
+
+
+def top_k(values, k):
+    # Indices of the k largest values, largest first and ties by index, as a
+    # stable argsort(-values) would give them, in O(n + k log k)
+    n = len(values)
+    if k >= n:
+        return np.argsort(-values, kind='stable')
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    threshold = np.partition(values, n - k)[n - k]
+    above = np.flatnonzero(values > threshold)
+    ties = np.flatnonzero(values == threshold)[:k - len(above)]
+    chosen = np.concatenate([above, ties])
+    return chosen[np.lexsort((chosen, -values[chosen]))]
+
+
+class NetRanking:
+    # Nets by decreasing HPWL. Only the prefix that pages have reached is
+    # sorted; it at least doubles whenever a later page needs more
+    def __init__(self, hpwl):
+        self.hpwl = hpwl
+        self.order = np.empty(0, dtype=np.int64)
+
+    def top(self, k):
+        k = min(k, len(self.hpwl))
+        if k > len(self.order):
+            self.order = top_k(self.hpwl, max(k, 2 * len(self.order)))
+        return self.order[:k]
+
+    def page(self, offset=0, limit=None, min_hpwl=None):
+        # (number of ranked nets, net indices of the page). min_hpwl drops the
+        # nets below it, which are all at the end of the ranking
+        total = len(self.hpwl) if min_hpwl is None else int(np.count_nonzero(self.hpwl >= min_hpwl))
+        end = total if limit is None else min(offset + limit, total)
+        if offset >= end:
+            return total, np.empty(0, dtype=np.int64)
+        return total, self.top(end)[offset:end]
+
+    def nbytes(self):
+        return self.hpwl.nbytes + self.order.nbytes
+
+
+class WirelengthTracker:
+    # Per-net HPWL plus the running total for one placement. Moves go through
+    # move() so only the nets incident to the moved node are recomputed.
+    def __init__(self, netlist, placement):
+        self.netlist = netlist
+        self.placement = placement
+        self.refresh()
+
+    def refresh(self):
+        self.hpwl = net_hpwl(self.netlist, self.placement)
+        self.total = float(self.hpwl.sum())
+
+    def move(self, node_index, x, y):
+        self.placement.move(node_index, x, y)
+        return self._update(self.netlist.nets_of_node(node_index))
+
+    def move_many(self, node_ids, xs, ys):
+        # Moves distinct nodes at once; a net shared by several of them is
+        # recomputed only once
+        self.placement.move(node_ids, xs, ys)
+        return self._update(self.netlist.nets_of_nodes(node_ids))
+
+    def _update(self, affected):
+        if len(affected):
+            new_hpwl = subset_hpwl(self.netlist, self.placement, affected)
+            self.total += float(new_hpwl.sum() - self.hpwl[affected].sum())
+            self.hpwl[affected] = new_hpwl
+        return affected
@@ -0,0 +1,116 @@
+# python_backend/jobs.py
+#
+# Background jobs for the slow endpoints. Jobs run on a small thread pool whose
+# size is the concurrency limit, so a few huge legalizations can only ever tie
+# up that many threads while the query endpoints keep answering. Each job
+# records its status, progress and JSON-ready result for /jobs/<id>.
+#
+# Jobs carry a key naming the request and the state it reads; submitting a key
+# that is already queued or running (or, where allowed, already finished)
+# returns that job instead of starting another; a job without a key is never
+# shared. Finished jobs are kept up to max_finished so clients can still poll them.
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Job:
+    def __init__(self, kind, key):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = 'queued'
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.exception = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.done = threading.Event()
+
+    def report(self, fraction):
+        # Called by the job's own code, fraction in [0, 1]
+        self.progress = min(max(float(fraction), 0.0), 1.0)
+
+    def wait(self, timeout=None):
+        self.done.wait(timeout)
+        return self
+
+    def to_dict(self):
+        now = time.time()
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": round(self.progress * 100, 1),
+            "queued_seconds": round((self.started or now) - self.created, 3),
+            "run_seconds": round((self.finished or now) - self.started, 3) if self.started else 0.0,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    def __init__(self, max_workers, max_finished=256):
+        self.max_workers = max_workers
+        self.max_finished = max_finished
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.jobs = OrderedDict()
+        self.by_key = {}
+        self.deduplicated = 0
+        self.lock = threading.Lock()
+
+    def submit(self, kind, key, fn, reuse_finished=True):
+        # fn(job) runs on the pool and returns the result
+        with self.lock:
+            job = self.jobs.get(self.by_key.get(key)) if key is not None else None
+            if job is not None and job.status != 'failed' and (reuse_finished or not job.done.is_set()):
+                self.deduplicated += 1
+                return job
+            job = Job(kind, key)
+            self.jobs[job.id] = job
+            if key is not None:
+                self.by_key[key] = job.id
+            self._trim()
+        self.pool.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        job.status = 'running'
+        job.started = time.time()
+        try:
+            job.result = fn(job)
+            job.progress = 1.0
+            job.status = 'done'
+        except Exception as e:
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+            job.error = str(e)
+            job.exception = e
+            job.status = 'failed'
+        finally:
+            job.finished = time.time()
+            job.done.set()
+
+    def _trim(self):
+        finished = [job for job in self.jobs.values() if job.done.is_set()]
+        for job in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self.jobs[job.id]
+            if self.by_key.get(job.key) == job.id:
+                del self.by_key[job.key]
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def stats(self):
+        with self.lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {
+                "workers": self.max_workers,
+                "jobs": counts,
+                "deduplicated": self.deduplicated,
+            }
@@ -0,0 +1,93 @@
+# python_backend/legality.py
+import numpy as np
+
+from legalize import free_segments
+from overlap import find_overlaps
+
+
+def _segment_of(segments, rows, x_min, x_max, tolerance=1e-6):
+    # Index into segments of the free segment of its subrow holding each cell, or -1
+    found = np.full(len(rows), -1, dtype=np.int64)
+    if not len(segments):
+        return found
+    order = np.lexsort((segments.start, segments.row))
+    seg_row, seg_start = segments.row[order], segments.start[order]
+    seg_end = (segments.origin + segments.x1 * segments.spacing)[order]
+
+    # Per-cell binary search for the row's last segment starting at or left of x
+    first = np.searchsorted(seg_row, rows, side='left')
+    lo, hi = first.copy(), np.searchsorted(seg_row, rows, side='right')
+    while True:
+        active = lo < hi
+        if not active.any():
+            break
+        mid = (lo + hi) // 2
+        go_right = active & (seg_start[np.minimum(mid, len(seg_start) - 1)] <= x_min + tolerance)
+        lo = np.where(go_right, mid + 1, lo)
+        hi = np.where(active & ~go_right, mid, hi)
+    last = lo - 1
+    inside = last >= first
+    inside[inside] = seg_end[last[inside]] >= x_max[inside] - tolerance
+    found[inside] = order[last[inside]]
+    return found
+
+
+def check_legality(nodes, placements, row_index, return_pairs=False, segments=None):
+    # segments are the free_segments() of the rows and the placement's
+    # terminals; callers checking many placements with the same terminals
+    # can pass them in
+    issues = {
+        "overlaps": 0,
+        "misaligned": 0,
+        "off_site": 0,
+        "blocked": 0,
+        "out_of_bounds": 0
+    }
+
+    ids = placements.placed_ids
+    ids = ids[~nodes.is_terminal[ids]]
+    x_min = placements.x[ids]
+    y_min = placements.y[ids]
+    width = np.abs(nodes.width[ids])
+    height = np.abs(nodes.height[ids])
+    x_max = x_min + width
+    y_max = y_min + height
+
+    # --- Overlap check ---
+    overlaps = find_overlaps(x_min, y_min, x_max, y_max, return_pairs=return_pairs)
+    if return_pairs:
+        overlaps, pairs = overlaps
+        pairs = ids[pairs]
+    issues["overlaps"] = overlaps
+
+    # --- Misalignment check ---
+    rows = row_index.find_rows(x_min, y_min, width, height)
+    aligned = rows >= 0
+    issues["misaligned"] = int(np.count_nonzero(~aligned))
+
+    # --- Site checks, on the free segments abacus_sites legalizes onto ---
+    # Cells inside a subrow but in none of its free segments sit on a fixed
+    # terminal; the others must start on one of the segment's sites
+    if segments is None:
+        segments = free_segments(row_index, nodes, placements)
+    seg = _segment_of(segments, rows[aligned], x_min[aligned], x_max[aligned])
+    inside = seg >= 0
+    issues["blocked"] = int(np.count_nonzero(~inside))
+    seg = seg[inside]
+    spacing = np.where(segments.spacing[seg] > 0, segments.spacing[seg], 1.0)
+    offset = (x_min[aligned][inside] - segments.origin[seg]) / spacing
+    issues["off_site"] = int(np.count_nonzero(np.abs(offset - np.round(offset)) > 1e-6))
+
+    # --- Out of bounds check ---
+    max_x = row_index.max_x
+    max_y = row_index.max_y
+
+    inside = (
+        (0 <= x_min) & (x_min <= max_x - width) &
+        (0 <= y_min) & (y_min <= max_y - height)
+    )
+    issues["out_of_bounds"] = int(np.count_nonzero(~inside))
+
+    if return_pairs:
+        return issues, pairs
+    return issues
@@ -0,0 +1,307 @@
+# python_backend/legalize.py
+#
+# Displacement-driven legalization (Abacus: Spindler, Schlichtmann and
+# Johannes, ISPD 2008). Cells are taken in order of their global x. Each one
+# is tried in the nearest rows, going up and down until the vertical distance
+# alone costs more than the best row found so far; within a row it is
+# appended after the row's last cluster, and clusters that then overlap are
+# merged and moved to the position minimising their cells' squared x
+# displacement. Only the last clusters of a row ever change, so a trial is
+# cheap and the whole run is close to linear in the number of cells.
+#
+# Rows are handled as segments: [x0, x1) stretches of one subrow that cells
+# may use. free_segments() cuts the subrows around fixed terminals and
+# expresses each stretch in whole sites; on such segments cell widths are
+# rounded up to sites and the final cluster positions to site boundaries.
+from bisect import bisect_left, bisect_right
+from math import ceil
+
+import numpy as np
+
+from design import Placement
+from hpwl import total_hpwl
+
+
+class Segments:
+    # Free stretches of the subrows, grouped into levels of equal (y0, height)
+    # and sorted by x0 within a level. With sites=True, x0/x1 are site numbers
+    # of the subrow instead of coordinates.
+    def __init__(self, row_index, x0=None, x1=None, row=None, sites=False):
+        if x0 is None:
+            row = np.arange(len(row_index))
+            x0, x1 = row_index.x0, row_index.x1
+        row = np.asarray(row, dtype=np.int64)
+        self.sites = sites
+        origin = row_index.x0[row] if sites else np.zeros(len(row))
+        spacing = row_index.sitespacing[row] if sites else np.ones(len(row))
+        start = origin + np.asarray(x0, dtype=np.float64) * spacing
+        order = np.lexsort((start, row_index.height[row], row_index.y0[row]))
+        self.row = row[order]
+        self.x0 = np.asarray(x0, dtype=np.float64)[order]
+        self.x1 = np.asarray(x1, dtype=np.float64)[order]
+        self.origin = origin[order]
+        self.spacing = spacing[order]
+        self.start = start[order]
+        self.y0 = row_index.y0[self.row]
+        self.height = row_index.height[self.row]
+
+        new_level = np.ones(len(self.row), dtype=bool)
+        new_level[1:] = (np.diff(self.y0) != 0) | (np.diff(self.height) != 0)
+        self.level_start = np.concatenate([np.flatnonzero(new_level), [len(self.row)]]).tolist()
+        self.level_y0 = self.y0[self.level_start[:-1]].tolist()
+        self.level_height = self.height[self.level_start[:-1]].tolist()
+
+    def __len__(self):
+        return len(self.row)
+
+
+class _Row:
+    # Abacus clusters of one segment as parallel lists: position, weight,
+    # q (weighted target sum) and width, plus each cluster's first cell
+    __slots__ = ('x0', 'x1', 'free', 'cx', 'ce', 'cq', 'cw', 'first', 'cells')
+
+    def __init__(self, x0, x1):
+        self.x0 = x0
+        self.x1 = x1
+        self.free = x1 - x0
+        self.cx = []
+        self.ce = []
+        self.cq = []
+        self.cw = []
+        self.first = []
+        self.cells = []
+
+    def trial(self, x, width):
+        # x the new cell would get when appended, or None if it does not fit
+        if width > self.free:
+            return None
+        x0, x1 = self.x0, self.x1
+        cx, cw = self.cx, self.cw
+        k = len(cx) - 1
+        # A cell that only overlaps the last cluster once kept inside the
+        # segment joins that cluster
+        start = min(max(x, x0), x1 - width)
+        if k < 0 or cx[k] + cw[k] <= start:
+            return start
+        e = self.ce[k] + 1.0
+        q = self.cq[k] + x - cw[k]
+        w = cw[k] + width
+        while True:
+            pos = min(max(q / e, x0), x1 - w)
+            if k > 0 and cx[k - 1] + cw[k - 1] > pos:
+                k -= 1
+                q = self.cq[k] + q - e * cw[k]
+                e += self.ce[k]
+                w += cw[k]
+            else:
+                return pos + w - width
+
+    def add(self, cell, x, width):
+        # Same steps as trial(), kept this time
+        x0, x1 = self.x0, self.x1
+        cx, ce, cq, cw = self.cx, self.ce, self.cq, self.cw
+        self.free -= width
+        self.cells.append(cell)
+        k = len(cx) - 1
+        start = min(max(x, x0), x1 - width)
+        if k < 0 or cx[k] + cw[k] <= start:
+            cx.append(start)
+            ce.append(1.0)
+            cq.append(x)
+            cw.append(width)
+            self.first.append(len(self.cells) - 1)
+            return
+        ce[k] += 1.0
+        cq[k] += x - cw[k]
+        cw[k] += width
+        while True:
+            pos = min(max(cq[k] / ce[k], x0), x1 - cw[k])
+            if k > 0 and cx[k - 1] + cw[k - 1] > pos:
+                # Merge cluster k into its predecessor
+                cq[k - 1] += cq[k] - ce[k] * cw[k - 1]
+                ce[k - 1] += ce[k]
+                cw[k - 1] += cw[k]
+                del cx[k], ce[k], cq[k], cw[k], self.first[k]
+                k -= 1
+            else:
+                cx[k] = pos
+                return
+
+
+def free_segments(row_index, nodes, placements):
+    # Site-aligned Segments of every subrow minus the placed terminals over it
+    ids = np.flatnonzero(nodes.is_terminal & placements.placed)
+    bx0 = placements.x[ids]
+    bx1 = bx0 + np.abs(nodes.width[ids])
+    by0 = placements.y[ids]
+    by1 = by0 + np.abs(nodes.height[ids])
+
+    # Subrows are sorted by level, so the levels a blockage can reach give a
+    # contiguous range of subrows, checked exactly below
+    first = row_index.level_start[np.searchsorted(row_index.level_top_prefix, by0, side='right')]
+    last = row_index.level_start[np.searchsorted(row_index.level_y0, by1, side='left')]
+    counts = np.maximum(last - first, 0)
+    block = np.repeat(np.arange(len(ids)), counts)
+    row = np.repeat(first, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    hit = ((bx0[block] < row_index.x1[row]) & (bx1[block] > row_index.x0[row]) &
+           (by0[block] < row_index.y1[row]) & (by1[block] > row_index.y0[row]) & (bx1[block] > bx0[block]))
+    block, row = block[hit], row[hit]
+    order = np.lexsort((bx0[block], row))
+    block, row = block[order], row[order]
+
+    # Walk each subrow left to right: the gaps between merged blockages are
+    # free, trimmed inward to whole sites
+    seg_x0, seg_x1, seg_row = [], [], []
+    bounds = np.searchsorted(row, np.arange(len(row_index) + 1))
+    starts = bx0[block].tolist()
+    ends = bx1[block].tolist()
+    for r in range(len(row_index)):
+        origin = float(row_index.x0[r])
+        spacing = float(row_index.sitespacing[r]) or 1.0
+        numsites = int(row_index.numsites[r])
+        free_from = origin
+        for k in list(range(bounds[r], bounds[r + 1])) + [None]:
+            free_to = float(row_index.x1[r]) if k is None else starts[k]
+            first_site = max(ceil((free_from - origin) / spacing - 1e-9), 0)
+            end_site = min(int(np.floor((free_to - origin) / spacing + 1e-9)), numsites)
+            if end_site > first_site:
+                seg_x0.append(first_site)
+                seg_x1.append(end_site)
+                seg_row.append(r)
+            if k is not None:
+                free_from = max(free_from, ends[k])
+    return Segments(row_index, seg_x0, seg_x1, seg_row, sites=True)
+
+
+def abacus_legalize(nodes, segments, placements, progress=None):
+    # Returns (legalized placement, names of cells that found no row). Movable
+    # cells without a position are left unplaced
+    movable = np.flatnonzero(~nodes.is_terminal & placements.placed)
+    order = movable[np.lexsort((placements.y[movable], placements.x[movable]))]
+    widths = np.abs(nodes.width).tolist()
+    heights = np.abs(nodes.height).tolist()
+    xs = placements.x.tolist()
+    ys = placements.y.tolist()
+
+    rows = [_Row(a, b) for a, b in zip(segments.x0.tolist(), segments.x1.tolist())]
+    level_start = segments.level_start
+    level_y0 = segments.level_y0
+    level_height = segments.level_height
+    level_x0 = [segments.start[a:b].tolist() for a, b in zip(level_start[:-1], level_start[1:])]
+    num_levels = len(level_y0)
+    sites = segments.sites
+    origins = segments.origin.tolist()
+    spacings = segments.spacing.tolist()
+    skipped = []
+
+    def units(s, x, width):
+        # Cell x and width in the segment's units: sites if snapping, else coordinates
+        if not sites:
+            return x, width
+        spacing = spacings[s]
+        return (x - origins[s]) / spacing, ceil(width / spacing - 1e-9)
+
+    def search_level(lvl, x, width, dy2, best):
+        # Best (cost, segment, x in units) in one level, scanning out from the segment at x
+        start = level_start[lvl]
+        x0s = level_x0[lvl]
+        home = bisect_right(x0s, x) - 1
+        for step in (-1, 1):
+            j = home if step < 0 else home + 1
+            while 0 <= j < len(x0s):
+                s = start + j
+                row = rows[s]
+                xu, wu = units(s, x, width)
+                # Lower bound: distance from x to where the cell could sit in the segment
+                gap = max(row.x0 - xu, xu - (row.x1 - wu), 0.0) * spacings[s]
+                if gap * gap + dy2 >= best[0]:
+                    break
+                pos = row.trial(xu, wu)
+                if pos is not None:
+                    cost = ((pos - xu) * spacings[s]) ** 2 + dy2
+                    if cost < best[0]:
+                        best[:] = [cost, s]
+                j += step
+
+    for count, cell in enumerate(order.tolist()):
+        if progress and count % 16384 == 0:
+            progress(count / len(order))
+        x, y, width, height = xs[cell], ys[cell], widths[cell], heights[cell]
+        best = [float('inf'), -1]
+        middle = bisect_left(level_y0, y)
+        # Walk down from the nearest level below y and up from the one above
+        for lvl, step in ((middle - 1, -1), (middle, 1)):
+            while 0 <= lvl < num_levels:
+                dy = level_y0[lvl] - y
+                if dy * dy >= best[0]:
+                    break
+                if level_height[lvl] >= height:
+                    search_level(lvl, x, width, dy * dy, best)
+                lvl += step
+        if best[1] < 0:
+            skipped.append(cell)
+            continue
+        rows[best[1]].add(cell, *units(best[1], x, width))
+
+    legalized = Placement(nodes, placements.x.copy(), placements.y.copy(), placements.placed.copy())
+    # Cells of a cluster sit side by side from the cluster's x. Positions are
+    # accumulated one by one so each cell starts exactly where the previous ends
+    new_x = xs
+    for s, row in enumerate(rows):
+        if not row.cells:
+            continue
+        bounds = row.first + [len(row.cells)]
+        cells = row.cells
+        positions = row.cx
+        if sites:
+            positions = _snap_clusters(row)
+        end = positions[0]
+        for c, x in enumerate(positions):
+            # Cluster widths are sums; never start before the previous cell ends
+            x = max(x, end)
+            for cell in cells[bounds[c]:bounds[c + 1]]:
+                if sites:
+                    new_x[cell] = origins[s] + x * spacings[s]
+                    x += ceil(widths[cell] / spacings[s] - 1e-9)
+                else:
+                    new_x[cell] = x
+                    x += widths[cell]
+            end = x
+        cells = np.array(cells, dtype=np.int64)
+        legalized.y[cells] = segments.y0[s]
+        legalized.placed[cells] = True
+    legalized.x[:] = new_x
+    legalized.placed[np.array(skipped, dtype=np.int64)] = False
+    return legalized, [nodes.names[i] for i in skipped]
+
+
+def _snap_clusters(row):
+    # Nearest whole site for every cluster, then pushed right past the cluster
+    # before and back left of the one after (and the segment end); the widths
+    # are whole sites and fit the segment, so this always succeeds
+    positions = [round(x) for x in row.cx]
+    end = row.x0
+    for c, width in enumerate(row.cw):
+        positions[c] = max(positions[c], end)
+        end = positions[c] + width
+    end = row.x1
+    for c in range(len(positions) - 1, -1, -1):
+        positions[c] = min(positions[c], end - row.cw[c])
+        end = positions[c]
+    return positions
+
+
+def displacement_stats(nodes, nets, before, after):
+    # Manhattan displacement of the movable cells placed in both, and the HPWL change
+    moved = ~nodes.is_terminal & before.placed & after.placed
+    distance = np.abs(after.x[moved] - before.x[moved]) + np.abs(after.y[moved] - before.y[moved])
+    hpwl_before = total_hpwl(nets, before)
+    hpwl_after = total_hpwl(nets, after)
+    return {
+        "total_displacement": round(float(distance.sum()), 2),
+        "max_displacement": round(float(distance.max()), 2) if len(distance) else 0.0,
+        "average_displacement": round(float(distance.mean()), 2) if len(distance) else 0.0,
+        "hpwl_before": round(hpwl_before, 2),
+        "hpwl_after": round(hpwl_after, 2),
+        "hpwl_delta": round(hpwl_after - hpwl_before, 2),
+    }
@@ -0,0 +1,99 @@
+# python_backend/montecarlo.py
+#
+# Random-baseline statistics: many seeded random placements of one design,
+# each scored with the vectorized HPWL and legality checks. Samples are split
+# into chunks and run on a process pool; every worker gets the design once,
+# through the pool initializer, and draws its samples by index from the seed
+# (see randomplace.py), so the result does not depend on the number of
+# workers or the chunking. Workers are started from a fork server (or spawned
+# where there is none), never forked from the multithreaded web server.
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from design import Placement
+from hpwl import total_hpwl
+from legality import check_legality
+from legalize import free_segments
+from randomplace import random_coordinates, random_placed
+from rowindex import RowIndex
+
+METRICS = ('hpwl', 'overlaps', 'misaligned', 'off_site', 'blocked', 'out_of_bounds')
+PERCENTILES = (5, 25, 50, 75, 95)
+
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# Design of the current worker process, set by _init
+_design = None
+
+
+def _init(nodes, nets, rows, placements):
+    global _design
+    _design = (nodes, nets, RowIndex(rows), placements)
+
+
+def _run(first, count, seed, mode):
+    return evaluate(*_design, seed, first, count, mode)
+
+
+def evaluate(nodes, nets, row_index, placements, seed, first, count, mode='free'):
+    # (count, len(METRICS)) scores of samples first..first + count - 1
+    xs, ys = random_coordinates(nodes, row_index, placements, seed, count, first, mode)
+    placed = random_placed(nodes, placements)
+    # Terminals keep their `placements` position in every sample
+    segments = free_segments(row_index, nodes, placements)
+    scores = np.empty((count, len(METRICS)))
+    for k in range(count):
+        sample = Placement(nodes, xs[k], ys[k], placed)
+        issues = check_legality(nodes, sample, row_index, segments=segments)
+        scores[k] = [total_hpwl(nets, sample)] + [issues[name] for name in METRICS[1:]]
+    return scores
+
+
+def summarize(scores):
+    # mean/std/min/max and percentiles of every metric column
+    summary = {}
+    for k, name in enumerate(METRICS):
+        values = scores[:, k]
+        summary[name] = {
+            "mean": float(values.mean()),
+            "std": float(values.std()),
+            "min": float(values.min()),
+            "max": float(values.max()),
+            **{f"p{q}": float(v) for q, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))},
+        }
+    return summary
+
+
+def random_baseline(nodes, nets, rows, placements, samples, seed, mode='free', workers=None, progress=None):
+    # Returns (scores, summary) for `samples` random placements
+    workers = workers or int(os.environ.get("BASELINE_WORKERS", os.cpu_count() or 1))
+    # A few chunks per worker keeps them busy without shipping tiny tasks; a
+    # chunk's coordinates stay around 64 MiB
+    chunk = int(np.clip(samples // (workers * 4), 1, max(min(256, (1 << 22) // max(len(nodes), 1)), 1)))
+    chunks = [(first, min(chunk, samples - first)) for first in range(0, samples, chunk)]
+    scores = np.empty((samples, len(METRICS)))
+    done = 0
+
+    if workers <= 1 or len(chunks) <= 1:
+        row_index = RowIndex(rows)
+        for first, count in chunks:
+            scores[first:first + count] = evaluate(nodes, nets, row_index, placements, seed, first, count, mode)
+            done += count
+            if progress:
+                progress(done / samples)
+        return scores, summarize(scores)
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), initializer=_init,
+                             initargs=(nodes, nets, rows, placements),
+                             mp_context=multiprocessing.get_context(START_METHOD)) as pool:
+        futures = {pool.submit(_run, first, count, seed, mode): (first, count) for first, count in chunks}
+        for future in as_completed(futures):
+            first, count = futures[future]
+            scores[first:first + count] = future.result()
+            done += count
+            if progress:
+                progress(done / samples)
+    return scores, summarize(scores)
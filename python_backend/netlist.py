@@ -0,0 +1,115 @@
+# python_backend/netlist.py
+import numpy as np
+
+from design import as_keys
+
+
+class Netlist:
+    # CSR view of a .nets file: the pins of net k are pins[offsets[k]:offsets[k + 1]],
+    # each pin being a node id from the NodeTable (-1 when the node is unknown).
+    # Net k is named by its ordinal id n{k} (net_ids) or by the name the .nets
+    # file gave it (net_names); index_of() resolves either in O(1), a .nets
+    # name winning over the ordinal id it happens to look like.
+    # pin_dx/pin_dy place each pin relative to its node's lower-left corner:
+    # half the node's size plus the pin offset from the .nets file. Without
+    # them every pin sits on the corner.
+    def __init__(self, net_ids, offsets, pins, unknown_pins=None, net_names=None, pin_dx=None, pin_dy=None):
+        self.net_ids = list(net_ids)
+        self.net_names = list(net_names) if net_names is not None else self.net_ids
+        self._name_index = None
+        self.pin_dx = None if pin_dx is None else np.asarray(pin_dx, dtype=np.float64)
+        self.pin_dy = None if pin_dy is None else np.asarray(pin_dy, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.pins = np.asarray(pins, dtype=np.int64)
+        # pin position -> node name, only for pins that did not resolve to a node
+        self.unknown_pins = unknown_pins or {}
+        self._net_of_pin = None
+        self.node_offsets = None
+        self.node_nets = None
+
+    def build_node_index(self, num_nodes):
+        # Reverse CSR: the nets touching node i are node_nets[node_offsets[i]:node_offsets[i + 1]].
+        # A node listed twice on the same net is only recorded once.
+        num_nets = max(len(self), 1)
+        known = self.pins >= 0
+        keys = np.sort(self.pins[known] * num_nets + self.net_of_pin[known])
+        if len(keys):
+            keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])]
+        self.node_nets = keys % num_nets
+        self.node_offsets = np.concatenate([[0], np.cumsum(np.bincount(keys // num_nets, minlength=num_nodes))])
+
+    @classmethod
+    def from_columns(cls, nodes, net_ids, offsets, pin_names, net_names=None, pin_offsets=None):
+        # pin_offsets: (x, y) of every pin from its node's centre, 0 if not given
+        pin_names = as_keys(pin_names)
+        pins = nodes.lookup(pin_names)
+        unknown_pins = {int(p): pin_names[p].decode('utf-8') for p in np.flatnonzero(pins < 0)}
+        pin_x, pin_y = pin_offsets if pin_offsets is not None else (np.zeros(len(pins)), np.zeros(len(pins)))
+        half_width, half_height = np.zeros(len(pins)), np.zeros(len(pins))
+        known = pins >= 0
+        half_width[known] = np.abs(nodes.width[pins[known]]) / 2
+        half_height[known] = np.abs(nodes.height[pins[known]]) / 2
+        pin_dx, pin_dy = half_width + pin_x, half_height + pin_y
+        netlist = cls(net_ids, offsets, pins, unknown_pins, net_names, pin_dx, pin_dy)
+        netlist.build_node_index(len(nodes))
+        return netlist
+
+    def __len__(self):
+        return len(self.net_ids)
+
+    def __bool__(self):
+        return len(self.net_ids) > 0
+
+    def index_of(self, net_id):
+        # Net index of a .nets name or else of an ordinal id (n{k}, or k itself), else None
+        key = str(net_id)
+        if self._name_index is None:
+            # First occurrence wins when a name repeats
+            index = {}
+            for k, name in enumerate(self.net_names):
+                index.setdefault(name, k)
+            self._name_index = index
+        found = self._name_index.get(key)
+        if found is not None:
+            return found
+        digits = key[1:] if key.startswith('n') else key
+        if digits.isascii() and digits.isdigit() and key in (f"n{int(digits)}", str(int(digits))) and int(digits) < len(self):
+            return int(digits)
+        return None
+
+    def lookup(self, net_ids):
+        # Net index of every id or name, -1 where it is unknown
+        found = (self.index_of(net_id) for net_id in net_ids)
+        return np.fromiter((-1 if k is None else k for k in found), dtype=np.int64, count=len(net_ids))
+
+    @property
+    def degrees(self):
+        return np.diff(self.offsets)
+
+    @property
+    def net_of_pin(self):
+        if self._net_of_pin is None:
+            self._net_of_pin = np.repeat(np.arange(len(self), dtype=np.int64), self.degrees)
+        return self._net_of_pin
+
+    def net_nodes(self, net_index, nodes):
+        start, end = self.offsets[net_index], self.offsets[net_index + 1]
+        return [
+            nodes.names[p] if p >= 0 else self.unknown_pins[start + k]
+            for k, p in enumerate(self.pins[start:end].tolist())
+        ]
+
+    def nets_of_nodes(self, node_ids):
+        # Sorted unique nets touching any of the given nodes
+        node_ids = np.asarray(node_ids, dtype=np.int64)
+        if self.node_offsets is None:
+            return np.unique(self.net_of_pin[np.isin(self.pins, node_ids)])
+        starts = self.node_offsets[node_ids]
+        lengths = self.node_offsets[node_ids + 1] - starts
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return np.unique(self.node_nets[positions])
+
+    def nets_of_node(self, node_index):
+        if self.node_offsets is None:
+            return np.unique(self.net_of_pin[self.pins == node_index])
+        return self.node_nets[self.node_offsets[node_index]:self.node_offsets[node_index + 1]]
@@ -0,0 +1,90 @@
+# python_backend/overlap.py
+#
+# Overlap detection for axis-aligned cell rectangles. Two cells overlap when
+#   a.x_min < b.x_max and b.x_min < a.x_max and a.y_min < b.y_max and b.y_min < a.y_max
+# which is the same test the pairwise loop in legality_check used.
+#
+# Cells are bucketed into horizontal bands (one band per typical row height) and
+# each band is swept along x: after sorting by x_min, the candidates of cell i
+# are the cells after it whose x_min is below i's x_max, found by binary search.
+# The candidate pairs of all bands are then tested together.
+# A pair that shares several bands is only counted in the band holding the
+# bottom edge of its intersection, so the total is O(n log n + k).
+import numpy as np
+
+# Candidate pairs checked per vectorized step
+PAIR_BLOCK = 1 << 22
+
+
+def _band_height(y_min, y_max):
+    heights = y_max - y_min
+    heights = heights[heights > 0]
+    return float(np.median(heights)) if len(heights) else 1.0
+
+
+def find_overlaps(x_min, y_min, x_max, y_max, return_pairs=False, band_height=None):
+    x_min = np.asarray(x_min, dtype=np.float64)
+    y_min = np.asarray(y_min, dtype=np.float64)
+    x_max = np.asarray(x_max, dtype=np.float64)
+    y_max = np.asarray(y_max, dtype=np.float64)
+    n = len(x_min)
+    empty_pairs = np.empty((0, 2), dtype=np.int64)
+    if n < 2:
+        return (0, empty_pairs) if return_pairs else 0
+
+    if band_height is None:
+        band_height = _band_height(y_min, y_max)
+    y0 = y_min.min()
+    first_band = np.floor((y_min - y0) / band_height).astype(np.int64)
+    # A cell touching a band boundary from below does not enter the next band
+    last_band = np.maximum(np.ceil((y_max - y0) / band_height).astype(np.int64) - 1, first_band)
+
+    # One (band, cell) entry per band a cell spans
+    spans = last_band - first_band + 1
+    cells = np.repeat(np.arange(n, dtype=np.int64), spans)
+    band_starts = np.concatenate([[0], np.cumsum(spans)[:-1]])
+    bands = first_band[cells] + (np.arange(len(cells)) - np.repeat(band_starts, spans))
+
+    order = np.lexsort((x_min[cells], bands))
+    cells = cells[order]
+    bands = bands[order]
+
+    # Candidates of an entry are the entries after it in its band whose x_min
+    # is below its x_max: one binary search per band, then the pairs of all
+    # bands are checked together
+    m = len(cells)
+    xs = x_min[cells]
+    band_bounds = np.concatenate([[0], np.flatnonzero(np.diff(bands)) + 1, [m]])
+    stop = np.empty(m, dtype=np.int64)
+    for start, end in zip(band_bounds[:-1].tolist(), band_bounds[1:].tolist()):
+        stop[start:end] = start + np.searchsorted(xs[start:end], x_max[cells[start:end]], side='left')
+    num_candidates = np.maximum(stop - np.arange(1, m + 1), 0)
+    cumulative = np.cumsum(num_candidates)
+
+    count = 0
+    pairs = []
+    # Candidate pairs are expanded a block of entries at a time to bound memory
+    splits = np.searchsorted(cumulative, np.arange(PAIR_BLOCK, int(cumulative[-1]), PAIR_BLOCK))
+    for start, end in zip(np.concatenate([[0], splits]), np.concatenate([splits, [m]])):
+        block = num_candidates[start:end]
+        total = int(block.sum())
+        if not total:
+            continue
+        first = np.repeat(np.arange(start, end), block)
+        second = first + 1 + (np.arange(total) - np.repeat(np.cumsum(block) - block, block))
+        a = cells[first]
+        b = cells[second]
+
+        bottom = np.maximum(y_min[a], y_min[b])
+        hit = (
+            (x_min[a] < x_max[b]) &
+            (y_min[a] < y_max[b]) & (y_min[b] < y_max[a]) &
+            (np.floor((bottom - y0) / band_height).astype(np.int64) == bands[first])
+        )
+        count += int(np.count_nonzero(hit))
+        if return_pairs:
+            pairs.append(np.column_stack([a[hit], b[hit]]))
+
+    if return_pairs:
+        return count, np.concatenate(pairs) if pairs else empty_pairs
+    return count
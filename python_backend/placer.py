@@ -0,0 +1,272 @@
+# python_backend/placer.py
+#
+# Quadratic global placement. Wirelength uses the Bound2Bound net model
+# (Spindler, Schlichtmann and Johannes, TCAD 2008): every pin of a net is tied
+# to the net's leftmost and rightmost pin with weight 2 / ((p - 1) * distance),
+# so the quadratic cost equals the HPWL at the current positions. Pins sit at
+# their node's corner plus the netlist's pin_dx/pin_dy, as for HPWL. x and y are
+# separate sparse SPD systems over the movable cells, solved by
+# Jacobi-preconditioned conjugate gradient warm-started from the last solution.
+#
+# Density: cells are binned on a grid whose capacity is the row area minus the
+# fixed terminals. After each solve the cells are spread, first along x in
+# every bin row, then along y in every bin column: each keeps its order in the
+# band and moves to where the band's cumulative capacity matches the cell area
+# before it (the rough legalization step of SimPL, Kim, Lee and Markov, ICCAD
+# 2010, done as one interpolation). The spread positions become anchors with a
+# growing weight in the next solve, and the last ones are the result; a
+# legalizer finishes the job. Terminals never move.
+import numpy as np
+
+from design import Placement
+from hpwl import total_hpwl
+
+try:
+    import scipy.sparse
+except ImportError:
+    scipy = None
+
+MIN_DISTANCE = 1e-3
+
+
+def _bound2bound(pins, offsets, pos, pin_offset, min_distance):
+    # Edges (i, j, di, dj, weight) of the Bound2Bound model for one dimension:
+    # the pin at pos[i] + di is tied to the one at pos[j] + dj
+    degrees = np.diff(offsets)
+    nets = np.flatnonzero(degrees >= 2)
+    net_of = np.repeat(np.arange(len(degrees)), degrees)
+    at = pos[pins] + pin_offset
+    order = np.lexsort((at, net_of))
+    ordered, ordered_offset, ordered_at = pins[order], pin_offset[order], at[order]
+    first, last = offsets[:-1][nets], offsets[1:][nets] - 1
+
+    inner = np.ones(len(ordered), dtype=bool)
+    inner[offsets[:-1][degrees > 0]] = False
+    inner[offsets[1:][degrees > 0] - 1] = False
+    inner &= degrees[net_of] >= 2
+    inner_pins = np.flatnonzero(inner)
+    inner_nets = net_of[inner]
+    lows = np.zeros(len(degrees), dtype=np.int64)
+    highs = np.zeros(len(degrees), dtype=np.int64)
+    lows[nets], highs[nets] = first, last
+
+    # Positions in the sorted pins of both ends of every edge
+    a = np.concatenate([inner_pins, inner_pins, first])
+    b = np.concatenate([lows[inner_nets], highs[inner_nets], last])
+    scale = 2.0 / (degrees - 1).clip(min=1)
+    weight = np.concatenate([scale[inner_nets], scale[inner_nets], scale[nets]])
+    weight = weight / np.maximum(np.abs(ordered_at[a] - ordered_at[b]), min_distance)
+    i, j = ordered[a], ordered[b]
+    keep = i != j
+    return i[keep], j[keep], ordered_offset[a][keep], ordered_offset[b][keep], weight[keep]
+
+
+def _system(index, pos, edges, anchor_weight, anchors):
+    # Diagonal, off-diagonal COO entries and right-hand side over the movable cells
+    i, j, di, dj, weight = edges
+    mi, mj = index[i], index[j]
+    n = int(index.max()) + 1
+    both = (mi >= 0) & (mj >= 0)
+    only_i = (mi >= 0) & (mj < 0)
+    only_j = (mi < 0) & (mj >= 0)
+    on_i, on_j = both | only_i, both | only_j
+
+    # Start from the anchors: bincount over no pins at all (no fixed cells) is integer
+    diag = anchor_weight + np.bincount(mi[on_i], weight[on_i], minlength=n)
+    diag += np.bincount(mj[on_j], weight[on_j], minlength=n)
+    # A cell is pulled to where its pin meets the other one: the other pin's
+    # offset minus its own, plus the other cell's position when that one is fixed
+    rhs = anchor_weight * anchors + np.bincount(mi[on_i], (weight * (dj - di))[on_i], minlength=n)
+    rhs += np.bincount(mj[on_j], (weight * (di - dj))[on_j], minlength=n)
+    rhs += np.bincount(mi[only_i], weight[only_i] * pos[j[only_i]], minlength=n)
+    rhs += np.bincount(mj[only_j], weight[only_j] * pos[i[only_j]], minlength=n)
+
+    rows = np.concatenate([mi[both], mj[both]])
+    cols = np.concatenate([mj[both], mi[both]])
+    values = -np.concatenate([weight[both], weight[both]])
+    return diag, (rows, cols, values), rhs
+
+
+def _matvec(diag, entries, n):
+    rows, cols, values = entries
+    if scipy is not None:
+        matrix = scipy.sparse.csr_matrix((values, (rows, cols)), shape=(n, n))
+        return lambda v: diag * v + matrix @ v
+    return lambda v: diag * v + np.bincount(rows, values * v[cols], minlength=n)
+
+
+def _conjugate_gradient(matvec, diag, rhs, x, tolerance=1e-5, max_iterations=100):
+    r = rhs - matvec(x)
+    z = r / diag
+    p = z.copy()
+    rz = r @ z
+    limit = tolerance * max(np.linalg.norm(rhs), 1e-12)
+    for _ in range(max_iterations):
+        if np.linalg.norm(r) <= limit:
+            break
+        ap = matvec(p)
+        step = rz / (p @ ap)
+        x = x + step * p
+        r = r - step * ap
+        z = r / diag
+        rz, previous = r @ z, rz
+        p = z + (rz / previous) * p
+    return x
+
+
+class BinGrid:
+    # Capacity of each bin: row area minus the fixed terminals over it
+    def __init__(self, row_index, nodes, placements, bins):
+        self.x_min, self.y_min = float(row_index.x0.min()), float(row_index.y0.min())
+        self.x_max, self.y_max = row_index.max_x, row_index.max_y
+        self.bins = bins
+        self.x_edges = np.linspace(self.x_min, self.x_max, bins + 1)
+        self.y_edges = np.linspace(self.y_min, self.y_max, bins + 1)
+        capacity = self._area(row_index.x0, row_index.y0, row_index.x1, row_index.y1)
+        fixed = np.flatnonzero(nodes.is_terminal & placements.placed)
+        x, y = placements.x[fixed], placements.y[fixed]
+        capacity -= self._area(x, y, x + np.abs(nodes.width[fixed]), y + np.abs(nodes.height[fixed]))
+        self.capacity = np.maximum(capacity, 0.0)
+
+    def _overlap(self, lo, hi, edges):
+        # (rects, bins) length of [lo, hi) inside each bin
+        return np.clip(np.minimum(hi[:, None], edges[None, 1:]) - np.maximum(lo[:, None], edges[None, :-1]), 0, None)
+
+    def _area(self, x0, y0, x1, y1, chunk=4096):
+        area = np.zeros((self.bins, self.bins))
+        for start in range(0, len(x0), chunk):
+            s = slice(start, start + chunk)
+            area += self._overlap(y0[s], y1[s], self.y_edges).T @ self._overlap(x0[s], x1[s], self.x_edges)
+        return area
+
+    def locate(self, cx, cy):
+        bx = np.clip(np.searchsorted(self.x_edges, cx, side='right') - 1, 0, self.bins - 1)
+        by = np.clip(np.searchsorted(self.y_edges, cy, side='right') - 1, 0, self.bins - 1)
+        return bx, by
+
+    def usage(self, bx, by, area):
+        return np.bincount(by * self.bins + bx, area, minlength=self.bins * self.bins).reshape(self.bins, self.bins)
+
+    def overflow(self, usage, target_density):
+        return float(np.maximum(usage - self.capacity * target_density, 0).sum())
+
+
+def _spread(pos, band, area, capacity, edges, target_density=1.0):
+    # Cells of each band (a bin row, or a bin column) keep their order along
+    # the axis but are moved so their cumulative area follows the band's
+    # cumulative capacity filled to target_density. Cells that need less than
+    # that fill one stretch of it, centred where they sit now, and leave the
+    # rest of the band as slack. capacity is (bands, bins).
+    bands = len(capacity)
+    order = np.lexsort((pos, band))
+    band_sorted = band[order]
+    cumulative = np.cumsum(area[order])
+    band_area = np.bincount(band, area, minlength=bands)
+    band_start = np.concatenate([[0.0], np.cumsum(band_area)[:-1]])
+
+    # One monotone lookup for all bands: band b covers [b, b + 1]
+    band_capacity = capacity.sum(axis=1)
+    usable = band_capacity > 0
+    cdf = np.concatenate([np.zeros((bands, 1)), np.cumsum(capacity, axis=1)], axis=1)
+    cdf = cdf / np.where(usable, band_capacity, 1.0)[:, None] + np.arange(bands)[:, None]
+    # Positions of band b shifted past those of band b - 1
+    extent = edges[-1] - edges[0] + 1.0
+    shifted = np.arange(bands)[:, None] * extent + edges
+    now = np.interp(pos[order] + band_sorted * extent, shifted.ravel(), cdf.ravel()) - band_sorted
+
+    # Share of the band's capacity the cells take, and where that stretch starts
+    fill = np.maximum(np.maximum(band_capacity * target_density, band_area), 1e-12)
+    share = band_area / fill
+    centre = np.bincount(band_sorted, area[order] * now, minlength=bands) / np.maximum(band_area, 1e-12)
+    start = np.clip(centre - share / 2, 0.0, 1.0 - share)
+    fraction = start[band_sorted] + (cumulative - area[order] / 2 - band_start[band_sorted]) / fill[band_sorted]
+    spread = np.interp(fraction + band_sorted, cdf.ravel(), np.tile(edges, bands))
+    result = pos.copy()
+    result[order] = np.where(usable[band_sorted], spread, pos[order])
+    return result
+
+
+def global_place(nodes, nets, row_index, placements, iterations=30, target_density=1.0,
+                 min_improvement=0.002, cells_per_bin=16, seed=0, progress=None):
+    # Returns (placement, stats). Movable cells start near the core centre; the
+    # loop ends early once a round improves the HPWL of the spread positions by
+    # less than min_improvement. Spreading fills bins up to target_density of
+    # their capacity, and overflow is the cell area above that in the spread
+    # positions, as a fraction of the movable area.
+    movable = np.flatnonzero(~nodes.is_terminal)
+    result = Placement(nodes, placements.x.copy(), placements.y.copy(), placements.placed.copy())
+    if not len(movable) or not len(row_index):
+        return result, {"iterations": 0, "overflow": 0.0}
+
+    width = np.abs(nodes.width[movable])
+    height = np.abs(nodes.height[movable])
+    area = width * height
+    grid = BinGrid(row_index, nodes, placements,
+                   int(np.clip(np.sqrt(len(movable) / cells_per_bin), 2, 512)))
+    x_lo, x_hi = grid.x_min, np.maximum(grid.x_max - width, grid.x_min)
+    y_lo, y_hi = grid.y_min, np.maximum(grid.y_max - height, grid.y_min)
+
+    index = np.full(len(nodes), -1, dtype=np.int64)
+    index[movable] = np.arange(len(movable))
+    # Pins on nodes without a position take no part
+    pins, offsets = nets.pins, nets.offsets
+    valid = pins >= 0
+    valid[valid] = (index[pins[valid]] >= 0) | placements.placed[pins[valid]]
+    counts = np.concatenate([[0], np.cumsum(valid)])
+    pins, offsets = pins[valid], counts[offsets]
+    no_offsets = np.zeros(len(nets.pins))
+    pin_dx = (nets.pin_dx if nets.pin_dx is not None else no_offsets)[valid]
+    pin_dy = (nets.pin_dy if nets.pin_dy is not None else no_offsets)[valid]
+
+    rng = np.random.default_rng(seed)
+    span = max(grid.x_max - grid.x_min, grid.y_max - grid.y_min)
+    x = (grid.x_min + grid.x_max) / 2 - width / 2 + rng.normal(0, span * 1e-3, len(movable))
+    y = (grid.y_min + grid.y_max) / 2 - height / 2 + rng.normal(0, span * 1e-3, len(movable))
+    min_distance = max(MIN_DISTANCE, float(width.mean()) * 0.01)
+    anchor_x, anchor_y = x.copy(), y.copy()
+    # A tiny pull keeps cells without nets well defined
+    anchor_weight = np.full(len(movable), 1e-6)
+    result.placed[movable] = True
+    history = []
+    wirelength = []
+
+    def overflow_of(x, y):
+        bx, by = grid.locate(x + width / 2, y + height / 2)
+        return grid.overflow(grid.usage(bx, by, area), target_density) / max(float(area.sum()), 1e-9)
+
+    for it in range(iterations):
+        for pos, anchors, coordinate, pin_offset in ((x, anchor_x, result.x, pin_dx),
+                                                     (y, anchor_y, result.y, pin_dy)):
+            coordinate[movable] = pos
+            edges = _bound2bound(pins, offsets, coordinate, pin_offset, min_distance)
+            diag, entries, rhs = _system(index, coordinate, edges, anchor_weight, anchors)
+            pos[:] = _conjugate_gradient(_matvec(diag, entries, len(movable)), diag, rhs, pos)
+        np.clip(x, x_lo, x_hi, out=x)
+        np.clip(y, y_lo, y_hi, out=y)
+        cx, cy = x + width / 2, y + height / 2
+        _, by = grid.locate(cx, cy)
+
+        # Spread: along x within bin rows, then along y within bin columns
+        cx = _spread(cx, by, area, grid.capacity, grid.x_edges, target_density)
+        bx, _ = grid.locate(cx, cy)
+        cy = _spread(cy, bx, area, grid.capacity.T, grid.y_edges, target_density)
+        previous = anchor_x, anchor_y
+        anchor_x = np.clip(cx - width / 2, x_lo, x_hi)
+        anchor_y = np.clip(cy - height / 2, y_lo, y_hi)
+        history.append(round(overflow_of(anchor_x, anchor_y), 4))
+        result.x[movable] = anchor_x
+        result.y[movable] = anchor_y
+        wirelength.append(total_hpwl(nets, result))
+        if progress:
+            progress((it + 1) / iterations)
+        if it and wirelength[-1] > wirelength[-2] * (1 - min_improvement):
+            if wirelength[-1] > wirelength[-2]:
+                result.x[movable], result.y[movable] = previous
+                history[-1] = history[-2]
+            break
+        # Anchors pull harder every round, relative to the net weights on each cell
+        anchor_weight = np.full(len(movable), 0.01 * (it + 1)) * np.maximum(diag - anchor_weight, 1e-6)
+
+    return result, {"iterations": len(history), "overflow": history[-1], "overflow_history": history,
+                    "hpwl_history": [round(w, 2) for w in wirelength],
+                    "bins": grid.bins}
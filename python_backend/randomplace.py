@@ -0,0 +1,81 @@
+# python_backend/randomplace.py
+#
+# Random baseline placements. Every movable cell is drawn at once from a seeded
+# NumPy Generator, so a seed names a placement and runs can be reproduced and
+# compared. Terminals keep their .pl position (or stay unplaced without one).
+#
+# Free mode draws x in [0, max_x - width) and y in [0, max_y - height), the
+# die the old per-node loop used. Row mode picks a subrow tall enough for the
+# cell, with probability proportional to its number of sites, then one of the
+# sites where the cell still ends inside the subrow.
+#
+# Sample k of a seed has its own Generator, spawned from the seed as child k,
+# so it is the same however the samples are split between calls or workers.
+import numpy as np
+
+MODES = ('free', 'rows')
+
+
+def new_seed():
+    # A fresh seed to report back, so an unseeded run can still be repeated.
+    # 53 bits, so it survives a round trip through a JavaScript number
+    return int(np.random.SeedSequence().generate_state(1, dtype=np.uint64)[0] >> np.uint64(11))
+
+
+def sample_rng(seed, k):
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(k,)))
+
+
+def _free(rng, width, height, row_index):
+    span_x = np.maximum(row_index.max_x - width, 0.0)
+    span_y = np.maximum(row_index.max_y - height, 0.0)
+    return rng.random(len(width)) * span_x, rng.random(len(width)) * span_y
+
+
+def _rows(rng, width, height, row_index):
+    xs = np.empty(len(width))
+    ys = np.empty(len(width))
+    spacing = np.where(row_index.sitespacing > 0, row_index.sitespacing, 1.0)
+    # Cells of one height share their eligible subrows; there are only a few heights
+    heights, group = np.unique(height, return_inverse=True)
+    for g, h in enumerate(heights):
+        cells = np.flatnonzero(group == g)
+        rows = np.flatnonzero(row_index.height >= h)
+        if not len(rows):
+            # No row can hold these cells; fall back to the free die
+            xs[cells], ys[cells] = _free(rng, width[cells], height[cells], row_index)
+            continue
+        weights = np.cumsum(row_index.numsites[rows])
+        pick = np.searchsorted(weights, rng.random(len(cells)) * weights[-1], side='right')
+        pick = rows[np.minimum(pick, len(rows) - 1)]
+        cell_sites = np.ceil(width[cells] / spacing[pick] - 1e-9)
+        free_sites = np.maximum(row_index.numsites[pick] - cell_sites + 1, 1)
+        site = np.floor(rng.random(len(cells)) * free_sites)
+        xs[cells] = row_index.x0[pick] + site * spacing[pick]
+        ys[cells] = row_index.y0[pick]
+    return xs, ys
+
+
+def random_coordinates(nodes, row_index, placements, seed, count=1, first=0, mode='free'):
+    # (xs, ys) of shape (count, len(nodes)) for samples first..first + count - 1
+    # of the seed: terminals at their `placements` position, movable cells
+    # drawn per `mode`
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode}, expected one of {', '.join(MODES)}")
+    movable = nodes.movable_ids
+    width = np.abs(nodes.width[movable])
+    height = np.abs(nodes.height[movable])
+    draw = _rows if mode == 'rows' else _free
+    xs = np.broadcast_to(placements.x, (count, len(nodes))).copy()
+    ys = np.broadcast_to(placements.y, (count, len(nodes))).copy()
+    if len(movable) and len(row_index):
+        for k in range(count):
+            xs[k, movable], ys[k, movable] = draw(sample_rng(seed, first + k), width, height, row_index)
+    return xs, ys
+
+
+def random_placed(nodes, placements):
+    # Which nodes a random placement has a position for
+    placed = placements.placed.copy()
+    placed[nodes.movable_ids] = True
+    return placed
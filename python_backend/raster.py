@@ -0,0 +1,180 @@
+# python_backend/raster.py
+#
+# Layout renderer that draws straight into a NumPy RGB buffer. Every rectangle
+# is added to a 2D difference array (+1/-1 at its four pixel corners) and one
+# cumulative sum per axis turns that into per-pixel coverage counts, so the
+# cost is O(cells + pixels) whatever the cell sizes. Cells smaller than a pixel
+# still cover one pixel and stack, so dense regions show up as darker fill.
+# Outlines are the coverage of each rectangle minus that of its 1-pixel inset.
+import struct
+import zlib
+
+import numpy as np
+
+BACKGROUND = (255, 255, 255)
+ROW_FILL = (246, 246, 246)
+ROW_EDGE = (190, 190, 190)
+CELL_FILL = (135, 206, 235)
+CELL_EDGE = (0, 0, 255)
+TERMINAL_FILL = (255, 0, 0)
+
+MIN_TERMINAL_SIZE = 1.0
+
+
+def _png_chunk(kind, data):
+    body = kind + data
+    return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body) & 0xffffffff)
+
+
+def encode_png(pixels, palette=None, level=6):
+    # pixels: (h, w, 3) RGB, or (h, w) indices into an (n <= 256, 3) palette.
+    # Scanlines are stored unfiltered; zlib does most of the work on flat layouts.
+    height, width = pixels.shape[:2]
+    row = pixels.reshape(height, -1)
+    raw = np.empty((height, row.shape[1] + 1), dtype=np.uint8)
+    raw[:, 0] = 0
+    raw[:, 1:] = row
+
+    color_type = 2 if palette is None else 3
+    chunks = [_png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0))]
+    if palette is not None:
+        chunks.append(_png_chunk(b'PLTE', np.asarray(palette, dtype=np.uint8).tobytes()))
+    chunks.append(_png_chunk(b'IDAT', zlib.compress(raw.tobytes(), level)))
+    chunks.append(_png_chunk(b'IEND', b''))
+    return b'\x89PNG\r\n\x1a\n' + b''.join(chunks)
+
+
+def coverage(shape, x0, y0, x1, y1):
+    # Number of rectangles covering each pixel; corners are pixel indices, x1/y1 exclusive
+    height, width = shape
+    stride = width + 1
+    corners = np.concatenate([y0 * stride + x0, y0 * stride + x1, y1 * stride + x0, y1 * stride + x1])
+    signs = np.repeat(np.array([1, -1, -1, 1], dtype=np.int32), len(x0))
+    diff = np.zeros((height + 1) * stride, dtype=np.int32)
+    np.add.at(diff, corners, signs)
+    diff = diff.reshape(height + 1, stride)
+    np.cumsum(diff, axis=0, out=diff)
+    np.cumsum(diff, axis=1, out=diff)
+    return diff[:height, :width]
+
+
+class Canvas:
+    # Maps layout coordinates onto a (height, width) pixel grid, y pointing up.
+    # Each layer records per-pixel fill counts and an edge mask; the layers are
+    # composited at the end through a palette indexed by those small integers.
+    MAX_STACK = 7
+
+    def __init__(self, x_min, y_min, scale, width, height):
+        self.x_min = x_min
+        self.y_min = y_min
+        self.scale = scale
+        self.width = width
+        self.height = height
+        self.layers = []
+
+    @classmethod
+    def fit(cls, x_min, y_min, x_max, y_max, max_size):
+        # Canvas whose longer side is max_size pixels
+        span = max(x_max - x_min, y_max - y_min, 1e-9)
+        scale = (max_size - 1) / span
+        width = max(int(np.ceil((x_max - x_min) * scale)) + 1, 1)
+        height = max(int(np.ceil((y_max - y_min) * scale)) + 1, 1)
+        return cls(x_min, y_min, scale, width, height)
+
+    def pixels(self, x, y, w, h):
+        # Pixel rectangles, at least one pixel each, flipped so row 0 is the top
+        px0 = np.clip(np.floor((x - self.x_min) * self.scale), 0, self.width - 1).astype(np.int64)
+        px1 = np.clip(np.ceil((x + w - self.x_min) * self.scale), 1, self.width).astype(np.int64)
+        bottom = np.clip(np.floor((y - self.y_min) * self.scale), 0, self.height - 1).astype(np.int64)
+        top = np.clip(np.ceil((y + h - self.y_min) * self.scale), 1, self.height).astype(np.int64)
+        px1 = np.maximum(px1, px0 + 1)
+        top = np.maximum(top, bottom + 1)
+        return px0, self.height - top, px1, self.height - bottom
+
+    def fill(self, rects, color, alpha, edge):
+        px0, py0, px1, py1 = rects
+        shape = (self.height, self.width)
+        count = coverage(shape, px0, py0, px1, py1)
+        # Only cells at least 3 pixels across get an outline; smaller ones are
+        # plain fill, so dense regions read as density rather than as edges
+        outlined = (px1 - px0 > 2) & (py1 - py0 > 2)
+        if outlined.all():
+            outer = count
+        elif outlined.any():
+            outer = coverage(shape, px0[outlined], py0[outlined], px1[outlined], py1[outlined])
+        else:
+            outer = None
+        if outer is None:
+            border = np.zeros(shape, dtype=bool)
+        else:
+            inset = coverage(shape, px0[outlined] + 1, py0[outlined] + 1, px1[outlined] - 1, py1[outlined] - 1)
+            border = outer > inset
+        self.layers.append((np.minimum(count, self.MAX_STACK).astype(np.uint8), border, color, alpha, edge))
+
+    def render(self):
+        # (indices, palette): code = per layer (stack count, edge) in mixed radix,
+        # renumbered to the codes that actually occur
+        code = np.zeros((self.height, self.width), dtype=np.int32)
+        radix = 1
+        for count, border, *_ in self.layers:
+            code += radix * (count.astype(np.int32) * 2 + border)
+            radix *= (self.MAX_STACK + 1) * 2
+
+        codes = np.arange(radix)
+        palette = np.tile(np.array(BACKGROUND, dtype=np.float64), (radix, 1))
+        digits = codes
+        for _, _, color, alpha, edge in self.layers:
+            state = digits % ((self.MAX_STACK + 1) * 2)
+            digits = digits // ((self.MAX_STACK + 1) * 2)
+            count, border = state // 2, state % 2
+            # Overlapping cells stack like translucent patches
+            opacity = (1.0 - (1.0 - alpha) ** count)[:, None]
+            palette += (np.array(color) - palette) * opacity
+            palette += (np.array(edge) - palette) * (border * alpha)[:, None]
+
+        used = np.flatnonzero(np.bincount(code.ravel(), minlength=radix))
+        if len(used) > 256:
+            return palette.astype(np.uint8)[code], None
+        index = np.zeros(radix, dtype=np.uint8)
+        index[used] = np.arange(len(used))
+        return index[code], palette[used].astype(np.uint8)
+
+
+def cell_boxes(nodes, placements, ids):
+    # x, y, width, height and terminal flag of the given placed nodes as drawn;
+    # terminals get a minimum size so pads stay visible
+    x = placements.x[ids]
+    y = placements.y[ids]
+    width = np.abs(nodes.width[ids])
+    height = np.abs(nodes.height[ids])
+    is_terminal = nodes.is_terminal[ids]
+    width = np.where(is_terminal, np.maximum(width, MIN_TERMINAL_SIZE), width)
+    height = np.where(is_terminal, np.maximum(height, MIN_TERMINAL_SIZE), height)
+    return x, y, width, height, is_terminal
+
+
+def paint(canvas, row_index, rows, boxes):
+    # rows: indices into row_index to draw; boxes: cell_boxes() output
+    canvas.fill(canvas.pixels(row_index.x0[rows], row_index.y0[rows],
+                              (row_index.x1 - row_index.x0)[rows], row_index.height[rows]),
+                ROW_FILL, 1.0, ROW_EDGE)
+    x, y, width, height, is_terminal = boxes
+    cells = ~is_terminal
+    canvas.fill(canvas.pixels(x[cells], y[cells], width[cells], height[cells]), CELL_FILL, 0.7, CELL_EDGE)
+    canvas.fill(canvas.pixels(x[is_terminal], y[is_terminal], width[is_terminal], height[is_terminal]),
+                TERMINAL_FILL, 0.8, TERMINAL_FILL)
+    return encode_png(*canvas.render())
+
+
+def render_layout(nodes, placements, row_index, max_size=2000):
+    # Same content and framing as the matplotlib view, returned as PNG bytes
+    boxes = cell_boxes(nodes, placements, placements.placed_ids)
+    x, y, width, height, _ = boxes
+
+    if len(x):
+        bounds = (x.min() - 10, y.min() - 10, (x + width).max() + 10, (y + height).max() + 10)
+    elif len(row_index):
+        bounds = (row_index.x0.min(), row_index.y0.min(), row_index.max_x, row_index.max_y)
+    else:
+        bounds = (0.0, 0.0, 1.0, 1.0)
+    return paint(Canvas.fit(*bounds, max_size), row_index, np.arange(len(row_index)), boxes)
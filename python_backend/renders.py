@@ -0,0 +1,117 @@
+# python_backend/renders.py
+#
+# Rendered layout images by reference. A render is addressed by a hash of what
+# determines its pixels (design id, which placement, that placement's edit
+# version and the render options), so an unchanged state maps to the same
+# key and is drawn once. The PNG bytes are held in a byte-bounded LRU and
+# served from /render/<key>.png with the key as ETag; with a directory the
+# bytes are also written there so other worker processes can serve them.
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+def render_key(*parts):
+    digest = hashlib.blake2b("|".join(str(p) for p in parts).encode(), digest_size=16)
+    return digest.hexdigest()
+
+
+class RenderCache:
+    def __init__(self, max_bytes, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.images = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.png')
+
+    def get(self, key):
+        with self.lock:
+            png = self.images.get(key)
+            if png is not None:
+                self.images.move_to_end(key)
+                return png
+        if self.directory and all(c in '0123456789abcdef' for c in key):
+            try:
+                with open(self._path(key), 'rb') as f:
+                    png = f.read()
+            except OSError:
+                return None
+            self._remember(key, png)
+        return png
+
+    def render(self, key, draw):
+        # Key of the image, calling draw() for the PNG bytes only if it is new
+        if self.get(key) is not None:
+            with self.lock:
+                self.hits += 1
+            return key
+        with self.lock:
+            self.misses += 1
+        png = draw()
+        self._remember(key, png)
+        if self.directory:
+            self._write(key, png)
+        return key
+
+    def _remember(self, key, png):
+        with self.lock:
+            if key in self.images:
+                return
+            self.images[key] = png
+            self.bytes += len(png)
+            while self.bytes > self.max_bytes and len(self.images) > 1:
+                _, old = self.images.popitem(last=False)
+                self.bytes -= len(old)
+
+    def _write(self, key, png):
+        path = self._path(key)
+        tmp = f"{path}.tmp{os.getpid()}-{threading.get_ident()}"
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(png)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Render not stored: {e}")
+            return
+        self._evict_files()
+
+    def _evict_files(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.png'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'images': len(self.images),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'shared': self.directory is not None,
+            }
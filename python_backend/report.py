@@ -0,0 +1,90 @@
+# python_backend/report.py
+#
+# Everything the web UI's metric views show, computed together for one
+# placement: wirelength from the per-net HPWL array the design already keeps,
+# node areas, bin density and legality counts, each as one vectorized pass.
+# The caller memoizes the result per placement state.
+import numpy as np
+
+from legality import check_legality
+from placer import BinGrid
+
+
+def _stats(values):
+    if not len(values):
+        return {"count": 0, "total": 0.0, "mean": 0.0, "min": 0.0, "median": 0.0, "max": 0.0}
+    return {
+        "count": int(len(values)),
+        "total": float(values.sum()),
+        "mean": float(values.mean()),
+        "min": float(values.min()),
+        "median": float(np.median(values)),
+        "max": float(values.max()),
+    }
+
+
+def wirelength_report(nets, hpwl, bins):
+    if not len(hpwl):
+        return {"total_length": 0.0, "nets": 0, "largest_net": None, "smallest_net": None,
+                "histogram": {"edges": [], "counts": []}}
+    largest, smallest = int(np.argmax(hpwl)), int(np.argmin(hpwl))
+    counts, edges = np.histogram(hpwl, bins)
+    return {
+        "total_length": float(hpwl.sum()),
+        "nets": int(len(hpwl)),
+        "mean_length": float(hpwl.mean()),
+        # Pins naming a node the .nodes file does not have; they count for no net
+        "unbound_pins": len(nets.unknown_pins),
+        "largest_net": {"net_id": nets.net_ids[largest], "hpwl": float(hpwl[largest])},
+        "smallest_net": {"net_id": nets.net_ids[smallest], "hpwl": float(hpwl[smallest])},
+        "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+    }
+
+
+def area_report(nodes):
+    areas = np.abs(nodes.width * nodes.height)
+    return {
+        "all": _stats(areas),
+        "movable": _stats(areas[~nodes.is_terminal]),
+        "terminal": _stats(areas[nodes.is_terminal]),
+    }
+
+
+def density_report(nodes, row_index, placements, target_density=1.0, cells_per_bin=16):
+    # Movable cells binned by their centre on the grid the global placer uses;
+    # overflow is the area above target_density of each bin's free capacity,
+    # as a fraction of the movable area
+    ids = placements.placed_ids
+    ids = ids[~nodes.is_terminal[ids]]
+    bins = int(np.clip(np.sqrt(len(ids) / cells_per_bin), 2, 512))
+    grid = BinGrid(row_index, nodes, placements, bins)
+    width, height = np.abs(nodes.width[ids]), np.abs(nodes.height[ids])
+    area = width * height
+    bx, by = grid.locate(placements.x[ids] + width / 2, placements.y[ids] + height / 2)
+    usage = grid.usage(bx, by, area)
+    has_room = grid.capacity > 0
+    density = usage[has_room] / grid.capacity[has_room]
+    return {
+        "bins": bins,
+        "target_density": target_density,
+        "overflow": grid.overflow(usage, target_density) / max(float(area.sum()), 1e-9),
+        "max_density": float(density.max()) if len(density) else 0.0,
+        "overfull_bins": int(np.count_nonzero(density > target_density)),
+        # Cells over bins without any free capacity
+        "blocked_area": float(usage[~has_room].sum()),
+    }
+
+
+def placement_report(nodes, nets, row_index, placements, hpwl, bins=20, target_density=1.0):
+    # hpwl is the per-net HPWL of `placements`
+    report = {
+        "wirelength": wirelength_report(nets, hpwl, bins),
+        "node_areas": area_report(nodes),
+        "placed_nodes": len(placements),
+        "density": None,
+        "legality": None,
+    }
+    if len(row_index):
+        report["density"] = density_report(nodes, row_index, placements, target_density)
+        report["legality"] = check_legality(nodes, placements, row_index)
+    return report
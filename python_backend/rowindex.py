@@ -0,0 +1,167 @@
+# python_backend/rowindex.py
+import numpy as np
+
+
+class RowIndex:
+    # Built once from parse_scl's rows. Subrows are sorted by (coordinate, height,
+    # subrow_origin) and grouped into levels of equal (coordinate, height), so a
+    # cell's row is found with two binary searches instead of a scan over rows.
+    def __init__(self, rows):
+        rows = [r for r in rows if all(k in r for k in ('coordinate', 'height', 'subrow_origin', 'numsites', 'sitewidth'))]
+        y0 = np.array([r['coordinate'] for r in rows], dtype=np.float64)
+        height = np.array([r['height'] for r in rows], dtype=np.float64)
+        x0 = np.array([r['subrow_origin'] for r in rows], dtype=np.float64)
+        numsites = np.array([r['numsites'] for r in rows], dtype=np.float64)
+        sitewidth = np.array([r['sitewidth'] for r in rows], dtype=np.float64)
+        sitespacing = np.array([r.get('sitespacing', r['sitewidth']) for r in rows], dtype=np.float64)
+
+        order = np.lexsort((x0, height, y0))
+        self.order = order
+        self.rows = [rows[i] for i in order]
+        self.y0 = y0[order]
+        self.height = height[order]
+        self.y1 = self.y0 + self.height
+        self.x0 = x0[order]
+        self.x1 = self.x0 + (numsites * sitewidth)[order]
+        self.numsites = numsites[order]
+        self.sitewidth = sitewidth[order]
+        self.sitespacing = sitespacing[order]
+
+        # Levels: runs of subrows sharing coordinate and height
+        new_level = np.ones(len(rows), dtype=bool)
+        new_level[1:] = (np.diff(self.y0) != 0) | (np.diff(self.height) != 0)
+        self.level_start = np.concatenate([np.flatnonzero(new_level), [len(rows)]])
+        self.level_y0 = self.y0[self.level_start[:-1]]
+        self.level_y1 = self.y1[self.level_start[:-1]]
+        # Highest row top among levels 0..j; no level below j can hold a cell taller than this
+        self.level_top_prefix = np.maximum.accumulate(self.level_y1) if len(rows) else self.level_y1
+        # Widest right edge among subrows of the same level up to and including i
+        self.x1_prefix = self.x1.copy()
+        for start, end in zip(self.level_start[:-1], self.level_start[1:]):
+            self.x1_prefix[start:end] = np.maximum.accumulate(self.x1[start:end])
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def max_x(self):
+        return float(self.x1.max())
+
+    @property
+    def max_y(self):
+        return float(self.y1.max())
+
+    def find_rows(self, x, y, width, height):
+        # Index (into self.rows) of a subrow that fully contains each cell, or -1
+        x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+        y = np.atleast_1d(np.asarray(y, dtype=np.float64))
+        x_right = x + np.atleast_1d(width)
+        y_top = y + np.atleast_1d(height)
+        found = np.full(len(x), -1, dtype=np.int64)
+        if not len(self.rows):
+            return found
+
+        level = np.searchsorted(self.level_y0, y, side='right') - 1
+        pending = np.flatnonzero(level >= 0)
+        while len(pending):
+            lvl = level[pending]
+            start = self.level_start[lvl]
+            end = self.level_start[lvl + 1]
+            fits_y = self.level_y1[lvl] >= y_top[pending]
+
+            # Last subrow of the level starting at or left of x, then the widest reach up to it
+            sub = self._last_at_or_before(x[pending], start, end)
+            ok = fits_y & (sub >= start)
+            ok[ok] &= self.x1_prefix[sub[ok]] >= x_right[pending[ok]]
+            hits = pending[ok]
+            found[hits] = self._containing_subrow(x[hits], x_right[hits], start[ok], sub[ok])
+
+            # Only retry lower levels when one of them could still reach the cell's top
+            retry = ~ok & (lvl > 0)
+            retry[retry] &= self.level_top_prefix[lvl[retry] - 1] >= y_top[pending[retry]]
+            pending = pending[retry]
+            level[pending] -= 1
+        return found
+
+    def contains(self, x, y, width, height):
+        return self.find_rows(x, y, width, height) >= 0
+
+    def _last_at_or_before(self, x, start, end):
+        # Per-cell binary search of x among x0[start:end]
+        lo = start.copy()
+        hi = end.copy()
+        while True:
+            active = lo < hi
+            if not active.any():
+                break
+            mid = (lo + hi) // 2
+            go_right = active & (self.x0[np.minimum(mid, len(self.x0) - 1)] <= x)
+            lo = np.where(go_right, mid + 1, lo)
+            hi = np.where(active & ~go_right, mid, hi)
+        return lo - 1
+
+    def _containing_subrow(self, x, x_right, start, last):
+        # x1_prefix told us some subrow in start..last reaches x_right; in the
+        # usual non-overlapping case that is `last` itself
+        found = last.copy()
+        for k in np.flatnonzero(self.x1[last] < x_right):
+            i = last[k]
+            while self.x1[i] < x_right[k]:
+                i -= 1
+            found[k] = i
+        return found
+
+
+class RowCapacity:
+    # Max segment tree over the free width of every subrow. first_fit() returns
+    # the lowest subrow index with enough free width and height in O(log rows).
+    def __init__(self, row_index, free):
+        self.row_index = row_index
+        self.size = 1
+        while self.size < max(len(free), 1):
+            self.size *= 2
+        self.tree = [float('-inf')] * (2 * self.size)
+        for i, value in enumerate(free):
+            self.tree[self.size + i] = float(value)
+        for i in range(self.size - 1, 0, -1):
+            self.tree[i] = max(self.tree[2 * i], self.tree[2 * i + 1])
+
+    def free(self, i):
+        return self.tree[self.size + i]
+
+    def update(self, i, value):
+        i += self.size
+        self.tree[i] = value
+        i //= 2
+        while i:
+            self.tree[i] = max(self.tree[2 * i], self.tree[2 * i + 1])
+            i //= 2
+
+    def first_fit(self, width, height, start=0):
+        heights = self.row_index.height
+        while True:
+            i = self._first_at_least(width, start)
+            if i < 0 or heights[i] >= height:
+                return i
+            start = i + 1
+
+    def _first_at_least(self, width, start):
+        # Leftmost leaf >= start whose value is >= width, or -1
+        if start >= self.size:
+            return -1
+        tree = self.tree
+        i = start + self.size
+        # Walk up until a right-hand subtree may hold a fit
+        if tree[i] >= width:
+            return start
+        while i > 1:
+            if i % 2 == 0 and tree[i + 1] >= width:
+                i += 1
+                break
+            i //= 2
+        else:
+            return -1
+        # Then walk down to the leftmost fitting leaf
+        while i < self.size:
+            i = 2 * i if tree[2 * i] >= width else 2 * i + 1
+        return i - self.size
@@ -0,0 +1,171 @@
+# python_backend/snapshot.py
+#
+# On-disk cache of parsed designs. An upload is keyed by a hash of the raw
+# .nodes/.pl/.scl/.nets bytes; the bound NodeTable, Placement and Netlist are
+# stored as one directory of .npy files so a repeat upload is memory-mapped
+# back instead of being tokenized again. The oldest-used snapshots are removed
+# once the directory grows past its size cap.
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+from design import NodeTable, Placement
+from netlist import Netlist
+
+SNAPSHOT_VERSION = 4
+
+
+def content_key(buffers):
+    # buffers: {'nodes': buf, 'pl': buf, ...}; the file type is hashed too so
+    # swapping two files' contents gives a different key
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"v{SNAPSHOT_VERSION}".encode())
+    for ext in sorted(buffers):
+        buf = buffers[ext]
+        digest.update(f"|{ext}:{len(buf)}|".encode())
+        digest.update(buf)
+    return digest.hexdigest()
+
+
+def save_design(path, nodes, placement, netlist, rows, extra=None):
+    arrays = {
+        'node_keys': nodes.keys,
+        'node_width': nodes.width,
+        'node_height': nodes.height,
+        'node_terminal': nodes.is_terminal,
+        'node_order': nodes._order,
+        'x': placement.x,
+        'y': placement.y,
+        'placed': placement.placed,
+        'net_offsets': netlist.offsets,
+        'net_pins': netlist.pins,
+        'node_offsets': netlist.node_offsets,
+        'node_nets': netlist.node_nets,
+        **({'pin_dx': netlist.pin_dx, 'pin_dy': netlist.pin_dy} if netlist.pin_dx is not None else {}),
+        **(extra or {}),
+    }
+    for name, values in arrays.items():
+        np.save(os.path.join(path, name + '.npy'), values)
+    meta = {
+        'rows': rows,
+        'net_ids': netlist.net_ids,
+        'net_names': netlist.net_names,
+        'unknown_pins': {str(k): v for k, v in netlist.unknown_pins.items()},
+    }
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+
+def load_array(path, name, mmap_mode='r'):
+    return np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode)
+
+
+def load_design(path, placement_mode=None):
+    # Read-only arrays stay memory-mapped. The placement is copied by default
+    # because the modify endpoints write to it; 'r+' maps it writable instead.
+    def array(name, mmap_mode='r'):
+        return load_array(path, name, mmap_mode)
+
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+
+    nodes = NodeTable.from_arrays(array('node_keys'), array('node_width'), array('node_height'),
+                                  array('node_terminal'), array('node_order'))
+    placement = Placement(nodes, array('x', placement_mode), array('y', placement_mode),
+                          array('placed', placement_mode))
+    unknown_pins = {int(k): v for k, v in meta['unknown_pins'].items()}
+    has_offsets = os.path.exists(os.path.join(path, 'pin_dx.npy'))
+    netlist = Netlist(meta['net_ids'], array('net_offsets'), array('net_pins'), unknown_pins,
+                      meta.get('net_names'), array('pin_dx') if has_offsets else None,
+                      array('pin_dy') if has_offsets else None)
+    netlist.node_offsets = array('node_offsets')
+    netlist.node_nets = array('node_nets')
+    return nodes, placement, netlist, meta['rows']
+
+
+class SnapshotCache:
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def load(self, key):
+        path = self._path(key)
+        try:
+            design = load_design(path)
+        except (OSError, ValueError, KeyError):
+            with self.lock:
+                self.misses += 1
+            return None
+        # The directory mtime is the LRU clock
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self.lock:
+            self.hits += 1
+        return design
+
+    def store(self, key, nodes, placement, netlist, rows, extra=None):
+        path = self._path(key)
+        tmp = f"{path}.tmp{os.getpid()}-{threading.get_ident()}"
+        try:
+            os.makedirs(tmp, exist_ok=True)
+            save_design(tmp, nodes, placement, netlist, rows, extra)
+            os.replace(tmp, path)
+        except OSError as e:
+            # Another request may have stored the same key first
+            print(f"Snapshot not stored: {e}")
+            shutil.rmtree(tmp, ignore_errors=True)
+            return None
+        self.evict(keep=path)
+        return path
+
+    def entries(self):
+        found = []
+        for name in os.listdir(self.directory):
+            path = self._path(name)
+            if '.tmp' in name or not os.path.isdir(path):
+                continue
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+                found.append((os.stat(path).st_mtime, size, path))
+            except OSError:
+                # Evicted by a concurrent request
+                continue
+        return found
+
+    def evict(self, keep=None):
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def stats(self):
+        entries = self.entries()
+        with self.lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        }
@@ -0,0 +1,330 @@
+# python_backend/store.py
+#
+# Parsed designs keyed by design id. /process registers a Design and returns
+# its id; every other endpoint looks the design up and works on it under that
+# design's lock, so different uploads never see each other's state.
+#
+# Designs are kept in LRU order and the least recently used ones are dropped
+# once their private memory passes the budget. With a shared directory (for
+# example under /dev/shm) each design is also written there once and mapped
+# back by every worker process: the parsed arrays are shared read-only, the
+# placements are mapped writable, and a version counter in the same
+# directory tells a worker when another one has moved nodes. Saved placement
+# versions are written to the directory as well (see versions.py), so their
+# ids are the same in every worker.
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+from design import NodeTable, Placement
+from hpwl import WirelengthTracker, net_hpwl, total_hpwl
+from netlist import Netlist
+from rowindex import RowIndex
+from snapshot import SnapshotCache, load_array, load_design
+from tiles import TileLayer
+from versions import PlacementVersions, SharedHeads
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def _private_bytes(*arrays):
+    # Memory-mapped arrays live in the page cache, not in this process
+    return sum(a.nbytes for a in arrays if a is not None and not isinstance(a, np.memmap))
+
+
+class DesignLock:
+    # Re-entrant per-design lock. For shared designs it also holds an flock on
+    # the design directory so other worker processes wait as well.
+    def __init__(self, path=None):
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file = open(os.path.join(path, 'lock'), 'a+') if path and fcntl else None
+
+    def __enter__(self):
+        self._lock.acquire()
+        self._depth += 1
+        if self._file and self._depth == 1:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._file and self._depth == 0:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._lock.release()
+
+
+# Placements every design holds, by name; a placement's position here is its
+# slot in Design.versions
+PLACEMENT_NAMES = ('placement', 'random', 'global')
+
+# Results derived from a placement state (rankings, reports) kept per design
+MEMO_SIZE = 16
+
+
+class Design:
+    def __init__(self, design_id, nodes, placements, nets, rows,
+                 random_placements=None, versions=None, path=None, global_placements=None, max_versions=1024):
+        self.id = design_id
+        self.nodes = nodes
+        self.placements = placements
+        self.nets = nets
+        self.rows = rows
+        self.row_index = RowIndex(rows)
+        self.random_placements = random_placements if random_placements is not None else Placement(nodes)
+        # Result of the global placer, empty until /global_placement runs
+        self.global_placements = global_placements if global_placements is not None else Placement(nodes)
+        # Running HPWL totals, kept up to date by the modify endpoints
+        self.wirelength = WirelengthTracker(nets, self.placements)
+        self.random_wirelength = WirelengthTracker(nets, self.random_placements)
+        self.global_wirelength = WirelengthTracker(nets, self.global_placements)
+        # Edit counters of the placements, in PLACEMENT_NAMES order
+        self.versions = versions if versions is not None else np.zeros(len(PLACEMENT_NAMES), dtype=np.int64)
+        self._seen = self.versions.copy()
+        self.path = path
+        self.lock = DesignLock(path)
+        # Saved states of the placements, each write recorded as a version on
+        # top of the placement's head; shared by the workers of a shared design
+        if path is None:
+            self.history = PlacementVersions(nodes, max_versions)
+        else:
+            self.history = PlacementVersions(
+                nodes, max_versions, directory=path,
+                heads=SharedHeads(PLACEMENT_NAMES, load_array(path, 'version_heads', 'r+')),
+                last_id=load_array(path, 'version_ids', 'r+'))
+        with self.lock:
+            for name in PLACEMENT_NAMES:
+                if self.placement_named(name) and name not in self.history.heads:
+                    self.history.commit_head(name, self.placement_named(name), 'loaded')
+        # Map tiles per placement name, built on first request
+        self.tile_layers = {}
+        self._memo = OrderedDict()
+
+    def placement_named(self, name):
+        return {
+            'placement': self.placements,
+            'random': self.random_placements,
+            'global': self.global_placements,
+        }.get(name)
+
+    def wirelength_of(self, placement):
+        return {
+            'placement': self.wirelength,
+            'random': self.random_wirelength,
+            'global': self.global_wirelength,
+        }[self._name_of(placement)]
+
+    def _name_of(self, placement):
+        for name in PLACEMENT_NAMES:
+            if self.placement_named(name) is placement:
+                return name
+        raise KeyError("Placement does not belong to this design")
+
+    def is_stored(self, placement):
+        # True for the design's own placements, False for a saved version
+        return any(self.placement_named(name) is placement for name in PLACEMENT_NAMES)
+
+    def total_length(self, placement):
+        if self.is_stored(placement):
+            return self.wirelength_of(placement).total
+        return total_hpwl(self.nets, placement)
+
+    def net_lengths(self, placement):
+        # Per-net HPWL; a stored placement's comes from its tracker
+        if self.is_stored(placement):
+            return self.wirelength_of(placement).hpwl.copy()
+        return net_hpwl(self.nets, placement)
+
+    def state(self, placement):
+        # Names what a placement holds right now: (name, edit count) for a stored
+        # one, ('version', id) for a saved version, which never changes
+        if self.is_stored(placement):
+            return self._name_of(placement), self.version(placement)
+        return 'version', self.history.version_of(placement)
+
+    def memo(self, kind, placement, compute):
+        # compute() once per placement state; an edit moves the state on, so
+        # stale results are never returned and age out of the cache
+        key = (kind, self.state(placement))
+        if key[1][1] is None:
+            return compute()
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            return self._memo[key]
+        value = self._memo[key] = compute()
+        while len(self._memo) > MEMO_SIZE:
+            self._memo.popitem(last=False)
+        return value
+
+    def head(self, placement):
+        # Id of the version holding the current state of a stored placement
+        return self.history.heads.get(self._name_of(placement))
+
+    def version(self, placement):
+        # Edit count of a placement; together with the design id it names its state
+        return int(self.versions[PLACEMENT_NAMES.index(self._name_of(placement))])
+
+    def tile_layer(self, name):
+        layer = self.tile_layers.get(name)
+        if layer is None:
+            placement = self.placement_named(name)
+            if placement is None:
+                return None
+            layer = self.tile_layers[name] = TileLayer(self.nodes, placement, self.row_index)
+        return layer
+
+    def before_move(self, placement, node_ids):
+        # Call before moving nodes so the tiles under their old boxes are dropped
+        layer = self.tile_layers.get(self._name_of(placement))
+        if layer is not None:
+            layer.before_move(node_ids)
+
+    def changed(self, placement, node_ids=None, label=None):
+        # Call after writing to a placement, with the lock held. Without node_ids
+        # the whole placement is treated as new. Returns the id of the version
+        # recording the new state.
+        name = self._name_of(placement)
+        k = PLACEMENT_NAMES.index(name)
+        self.versions[k] += 1
+        self._seen[k] = self.versions[k]
+        if node_ids is None:
+            self.tile_layers.pop(name, None)
+        elif name in self.tile_layers:
+            self.tile_layers[name].after_move(node_ids)
+        return self.history.commit_head(name, placement, label or ('move' if node_ids is not None else name), node_ids)
+
+    def sync(self):
+        # Recompute HPWL if another worker edited a shared placement; that
+        # worker has already saved the new state as a version
+        for k, name in enumerate(PLACEMENT_NAMES):
+            if self._seen[k] != self.versions[k]:
+                self.wirelength_of(self.placement_named(name)).refresh()
+                self.tile_layers.pop(name, None)
+        self._seen[:] = self.versions
+
+    def nbytes(self):
+        nodes, nets = self.nodes, self.nets
+        tiles = sum(len(png) for layer in self.tile_layers.values() for png in layer.tiles.values())
+        return tiles + _private_bytes(
+            nodes.keys, nodes._sorted_keys, nodes._order, nodes.width, nodes.height, nodes.is_terminal,
+            nets.offsets, nets.pins, nets.node_offsets, nets.node_nets, nets._net_of_pin, nets.pin_dx, nets.pin_dy,
+            self.placements.x, self.placements.y, self.placements.placed,
+            self.random_placements.x, self.random_placements.y, self.random_placements.placed,
+            self.global_placements.x, self.global_placements.y, self.global_placements.placed,
+            self.wirelength.hpwl, self.random_wirelength.hpwl, self.global_wirelength.hpwl,
+        ) + self.history.nbytes() + sum(v.nbytes() for v in self._memo.values() if hasattr(v, 'nbytes'))
+
+
+class DesignStore:
+    def __init__(self, max_bytes, shared_dir=None, shared_max_bytes=None, max_versions=1024):
+        self.max_bytes = max_bytes
+        self.max_versions = max_versions
+        self.designs = OrderedDict()
+        self.latest = None
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.shared = SnapshotCache(shared_dir, shared_max_bytes or max_bytes) if shared_dir else None
+        empty = NodeTable()
+        self.empty = Design(None, empty, Placement(empty), Netlist([], [0], []), [])
+
+    def add(self, nodes, placements, nets, rows):
+        design_id = uuid.uuid4().hex
+        if self.shared is not None:
+            design = self._publish(design_id, nodes, placements, nets, rows)
+        else:
+            design = Design(design_id, nodes, placements, nets, rows, max_versions=self.max_versions)
+        with self.lock:
+            self.designs[design_id] = design
+            self.latest = design_id
+            self._evict(keep=design_id)
+        if self.shared is not None:
+            with open(os.path.join(self.shared.directory, 'latest'), 'w') as f:
+                f.write(design_id)
+        return design
+
+    def get(self, design_id=None):
+        # No id means the most recent upload (or an empty design before any)
+        if design_id is None:
+            design_id = self._latest_id()
+            if design_id is None:
+                return self.empty
+        with self.lock:
+            design = self.designs.get(design_id)
+            if design is not None:
+                self.designs.move_to_end(design_id)
+                return design
+        if self.shared is None:
+            return None
+        design = self._attach(design_id)
+        if design is not None:
+            with self.lock:
+                design = self.designs.setdefault(design_id, design)
+                self._evict(keep=design_id)
+        return design
+
+    def _latest_id(self):
+        if self.shared is not None:
+            try:
+                with open(os.path.join(self.shared.directory, 'latest')) as f:
+                    return f.read().strip() or None
+            except OSError:
+                pass
+        return self.latest
+
+    def _evict(self, keep):
+        total = sum(d.nbytes() for d in self.designs.values())
+        for design_id in list(self.designs):
+            if total <= self.max_bytes:
+                break
+            if design_id == keep:
+                continue
+            total -= self.designs.pop(design_id).nbytes()
+            self.evictions += 1
+            print(f"Evicted design {design_id}")
+
+    def _publish(self, design_id, nodes, placements, nets, rows):
+        extra = {'versions': np.zeros(len(PLACEMENT_NAMES), dtype=np.int64),
+                 'version_heads': np.zeros(len(PLACEMENT_NAMES), dtype=np.int64),
+                 'version_ids': np.zeros(1, dtype=np.int64)}
+        for name in PLACEMENT_NAMES[1:]:
+            empty = Placement(nodes)
+            extra.update({f'{name}_x': empty.x, f'{name}_y': empty.y, f'{name}_placed': empty.placed})
+        if self.shared.store(design_id, nodes, placements, nets, rows, extra) is None:
+            raise OSError(f"Could not write design {design_id} to {self.shared.directory}")
+        return self._attach(design_id)
+
+    def _attach(self, design_id):
+        if not all(c in '0123456789abcdef' for c in design_id):
+            return None
+        path = os.path.join(self.shared.directory, design_id)
+        try:
+            nodes, placements, nets, rows = load_design(path, placement_mode='r+')
+            random_placements, global_placements = (
+                Placement(nodes, load_array(path, f'{name}_x', 'r+'), load_array(path, f'{name}_y', 'r+'),
+                          load_array(path, f'{name}_placed', 'r+'))
+                for name in PLACEMENT_NAMES[1:])
+            versions = load_array(path, 'versions', 'r+')
+        except (OSError, ValueError, KeyError):
+            return None
+        return Design(design_id, nodes, placements, nets, rows, random_placements, versions, path,
+                      global_placements, self.max_versions)
+
+    def stats(self):
+        with self.lock:
+            designs = list(self.designs.values())
+            stats = {
+                'designs': len(designs),
+                'bytes': sum(d.nbytes() for d in designs),
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+                'shared': self.shared is not None,
+            }
+        if self.shared is not None:
+            stats['shared_store'] = self.shared.stats()
+        return stats
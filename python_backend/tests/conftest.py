@@ -0,0 +1,51 @@
+# python_backend/tests/conftest.py
+import io
+import uuid
+
+import pytest
+
+import app as backend
+from snapshot import SnapshotCache
+
+
+def bookshelf_files(cells=6, rows=2, sites=20):
+    # .nodes/.pl/.scl/.nets of a small design: cells of width 2 side by side in
+    # the first row, one terminal, and a chain of two-pin nets. A unique comment
+    # gives every call its own content key, so snapshots of earlier runs never hit
+    names = [f"Cell{k}" for k in range(cells)] + ["Pad"]
+    tag = f"# {uuid.uuid4().hex}\n"
+    nodes = f"UCLA nodes 1.0\n{tag}NumNodes : {len(names)}\nNumTerminals : 1\n"
+    nodes += "".join(f"  {name} 2 1\n" for name in names[:-1]) + "  Pad 1 1 terminal\n"
+    pl = "UCLA pl 1.0\n" + "".join(f"{name} {3 * k} 0 : N\n" for k, name in enumerate(names[:-1]))
+    pl += f"Pad {sites + 2} 0 : N /FIXED\n"
+    scl = f"UCLA scl 1.0\nNumRows : {rows}\n" + "".join(
+        f"CoreRow Horizontal\n  Coordinate : {r}\n  Height : 1\n  Sitewidth : 1\n  Sitespacing : 1\n"
+        f"  Siteorient : 1\n  Sitesymmetry : 1\n  SubrowOrigin : 0 NumSites : {sites}\nEnd\n"
+        for r in range(rows))
+    chain = list(zip(names, names[1:]))
+    nets = f"UCLA nets 1.0\nNumNets : {len(chain)}\nNumPins : {2 * len(chain)}\n" + "".join(
+        f"NetDegree : 2 net_{a.lower()}\n  {a} I : 0.5 0\n  {b} O : -0.5 0\n" for a, b in chain)
+    return {ext: text.encode() for ext, text in (('nodes', nodes), ('pl', pl), ('scl', scl), ('nets', nets))}
+
+
+@pytest.fixture(autouse=True)
+def snapshots(tmp_path, monkeypatch):
+    # Uploads cache their parsed designs under the test's own directory
+    cache = SnapshotCache(str(tmp_path / 'snapshots'), 1 << 30)
+    monkeypatch.setattr(backend, 'snapshots', cache)
+    return cache
+
+
+@pytest.fixture
+def client():
+    return backend.app.test_client()
+
+
+@pytest.fixture
+def upload(client):
+    # upload(files, **query) posts the files to /process and returns the response
+    def post(files=None, **query):
+        files = files or bookshelf_files()
+        data = {'files': [(io.BytesIO(text), f"design.{ext}") for ext, text in files.items()]}
+        return client.post('/process', data=data, query_string=query, content_type='multipart/form-data')
+    return post
@@ -0,0 +1,80 @@
+# python_backend/tests/test_app.py
+import time
+
+import numpy as np
+import pytest
+
+import app as backend
+from bookshelf import parse_design
+from netlist import Netlist
+from tests.conftest import bookshelf_files
+from tests.test_legalize import make_design
+
+
+@pytest.fixture
+def design():
+    rows = [{'coordinate': float(k), 'height': 1.0, 'subrow_origin': 0.0,
+             'numsites': 10, 'sitewidth': 1.0, 'sitespacing': 1.0} for k in range(2)]
+    nodes, placements = make_design([0.0, 3.0, 6.0], [0.0, 1.0, 0.0], [2.0, 2.0, 2.0])
+    nets = Netlist.from_columns(nodes, ['n0'], np.array([0, 3]), ['c0', 'c1', 'c2'])
+    return backend.designs.add(nodes, placements, nets, rows)
+
+
+def render_etag(client, design, **kwargs):
+    response = client.get('/visualize_layout', query_string={'design_id': design.id}, **kwargs)
+    assert response.status_code == 200
+    return response.headers['ETag']
+
+
+def test_version_from_the_json_body_is_rendered(design):
+    client = backend.app.test_client()
+    version_id = design.head(design.placements)
+    by_json = render_etag(client, design, json={'version': str(version_id)})
+    by_query = client.get('/visualize_layout', query_string={'design_id': design.id, 'version': version_id})
+    assert by_query.headers['ETag'] == by_json
+
+
+def test_version_renders_are_named_by_their_positions(design):
+    # Version ids are numbered per process, so equal ids need not mean equal positions
+    client = backend.app.test_client()
+    moved = design.placements.copy()
+    moved.x[0] = 4.0
+    same = design.history.commit(design.placements.copy())
+    other = design.history.commit(moved)
+    head = design.head(design.placements)
+    keys = [render_etag(client, design, json={'version': str(v)}) for v in (head, same, other)]
+    assert keys[0] == keys[1] != keys[2]
+
+
+def job_result(client, response):
+    assert response.status_code == 202
+    job = backend.jobs.get(response.get_json()['job_id']).wait(30)
+    assert job.status == 'done', job.error
+    return client.get(response.headers['Location']).get_json()['result']
+
+
+def test_concurrent_identical_uploads_get_designs_of_their_own(client, upload, monkeypatch):
+    # The parse is slowed down so the second upload arrives while the first is parsing
+    calls = []
+
+    def slow_parse(*args):
+        calls.append(1)
+        time.sleep(0.3)
+        return parse_design(*args)
+
+    monkeypatch.setattr(backend, 'parse_design', slow_parse)
+    files = bookshelf_files()
+    first, second = upload(files, **{'async': 1}), upload(files, **{'async': 1})
+    first, second = job_result(client, first), job_result(client, second)
+    assert len(calls) == 1
+    assert first['design_id'] != second['design_id']
+
+    moved = client.post('/modify_node_coordinates', json={'design_id': first['design_id'],
+                                                           'node_id': 'cell0', 'x': 7, 'y': 1})
+    assert moved.status_code == 200
+    coordinates = [client.get('/get_node_coordinates/cell0', query_string={'design_id': d['design_id']})
+                   .get_json()['coordinates'] for d in (first, second)]
+    assert coordinates == [{'x': 7.0, 'y': 1.0}, {'x': 0.0, 'y': 0.0}]
+    versions = [client.get('/versions', query_string={'design_id': d['design_id']}).get_json()['versions']
+                for d in (first, second)]
+    assert len(versions[0]) == len(versions[1]) + 1
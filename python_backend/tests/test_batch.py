@@ -0,0 +1,71 @@
+# python_backend/tests/test_batch.py
+import pytest
+
+import app as backend
+
+
+def state(client, design_id):
+    # Everything a batch move may change: coordinates, wirelength and versions
+    query = {'design_id': design_id}
+    design = backend.designs.get(design_id)
+    return {
+        'nodes': client.post('/get_nodes_coordinates', query_string=query,
+                             json={'node_ids': [f"cell{k}" for k in range(6)]}).get_json(),
+        'total': client.get('/calculate_wire_length', query_string=query).get_json(),
+        'versions': client.get('/versions', query_string=query).get_json(),
+        'edits': design.version(design.placements)
+    }
+
+
+@pytest.mark.parametrize('moves, missing', [
+    ([{'node_id': 'cell0', 'x': 5, 'y': 1}, {'node_id': 'nope', 'x': 1, 'y': 1}], ['nope']),
+    ([['cell0', 5, 1], ['cell1', 7, 1], ['nope', 1, 1], ['other', 2, 2]], ['nope', 'other']),
+])
+def test_unknown_node_moves_nothing(client, upload, moves, missing):
+    design_id = upload().headers['X-Design-Id']
+    before = state(client, design_id)
+    response = client.post('/batch_modify_node_coordinates', query_string={'design_id': design_id},
+                           json={'moves': moves})
+    assert response.status_code == 404
+    assert response.get_json() == {"error": f"{len(missing)} nodes not found", "missing": missing}
+    assert state(client, design_id) == before
+
+
+@pytest.mark.parametrize('moves', [
+    'cell0',
+    [['cell0', 5]],
+    [['cell0', 5, 1], ['cell1', 'far', 1]],
+    [['cell0', 5, 1], ['cell1', float('inf'), 1]],
+])
+def test_invalid_moves_move_nothing(client, upload, moves):
+    design_id = upload().headers['X-Design-Id']
+    before = state(client, design_id)
+    response = client.post('/batch_modify_node_coordinates', query_string={'design_id': design_id},
+                           json={'moves': moves})
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith("Invalid moves")
+    assert state(client, design_id) == before
+
+
+def test_batch_moves_match_single_moves(client, upload):
+    design_id = upload().headers['X-Design-Id']
+    query = {'design_id': design_id}
+    moves = [['Cell1', 7, 1], {'node_id': 'cell4', 'x': 0, 'y': 1}, ['cell1', 9, 0]]
+    result = client.post('/batch_modify_node_coordinates', query_string=query, json={'moves': moves}).get_json()
+
+    # cell1's last move wins; the totals are those of a full recompute
+    after = state(client, design_id)
+    positions = {n['node_id']: (n['x'], n['y']) for n in after['nodes']['nodes']}
+    assert positions['cell1'] == (9.0, 0.0) and positions['cell4'] == (0.0, 1.0)
+    assert result['moved_nodes'] == 2
+    assert result['updated_total_wirelength'] == pytest.approx(after['total']['total_length'])
+    assert sorted(net['net_id'] for net in result['affected_nets']) == ['n0', 'n1', 'n3', 'n4']
+    assert result['affected_net_count'] == 4
+    for net in result['affected_nets']:
+        length = client.get(f"/calculate_net_length/{net['net_id']}", query_string=query).get_json()
+        assert net['length'] == pytest.approx(length['wire_length'], abs=0.01)
+
+    # One version for the whole batch
+    assert after['versions']['heads']['placement'] == result['version_id']
+    assert [v['label'] for v in after['versions']['versions']][-1] == 'batch'
+    assert len(after['versions']['versions']) == 2
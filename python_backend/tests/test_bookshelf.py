@@ -0,0 +1,67 @@
+# python_backend/tests/test_bookshelf.py
+import io
+
+import numpy as np
+
+from bookshelf import parse_nets
+
+NETS = b"""UCLA nets 1.0
+# comment line
+
+NumNets : 4
+NumPins : 9
+
+NetDegree : 2   first
+  a I : 0.5 -1.0
+  b O : 0.000000 2.25
+NetDegree: 3 second
+  C I : 1 1
+  d B
+  e I : -0.5 0.5
+NetDegree : 2
+  a I : 0 0
+  f O : 0 0
+NetDegree:  2   fourth
+  b I
+  c O : 3 4
+NetDegree :1 fifth
+  a I : 0 0
+NetDegree:1
+  a I : 0 0
+"""
+
+
+def reference_nets(text):
+    # Line-by-line reading of a .nets file: (name, [(pin, xoff, yoff)]) per net
+    nets = []
+    for line in text.decode().splitlines():
+        parts = line.split()
+        if not parts:
+            continue
+        if parts[0].startswith('NetDegree'):
+            rest = line.replace('NetDegree', '', 1).replace(':', ' ', 1).split()
+            nets.append((rest[1] if len(rest) > 1 else None, []))
+        elif nets:
+            offset = (float(parts[3]), float(parts[4])) if len(parts) >= 5 and parts[2] == ':' else (0.0, 0.0)
+            nets[-1][1].append((parts[0].lower(), *offset))
+    return nets
+
+
+def test_parse_nets_matches_a_line_by_line_reading():
+    net_ids, offsets, pin_names, net_names, (pin_x, pin_y) = parse_nets(io.BytesIO(NETS))
+    expected = reference_nets(NETS)
+
+    assert net_ids == [f"n{k}" for k in range(len(expected))]
+    assert net_names == [name or f"n{k}" for k, (name, _) in enumerate(expected)]
+    pins = [pin for _, net in expected for pin in net]
+    assert offsets.tolist() == np.cumsum([0] + [len(net) for _, net in expected]).tolist()
+    assert [p.decode() for p in pin_names.tolist()] == [pin for pin, _, _ in pins]
+    assert pin_x.tolist() == [x for _, x, _ in pins]
+    assert pin_y.tolist() == [y for _, _, y in pins]
+
+
+def test_attached_colon_opens_a_net():
+    _, offsets, pin_names, net_names, _ = parse_nets(io.BytesIO(b"NetDegree: 1 x\n  a I\nNetDegree:2\n  b I\n  c I\n"))
+    assert offsets.tolist() == [0, 1, 3]
+    assert b'netdegree:2' not in pin_names.tolist()
+    assert net_names == ['x', 'n1']
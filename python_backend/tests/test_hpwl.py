@@ -0,0 +1,78 @@
+# python_backend/tests/test_hpwl.py
+import numpy as np
+import pytest
+
+from design import NodeTable, Placement
+from hpwl import WirelengthTracker, net_hpwl, single_net_hpwl, subset_hpwl, total_hpwl
+from netlist import Netlist
+
+
+def make_design(seed, n=60, nets=80, unplaced=0.1, unknown=0.05):
+    # Random nets of 1 to 6 pins, some on unplaced nodes and some on names
+    # the .nodes file does not have, with random pin offsets
+    rng = np.random.default_rng(seed)
+    names = [f"c{k}" for k in range(n)]
+    nodes = NodeTable(names, rng.uniform(1, 4, n), rng.uniform(1, 2, n), np.zeros(n, dtype=bool))
+    placements = Placement(nodes, rng.uniform(0, 100, n), rng.uniform(0, 100, n), rng.random(n) >= unplaced)
+    offsets = np.concatenate([[0], np.cumsum(rng.integers(1, 7, nets))])
+    pin_names = [names[p] if rng.random() >= unknown else f"missing{p}" for p in rng.integers(0, n, offsets[-1])]
+    pin_offsets = (rng.uniform(-1, 1, offsets[-1]), rng.uniform(-1, 1, offsets[-1]))
+    netlist = Netlist.from_columns(nodes, [f"n{k}" for k in range(nets)], offsets, pin_names,
+                                   pin_offsets=pin_offsets)
+    return nodes, placements, netlist, pin_names, pin_offsets
+
+
+def brute_force_hpwl(nodes, placements, netlist, pin_names, pin_offsets):
+    # Per-net HPWL from the pin names, one pin at a time
+    ids = {name: k for k, name in enumerate(nodes.names)}
+    result = []
+    for k in range(len(netlist)):
+        xs, ys = [], []
+        for p in range(netlist.offsets[k], netlist.offsets[k + 1]):
+            node = ids.get(pin_names[p])
+            if node is None or not placements.placed[node]:
+                continue
+            xs.append(placements.x[node] + nodes.width[node] / 2 + pin_offsets[0][p])
+            ys.append(placements.y[node] + nodes.height[node] / 2 + pin_offsets[1][p])
+        result.append(max(xs) - min(xs) + max(ys) - min(ys) if len(xs) >= 2 else 0.0)
+    return np.array(result)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_matches_brute_force(seed):
+    design = make_design(seed)
+    nodes, placements, netlist = design[:3]
+    expected = brute_force_hpwl(*design)
+    assert net_hpwl(netlist, placements) == pytest.approx(expected)
+    assert total_hpwl(netlist, placements) == pytest.approx(expected.sum())
+    chosen = np.random.default_rng(seed).permutation(len(netlist))[:20]
+    assert subset_hpwl(netlist, placements, chosen) == pytest.approx(expected[chosen])
+    for k in chosen[:5]:
+        assert single_net_hpwl(netlist, placements, k)[0] == pytest.approx(expected[k])
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_tracker_follows_moves(seed):
+    rng = np.random.default_rng(seed)
+    nodes, placements, netlist, pin_names, pin_offsets = make_design(seed)
+    tracker = WirelengthTracker(netlist, placements)
+    for step in range(30):
+        if step % 3:
+            node = int(rng.integers(0, len(nodes)))
+            tracker.move(node, *rng.uniform(0, 100, 2))
+        else:
+            ids = rng.choice(len(nodes), 8, replace=False)
+            tracker.move_many(ids, rng.uniform(0, 100, 8), rng.uniform(0, 100, 8))
+        expected = brute_force_hpwl(nodes, placements, netlist, pin_names, pin_offsets)
+        assert tracker.hpwl == pytest.approx(expected)
+        assert tracker.total == pytest.approx(expected.sum())
+
+
+def test_move_places_an_unplaced_node():
+    nodes, placements, netlist, pin_names, pin_offsets = make_design(0, unplaced=0.5)
+    tracker = WirelengthTracker(netlist, placements)
+    node = int(np.flatnonzero(~placements.placed)[0])
+    affected = tracker.move(node, 50.0, 50.0)
+    assert placements.placed[node]
+    assert set(affected.tolist()) == set(netlist.nets_of_node(node).tolist())
+    assert tracker.hpwl == pytest.approx(brute_force_hpwl(nodes, placements, netlist, pin_names, pin_offsets))
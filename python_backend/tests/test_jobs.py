@@ -0,0 +1,74 @@
+# python_backend/tests/test_jobs.py
+import threading
+
+import app as backend
+from jobs import JobQueue
+
+
+def blocked(release):
+    # A job body that runs until `release` is set
+    def run(job):
+        job.report(0.5)
+        release.wait(5)
+        return {"done": True}
+    return run
+
+
+def test_same_key_shares_a_job_while_it_runs():
+    queue, release = JobQueue(2), threading.Event()
+    first = queue.submit('work', ('work', 1), blocked(release))
+    assert queue.submit('work', ('work', 1), blocked(release)) is first
+    other = queue.submit('work', ('work', 2), blocked(release))
+    assert other is not first
+    release.set()
+    assert first.wait(5).status == 'done' and first.result == {"done": True} and first.progress == 1.0
+    assert queue.stats()['deduplicated'] == 1
+
+
+def test_finished_jobs_are_reused_only_when_allowed():
+    queue = JobQueue(1)
+    done = queue.submit('work', 'key', lambda job: 1).wait(5)
+    assert queue.submit('work', 'key', lambda job: 2) is done
+    fresh = queue.submit('work', 'key', lambda job: 3, reuse_finished=False).wait(5)
+    assert fresh is not done and fresh.result == 3
+
+
+def test_failed_job_is_retried_and_keyless_jobs_are_never_shared():
+    queue = JobQueue(1)
+
+    def fail(job):
+        raise ValueError("bad input")
+
+    failed = queue.submit('work', 'key', fail).wait(5)
+    assert failed.status == 'failed' and failed.error == "bad input"
+    assert queue.submit('work', 'key', lambda job: 1).wait(5).status == 'done'
+    assert queue.submit('work', None, lambda job: 1) is not queue.submit('work', None, lambda job: 1)
+
+
+def test_workers_bound_the_running_jobs():
+    queue, release = JobQueue(1), threading.Event()
+    first = queue.submit('work', 1, blocked(release))
+    second = queue.submit('work', 2, blocked(release))
+    first.done.wait(0.2)
+    assert second.status == 'queued'
+    release.set()
+    assert second.wait(5).status == 'done'
+
+
+def test_async_legalization_lifecycle(client, upload):
+    design_id = upload().headers['X-Design-Id']
+    request = {'design_id': design_id, 'algorithm': 'abacus', 'async': True, 'renderer': 'raster'}
+    response = client.post('/legalize_placement', json=request)
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+    assert response.headers['Location'].endswith(f'/jobs/{job_id}')
+    assert response.get_json()['kind'] == 'legalize'
+
+    job = backend.jobs.get(job_id).wait(30)
+    status = client.get(f'/jobs/{job_id}').get_json()
+    assert status['status'] == 'done' and status['progress'] == 100.0 and job.error is None
+    assert status['result']['algorithm'] == 'abacus'
+    assert '/render/' in status['result']['image_url']
+    # The same request on the same state is the same job
+    assert client.post('/legalize_placement', json=request).get_json()['job_id'] == job_id
+    assert client.get('/jobs/0123').status_code == 404
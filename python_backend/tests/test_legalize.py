@@ -0,0 +1,110 @@
+# python_backend/tests/test_legalize.py
+import numpy as np
+import pytest
+
+from app import tetris_legalize
+from design import NodeTable, Placement
+from legality import check_legality
+from legalize import Segments, abacus_legalize, free_segments
+from rowindex import RowIndex
+
+LEGALIZERS = {
+    'abacus': lambda nodes, row_index, placements: abacus_legalize(nodes, Segments(row_index), placements),
+    'abacus_sites': lambda nodes, row_index, placements: abacus_legalize(
+        nodes, free_segments(row_index, nodes, placements), placements),
+    'tetris': tetris_legalize,
+}
+
+
+def make_rows(count, numsites, height=1.0, sitewidth=1.0):
+    return RowIndex([
+        {'coordinate': k * height, 'height': height, 'subrow_origin': 0.0,
+         'numsites': numsites, 'sitewidth': sitewidth, 'sitespacing': sitewidth}
+        for k in range(count)
+    ])
+
+
+def make_design(xs, ys, widths, heights=None, terminals=None, placed=None):
+    n = len(xs)
+    nodes = NodeTable([f"c{k}" for k in range(n)], widths, heights if heights is not None else np.ones(n),
+                      terminals if terminals is not None else np.zeros(n, dtype=bool))
+    placements = Placement(nodes, np.array(xs, dtype=float), np.array(ys, dtype=float),
+                           placed if placed is not None else np.ones(n, dtype=bool))
+    return nodes, placements
+
+
+def assert_legal(nodes, placements, row_index, on_sites=True):
+    # Plain abacus keeps continuous x positions, so only the others land on sites
+    issues = check_legality(nodes, placements, row_index)
+    if not on_sites:
+        issues.pop("off_site")
+    assert not any(issues.values()), issues
+
+
+@pytest.mark.parametrize('algorithm', ['abacus', 'abacus_sites'])
+def test_cell_past_the_row_end_joins_the_cluster_before_it(algorithm):
+    row_index = make_rows(1, 10)
+    nodes, placements = make_design([5.0, 9.5], [0.0, 0.0], [4.0, 2.0])
+    legalized, skipped = LEGALIZERS[algorithm](nodes, row_index, placements)
+    assert skipped == []
+    assert legalized.x.tolist() == [4.0, 8.0]
+    assert_legal(nodes, legalized, row_index)
+
+
+@pytest.mark.parametrize('algorithm', sorted(LEGALIZERS))
+@pytest.mark.parametrize('seed', range(20))
+def test_random_designs_come_out_legal(algorithm, seed):
+    rng = np.random.default_rng(seed)
+    row_index = make_rows(8, 40)
+    n = 90
+    widths = rng.integers(1, 5, n).astype(float)
+    # Push some cells to and beyond the right end of the rows
+    xs = np.where(rng.random(n) < 0.2, rng.uniform(34, 45, n), rng.uniform(-5, 40, n))
+    ys = rng.uniform(-1, 9, n)
+    nodes, placements = make_design(xs, ys, widths)
+    legalized, skipped = LEGALIZERS[algorithm](nodes, row_index, placements)
+    assert skipped == []
+    assert legalized.placed.all()
+    assert_legal(nodes, legalized, row_index, on_sites=algorithm != 'abacus')
+
+
+@pytest.mark.parametrize('algorithm', ['abacus', 'abacus_sites'])
+def test_unplaced_cells_stay_unplaced(algorithm):
+    row_index = make_rows(2, 10)
+    nodes, placements = make_design([3.0, 0.0, 6.0], [0.0, 0.0, 1.0], [2.0, 2.0, 2.0],
+                                    placed=np.array([True, False, True]))
+    legalized, skipped = LEGALIZERS[algorithm](nodes, row_index, placements)
+    assert skipped == []
+    assert legalized.placed.tolist() == [True, False, True]
+    assert legalized.x.tolist() == [3.0, 0.0, 6.0]
+
+
+def test_abacus_sites_keeps_clear_of_terminals():
+    row_index = make_rows(2, 20)
+    terminals = np.array([True, False, False, False])
+    nodes, placements = make_design([8.0, 7.5, 9.0, 10.5], [0.0, 0.0, 0.0, 0.0], [4.0, 2.0, 2.0, 2.0],
+                                    terminals=terminals)
+    legalized, skipped = LEGALIZERS['abacus_sites'](nodes, row_index, placements)
+    assert skipped == []
+    assert_legal(nodes, legalized, row_index)
+    cells = np.flatnonzero(~terminals)
+    same_row = legalized.y[cells] == 0.0
+    left, right = legalized.x[cells][same_row], legalized.x[cells][same_row] + 2.0
+    assert ((right <= 8.0) | (left >= 12.0)).all()
+
+
+def test_cells_on_terminals_are_blocked():
+    # Row 0 has a terminal over [8, 12), row 1 one over [3.5, 4.5), which takes
+    # sites 3 and 4 out of the free segments
+    row_index = make_rows(2, 20)
+    xs = [8.0, 3.5, 9.0, 6.5, 4.5, 12.0, 3.0, 5.0, 0.5]
+    ys = [0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 1.0, 1.0]
+    widths = [4.0, 1.0, 2.0, 2.0, 2.0, 2.0, 0.5, 1.0, 1.0]
+    terminals = np.array([True, True] + [False] * 7)
+    nodes, placements = make_design(xs, ys, widths, terminals=terminals)
+    issues = check_legality(nodes, placements, row_index)
+    # On the terminal, across its edge, and on the partly covered site 3;
+    # then one off the sites, next to the terminal and clear of it
+    assert issues == {"overlaps": 0, "misaligned": 0, "off_site": 2, "blocked": 3, "out_of_bounds": 0}
+    segments = free_segments(row_index, nodes, placements)
+    assert check_legality(nodes, placements, row_index, segments=segments) == issues
@@ -0,0 +1,52 @@
+# python_backend/tests/test_names.py
+import numpy as np
+import pytest
+
+from design import NodeTable
+from tests.conftest import bookshelf_files
+
+
+@pytest.mark.parametrize('count', [3, 100])
+def test_lookup_folds_the_case(count):
+    # Short and long lookups take different paths
+    names = [f"Cell{k}" for k in range(count)]
+    nodes = NodeTable(names, np.ones(count), np.ones(count), np.zeros(count, dtype=bool))
+    assert nodes.lookup([name.upper() for name in names]).tolist() == list(range(count))
+    assert nodes.lookup([name.lower() for name in names] + ['cell']).tolist() == list(range(count)) + [-1]
+    assert nodes.names[0] == 'cell0'
+
+
+def test_only_ascii_letters_are_folded():
+    nodes = NodeTable(['é', 'x'], np.ones(2), np.ones(2), np.zeros(2, dtype=bool))
+    assert nodes.lookup(['é', 'É', 'X']).tolist() == [0, -1, 1]
+
+
+def test_names_bind_across_files_of_any_case(client, upload):
+    # .nodes names as Cell0, .pl names as CELL0 and .nets names as cell0
+    files = bookshelf_files()
+    files['pl'] = files['pl'].upper().replace(b'UCLA PL', b'UCLA pl')
+    files['nets'] = files['nets'].replace(b'  Cell', b'  cell').replace(b'  Pad', b'  pad')
+    query = {'design_id': upload(files).headers['X-Design-Id']}
+    names = [f"cell{k}" for k in range(6)] + ['pad']
+    found = client.post('/get_nodes_coordinates', query_string=query, json={'node_ids': names}).get_json()
+    assert found['missing'] == [] and len(found['nodes']) == 7
+    assert client.get('/calculate_wire_length', query_string=query).get_json()['total_length'] == 15.5
+    assert client.get('/report', query_string=query).get_json()['wirelength']['unbound_pins'] == 0
+
+
+def test_query_endpoints_take_any_case(client, upload):
+    query = {'design_id': upload().headers['X-Design-Id']}
+    assert client.get('/get_node_coordinates/CELL2', query_string=query).get_json() == \
+        {"coordinates": {"x": 6.0, "y": 0.0}}
+    found = client.post('/get_nodes_coordinates', query_string=query,
+                        json={'node_ids': ['Cell2', 'cELL2', 'PAD']}).get_json()
+    assert [node['node_id'] for node in found['nodes']] == ['Cell2', 'cELL2', 'PAD']
+    assert found['missing'] == []
+
+    response = client.post('/modify_node_coordinates', query_string=query, json={'node_id': 'cElL1', 'x': 4, 'y': 1})
+    assert response.status_code == 200
+    response = client.post('/batch_modify_node_coordinates', query_string=query,
+                           json={'moves': [['CELL3', 10, 1], ['cell3', 11, 1]]})
+    assert response.get_json()['moved_nodes'] == 1
+    moved = client.post('/get_nodes_coordinates', query_string=query, json={'node_ids': ['cell1', 'cell3']}).get_json()
+    assert [(node['x'], node['y']) for node in moved['nodes']] == [(4.0, 1.0), (11.0, 1.0)]
@@ -0,0 +1,67 @@
+# python_backend/tests/test_netlist.py
+import numpy as np
+import pytest
+
+from netlist import Netlist
+from tests.test_legalize import make_design
+
+
+def make_netlist(net_names):
+    # One two-pin net per name, with ordinal ids n0, n1, ...
+    nodes = make_design(np.zeros(4), np.zeros(4), np.ones(4))[0]
+    count = len(net_names)
+    return Netlist.from_columns(nodes, [f"n{k}" for k in range(count)], np.arange(0, 2 * count + 1, 2),
+                                ['c0', 'c1'] * count, net_names=net_names)
+
+
+@pytest.mark.parametrize('net_id, expected', [
+    ('n0', 0), ('n4', 4), (2, 2), ('2', 2), ('clk', 1), ('reset', 3),
+    ('n5', None), ('n02', None), ('n-1', None), ('N2', None), ('', None), ('missing', None), (-1, None),
+])
+def test_index_of_ordinal_ids_and_names(net_id, expected):
+    assert make_netlist(['a', 'clk', 'b', 'reset', 'c']).index_of(net_id) == expected
+
+
+def test_nets_names_win_over_ordinal_ids():
+    # Net 0 is literally named n3: its name resolves to it, not to the fourth net
+    nets = make_netlist(['n3', 'x', 'y', 'z', 'x'])
+    assert nets.index_of('n3') == 0
+    assert nets.index_of('n0') == 0 and nets.index_of('n1') == 1 and nets.index_of('n4') == 4
+    assert nets.index_of('x') == 1
+
+
+def test_lookup_marks_unknown_ids():
+    nets = make_netlist(['a', 'clk', 'b'])
+    assert nets.lookup(['clk', 'n2', 'nope', 0, 'n3']).tolist() == [1, 2, -1, 0, -1]
+    assert nets.lookup([]).tolist() == []
+
+
+def test_bulk_net_lengths(client, upload):
+    query = {'design_id': upload().headers['X-Design-Id']}
+    response = client.post('/calculate_net_lengths', query_string=query,
+                           json={'net_ids': ['net_cell4', 'n0', 'nope', 2]})
+    # Pins sit 0.5 right of the left cell's centre and 0.5 left of the right one's, 3 apart
+    assert response.get_json() == {
+        "nets": [
+            {"net_id": "n4", "net_name": "net_cell4", "wire_length": 2.0, "placed_pins": 2},
+            {"net_id": "n0", "net_name": "net_cell0", "wire_length": 2.0, "placed_pins": 2},
+            {"net_id": "n2", "net_name": "net_cell2", "wire_length": 2.0, "placed_pins": 2},
+        ],
+        "missing": ["nope"]
+    }
+    response = client.post('/calculate_net_lengths', query_string=query, json={'net_ids': 'n0'})
+    assert response.status_code == 400
+
+
+def test_bulk_node_coordinates(client, upload):
+    query = {'design_id': upload().headers['X-Design-Id']}
+    response = client.post('/get_nodes_coordinates', query_string=query,
+                           json={'node_ids': ['cell2', 'ghost', 'pad', 'cell0']})
+    assert response.get_json() == {
+        "nodes": [
+            {"node_id": "cell2", "x": 6.0, "y": 0.0},
+            {"node_id": "pad", "x": 22.0, "y": 0.0},
+            {"node_id": "cell0", "x": 0.0, "y": 0.0},
+        ],
+        "missing": ["ghost"]
+    }
@@ -0,0 +1,60 @@
+# python_backend/tests/test_overlap.py
+import numpy as np
+import pytest
+
+from overlap import find_overlaps
+
+
+def brute_force_pairs(x_min, y_min, x_max, y_max):
+    # Every overlapping pair (i < j), tested pair by pair
+    n = len(x_min)
+    return {(i, j) for i in range(n) for j in range(i + 1, n)
+            if x_min[i] < x_max[j] and x_min[j] < x_max[i] and y_min[i] < y_max[j] and y_min[j] < y_max[i]}
+
+
+def random_boxes(rng, n, on_rows):
+    # Row-aligned cells of a few heights, or boxes anywhere of any size
+    if on_rows:
+        heights = rng.choice([1.0, 1.0, 1.0, 2.0, 3.0], n)
+        y_min = rng.integers(0, 12, n).astype(float)
+        x_min = rng.integers(0, 40, n).astype(float)
+        widths = rng.integers(1, 6, n).astype(float)
+    else:
+        heights = rng.uniform(0.0, 4.0, n)
+        y_min = rng.uniform(0.0, 12.0, n)
+        x_min = rng.uniform(0.0, 40.0, n)
+        widths = rng.uniform(0.0, 6.0, n)
+    return x_min, y_min, x_min + widths, y_min + heights
+
+
+@pytest.mark.parametrize('on_rows', [True, False])
+@pytest.mark.parametrize('seed', range(10))
+def test_matches_brute_force(seed, on_rows):
+    boxes = random_boxes(np.random.default_rng(seed), 150, on_rows)
+    expected = brute_force_pairs(*boxes)
+    count, pairs = find_overlaps(*boxes, return_pairs=True)
+    found = [tuple(sorted(pair)) for pair in pairs.tolist()]
+    assert count == len(expected) == len(found)
+    assert set(found) == expected
+    assert find_overlaps(*boxes) == count
+
+
+@pytest.mark.parametrize('band_height', [0.5, 1.0, 7.0])
+def test_band_height_does_not_change_the_result(band_height):
+    boxes = random_boxes(np.random.default_rng(42), 150, True)
+    assert find_overlaps(*boxes, band_height=band_height) == len(brute_force_pairs(*boxes))
+
+
+def test_touching_and_identical_boxes():
+    # Shared edges do not overlap; identical boxes do
+    x_min, y_min = [0.0, 2.0, 0.0, 5.0, 5.0], [0.0, 0.0, 1.0, 3.0, 3.0]
+    x_max, y_max = [2.0, 4.0, 2.0, 6.0, 6.0], [1.0, 1.0, 2.0, 4.0, 4.0]
+    count, pairs = find_overlaps(x_min, y_min, x_max, y_max, return_pairs=True)
+    assert count == 1
+    assert sorted(pairs[0].tolist()) == [3, 4]
+
+
+def test_fewer_than_two_boxes():
+    assert find_overlaps([0.0], [0.0], [1.0], [1.0]) == 0
+    count, pairs = find_overlaps([], [], [], [], return_pairs=True)
+    assert count == 0 and pairs.shape == (0, 2)
@@ -0,0 +1,81 @@
+# python_backend/tests/test_placer.py
+import numpy as np
+import pytest
+
+from design import NodeTable, Placement
+from netlist import Netlist
+from hpwl import total_hpwl
+from placer import _bound2bound, _system, global_place
+from report import density_report
+from tests.test_legalize import make_rows
+
+
+def make_netlist(nodes, rng, count):
+    # Random 2- to 4-pin nets over the movable cells
+    degrees = rng.integers(2, 5, count)
+    offsets = np.concatenate([[0], np.cumsum(degrees)])
+    pins = rng.integers(0, len(nodes), offsets[-1])
+    return Netlist.from_columns(nodes, [f"n{k}" for k in range(count)], offsets,
+                                [nodes.names[p] for p in pins])
+
+
+def make_design(seed, n=400):
+    rng = np.random.default_rng(seed)
+    nodes = NodeTable([f"c{k}" for k in range(n)], rng.integers(1, 4, n).astype(float),
+                      np.ones(n), np.zeros(n, dtype=bool))
+    return nodes, make_netlist(nodes, rng, n), Placement(nodes)
+
+
+@pytest.mark.parametrize('target_density', [1.0, 0.8, 0.6])
+def test_reported_overflow_is_that_of_the_result(target_density):
+    nodes, nets, placements = make_design(0)
+    row_index = make_rows(40, 40)
+    result, stats = global_place(nodes, nets, row_index, placements, target_density=target_density)
+    report = density_report(nodes, row_index, result, target_density, cells_per_bin=16)
+    assert stats["overflow"] == pytest.approx(report["overflow"], abs=1e-4)
+    assert stats["overflow_history"][-1] == stats["overflow"]
+
+
+def test_lower_target_density_spreads_cells_further():
+    nodes, nets, placements = make_design(1)
+    row_index = make_rows(40, 40)
+    densities = []
+    for target_density in (1.0, 0.5):
+        result, stats = global_place(nodes, nets, row_index, placements, target_density=target_density)
+        densities.append(density_report(nodes, row_index, result, 1.0)["max_density"])
+        assert stats["overflow"] < 0.1
+    assert densities[1] < densities[0]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_bound2bound_cost_is_the_hpwl_of_the_pins(seed):
+    # At the positions the weights come from, the quadratic cost of each
+    # dimension is twice the span of the pins, offsets included
+    rng = np.random.default_rng(seed)
+    n, count = 50, 60
+    nodes = NodeTable([f"c{k}" for k in range(n)], rng.uniform(1, 4, n), rng.uniform(1, 2, n), np.zeros(n, dtype=bool))
+    degrees = rng.integers(2, 6, count)
+    offsets = np.concatenate([[0], np.cumsum(degrees)])
+    pins = np.concatenate([rng.choice(n, d, replace=False) for d in degrees])
+    pin_offsets = (rng.uniform(-1, 1, len(pins)), rng.uniform(-1, 1, len(pins)))
+    nets = Netlist.from_columns(nodes, [f"n{k}" for k in range(count)], offsets,
+                                [nodes.names[p] for p in pins], pin_offsets=pin_offsets)
+    placements = Placement(nodes, rng.uniform(0, 100, n), rng.uniform(0, 100, n), np.ones(n, dtype=bool))
+    cost = 0.0
+    for pos, pin_offset in ((placements.x, nets.pin_dx), (placements.y, nets.pin_dy)):
+        i, j, di, dj, weight = _bound2bound(nets.pins, nets.offsets, pos, pin_offset, 1e-12)
+        cost += float((weight * (pos[i] + di - pos[j] - dj) ** 2).sum())
+    assert cost == pytest.approx(2 * total_hpwl(nets, placements))
+
+
+def test_cells_are_pulled_until_their_pins_meet():
+    # A cell of width 4 with its pin 1.5 right of its centre, on a net with a
+    # terminal at 10 whose pin is at its centre, 10.5: the cell goes to 7
+    nodes = NodeTable(['c0', 'pad'], [4.0, 1.0], [1.0, 1.0], [False, True])
+    nets = Netlist.from_columns(nodes, ['n0'], np.array([0, 2]), ['c0', 'pad'],
+                                pin_offsets=(np.array([1.5, 0.0]), np.zeros(2)))
+    index = np.array([0, -1])
+    pos = np.array([0.0, 10.0])
+    edges = _bound2bound(nets.pins, nets.offsets, pos, nets.pin_dx, 1e-3)
+    diag, _, rhs = _system(index, pos, edges, np.full(1, 1e-9), np.zeros(1))
+    assert rhs[0] / diag[0] == pytest.approx(7.0)
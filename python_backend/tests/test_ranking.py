@@ -0,0 +1,78 @@
+# python_backend/tests/test_ranking.py
+import numpy as np
+import pytest
+
+from hpwl import NetRanking, top_k
+
+
+def random_hpwl(seed, n=500):
+    # Rounded lengths, so many nets tie
+    return np.random.default_rng(seed).integers(0, 40, n).astype(float)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_top_k_matches_a_stable_sort(seed):
+    hpwl = random_hpwl(seed)
+    expected = np.argsort(-hpwl, kind='stable')
+    for k in (0, 1, 7, 100, 499, 500, 600):
+        assert top_k(hpwl, k).tolist() == expected[:k].tolist()
+
+
+@pytest.mark.parametrize('limit', [1, 3, 64, 1000])
+def test_pages_are_stable_and_contiguous(limit):
+    hpwl = random_hpwl(limit)
+    ranking = NetRanking(hpwl)
+    pages = [ranking.page(offset, limit) for offset in range(0, len(hpwl), limit)]
+    assert all(total == len(hpwl) for total, _ in pages)
+    assert np.concatenate([page for _, page in pages]).tolist() == np.argsort(-hpwl, kind='stable').tolist()
+    # A page read again, after the sorted prefix grew, is the same page
+    assert ranking.page(0, limit)[1].tolist() == pages[0][1].tolist()
+    assert ranking.page(len(hpwl), limit)[1].tolist() == []
+
+
+def test_min_hpwl_cuts_the_ranking():
+    hpwl = np.array([3.0, 10.0, 1.0, 10.0, 5.0])
+    ranking = NetRanking(hpwl)
+    assert ranking.page(0, None, 3.0)[0] == 4
+    assert ranking.page(0, None, 3.0)[1].tolist() == [1, 3, 4, 0]
+    assert ranking.page(1, 2, 5.0)[1].tolist() == [3, 4]
+    assert ranking.page(3, 2, 5.0)[1].tolist() == []
+
+
+def page_through(client, query, limit):
+    nets, offset = [], 0
+    while True:
+        page = client.get('/net_ranking', query_string={**query, 'offset': offset, 'limit': limit}).get_json()
+        nets += page['nets']
+        offset += limit
+        if offset >= page['total']:
+            return nets
+
+
+def test_ranking_pages_follow_moves(client, upload):
+    query = {'design_id': upload().headers['X-Design-Id']}
+    # The cell nets are 2.0 long and rank by index, after the one to the pad
+    assert [net['net_id'] for net in page_through(client, query, 2)] == ['n5', 'n0', 'n1', 'n2', 'n3', 'n4']
+
+    # Moving cell3 far right stretches n2 and n3, which now lead
+    client.post('/modify_node_coordinates', query_string=query, json={'node_id': 'cell3', 'x': 18, 'y': 1})
+    ranked = page_through(client, query, 4)
+    assert [net['net_id'] for net in ranked] == ['n2', 'n3', 'n5', 'n0', 'n1', 'n4']
+    assert [net['hpwl'] for net in ranked[:3]] == pytest.approx([12.0, 8.0, 5.5])
+    assert 'nodes' not in ranked[0]
+
+    # /sorted_nets is the same ranking with nodes, and pages the same way
+    response = client.get('/sorted_nets', query_string=query)
+    assert response.headers['X-Total-Count'] == '6'
+    assert [(net['net_id'], net['hpwl']) for net in response.get_json()] == [(n['net_id'], n['hpwl']) for n in ranked]
+    assert response.get_json()[0]['nodes'] == ['cell2', 'cell3']
+    response = client.get('/sorted_nets', query_string={**query, 'offset': 1, 'limit': 1, 'min_hpwl': 6})
+    assert response.headers['X-Total-Count'] == '2'
+    assert [net['net_id'] for net in response.get_json()] == ['n3']
+
+
+@pytest.mark.parametrize('params', [{'limit': -1}, {'offset': 'x'}, {'min_hpwl': 'big'}])
+def test_bad_pages_are_rejected(client, upload, params):
+    query = {'design_id': upload().headers['X-Design-Id'], **params}
+    assert client.get('/net_ranking', query_string=query).status_code == 400
+    assert client.get('/sorted_nets', query_string=query).status_code == 400
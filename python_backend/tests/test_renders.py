@@ -0,0 +1,55 @@
+# python_backend/tests/test_renders.py
+from renders import RenderCache, render_key
+
+
+def test_image_is_drawn_once_per_key():
+    cache = RenderCache(1 << 20)
+    drawn = []
+
+    def draw():
+        drawn.append(1)
+        return b"png"
+
+    key = render_key('design', 'placement', 0, 'raster')
+    assert cache.render(key, draw) == cache.render(key, draw) == key
+    assert cache.get(key) == b"png" and len(drawn) == 1
+    assert render_key('design', 'placement', 1, 'raster') != key
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_images_are_bounded_and_shared_through_the_directory(tmp_path):
+    cache = RenderCache(8, str(tmp_path))
+    keys = [render_key(k) for k in range(3)]
+    for k, key in enumerate(keys):
+        cache.render(key, lambda: bytes([k]) * 4)
+    assert list(cache.images) == keys[1:]
+    # Another worker process serves the images still in the directory
+    other = RenderCache(1 << 20, str(tmp_path))
+    assert [other.get(key) for key in keys] == [None, bytes([1]) * 4, bytes([2]) * 4]
+    assert other.get('not-a-key') is None
+
+
+def test_render_is_served_with_etag_and_revalidated(client, upload):
+    design_id = upload(renderer='raster').headers['X-Design-Id']
+    query = {'design_id': design_id, 'renderer': 'raster'}
+    first = client.get('/visualize_layout', query_string=query)
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and first.mimetype == 'image/png'
+    assert 'immutable' in first.headers['Cache-Control']
+
+    by_reference = client.get(f'/render/{etag.strip(chr(34))}.png')
+    assert by_reference.status_code == 200 and by_reference.data == first.data
+    revalidated = client.get(f'/render/{etag.strip(chr(34))}.png', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304 and not revalidated.data
+    assert client.get('/visualize_layout', query_string=query, headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_move_names_a_new_image(client, upload):
+    design_id = upload().headers['X-Design-Id']
+    query = {'design_id': design_id, 'renderer': 'raster'}
+    before = client.get('/visualize_layout', query_string=query).headers['ETag']
+    moved = client.post('/modify_node_coordinates', query_string=query,
+                        json={'node_id': 'cell0', 'x': 14, 'y': 1}).get_json()
+    after = client.get('/visualize_layout', query_string=query).headers['ETag']
+    assert after != before and moved['image_url'].endswith(f"/render/{after.strip(chr(34))}.png")
+    assert client.get('/render/0123.png').status_code == 404
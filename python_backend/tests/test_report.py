@@ -0,0 +1,65 @@
+# python_backend/tests/test_report.py
+import numpy as np
+import pytest
+
+import app as backend
+from netlist import Netlist
+from tests.conftest import bookshelf_files
+from tests.test_legalize import make_design
+
+
+def test_report_fields(client, upload):
+    # Five cell nets of 2.0, the one to the pad of 5.5, and a pin on a node
+    # the .nodes file does not have
+    files = bookshelf_files()
+    files['nets'] += b"NetDegree : 2 net_ghost\n  Cell0 I : 0 0\n  Ghost O : 0 0\n"
+    query = {'design_id': upload(files).headers['X-Design-Id'], 'bins': 3}
+    report = client.get('/report', query_string=query).get_json()
+
+    wirelength = report['wirelength']
+    assert wirelength['total_length'] == pytest.approx(15.5)
+    assert wirelength['nets'] == 7 and wirelength['unbound_pins'] == 1
+    assert wirelength['mean_length'] == pytest.approx(15.5 / 7)
+    assert wirelength['largest_net'] == {'net_id': 'n5', 'hpwl': 5.5}
+    assert wirelength['smallest_net'] == {'net_id': 'n6', 'hpwl': 0.0}
+    assert wirelength['histogram']['counts'] == [1, 5, 1]
+    assert wirelength['histogram']['edges'] == pytest.approx(np.linspace(0.0, 5.5, 4).tolist())
+
+    areas = report['node_areas']
+    assert areas['all']['count'] == 7 and areas['all']['total'] == 13.0
+    assert areas['movable'] == {'count': 6, 'total': 12.0, 'mean': 2.0, 'min': 2.0, 'median': 2.0, 'max': 2.0}
+    assert areas['terminal']['count'] == 1 and areas['terminal']['total'] == 1.0
+    assert report['placed_nodes'] == 7
+
+    density = report['density']
+    assert set(density) == {'bins', 'target_density', 'overflow', 'max_density', 'overfull_bins', 'blocked_area'}
+    assert density['target_density'] == 1.0 and density['overflow'] == 0.0
+    assert report['legality'] == {'overlaps': 0, 'misaligned': 0, 'off_site': 0, 'blocked': 0,
+                                   'out_of_bounds': 0}
+
+
+def test_report_follows_the_placement(client, upload):
+    query = {'design_id': upload().headers['X-Design-Id']}
+    before = client.get('/report', query_string=query).get_json()
+    client.post('/modify_node_coordinates', query_string=query, json={'node_id': 'cell1', 'x': 1, 'y': 0})
+    after = client.get('/report', query_string=query).get_json()
+    assert after['legality']['overlaps'] == 1
+    assert after['wirelength']['total_length'] == pytest.approx(
+        client.get('/calculate_wire_length', query_string=query).get_json()['total_length'])
+    # The loaded version still reports as it was
+    assert client.get('/report', query_string={**query, 'version': 1}).get_json() == before
+
+
+def test_report_without_rows():
+    nodes, placements = make_design([0.0, 3.0], [0.0, 0.0], [2.0, 2.0])
+    nets = Netlist.from_columns(nodes, ['n0'], np.array([0, 2]), ['c0', 'c1'])
+    design = backend.designs.add(nodes, placements, nets, [])
+    report = backend.app.test_client().get('/report', query_string={'design_id': design.id}).get_json()
+    assert report['density'] is None and report['legality'] is None
+    assert report['wirelength']['total_length'] == 3.0
+
+
+@pytest.mark.parametrize('params', [{'bins': 0}, {'bins': 1001}, {'target_density': 0}, {'target_density': 'x'}])
+def test_bad_report_options_are_rejected(client, upload, params):
+    query = {'design_id': upload().headers['X-Design-Id'], **params}
+    assert client.get('/report', query_string=query).status_code == 400
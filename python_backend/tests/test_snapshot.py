@@ -0,0 +1,71 @@
+# python_backend/tests/test_snapshot.py
+import io
+
+import numpy as np
+
+import snapshot
+from bookshelf import parse_design
+from snapshot import SnapshotCache, content_key
+from tests.conftest import bookshelf_files
+
+
+def parsed(files):
+    return parse_design({ext: io.BytesIO(text) for ext, text in files.items()})[:4]
+
+
+def test_stored_design_loads_back_equal(tmp_path):
+    files = bookshelf_files()
+    nodes, placements, nets, rows = parsed(files)
+    cache = SnapshotCache(str(tmp_path), 1 << 30)
+    key = content_key(files)
+    assert cache.load(key) is None
+    cache.store(key, nodes, placements, nets, rows)
+
+    loaded_nodes, loaded_placements, loaded_nets, loaded_rows = cache.load(key)
+    assert loaded_nodes.keys.tolist() == nodes.keys.tolist()
+    assert loaded_nodes.id_of('cell3') == nodes.id_of('cell3')
+    for name in ('x', 'y', 'placed'):
+        assert np.array_equal(getattr(loaded_placements, name), getattr(placements, name))
+    for name in ('offsets', 'pins', 'node_offsets', 'node_nets', 'pin_dx', 'pin_dy'):
+        assert np.array_equal(getattr(loaded_nets, name), getattr(nets, name))
+    assert loaded_nets.net_names == nets.net_names
+    assert loaded_rows == rows
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_upload_hits_only_for_unchanged_content(upload):
+    files = bookshelf_files()
+    assert upload(files).headers['X-Snapshot-Cache'] == 'miss'
+    assert upload(files).headers['X-Snapshot-Cache'] == 'hit'
+    moved = dict(files, pl=files['pl'].replace(b"Cell1 3 0", b"Cell1 4 0"))
+    assert upload(moved).headers['X-Snapshot-Cache'] == 'miss'
+    assert upload(moved).headers['X-Snapshot-Cache'] == 'hit'
+
+
+def test_hit_serves_the_parsed_placement(client, upload):
+    files = bookshelf_files()
+    ids = [upload(files).headers['X-Design-Id'] for _ in range(2)]
+    coordinates = [client.get('/get_node_coordinates/cell2', query_string={'design_id': d}).get_json()
+                   for d in ids]
+    assert coordinates[0] == coordinates[1] == {'coordinates': {'x': 6.0, 'y': 0.0}}
+
+
+def test_format_version_is_part_of_the_key(monkeypatch):
+    files = bookshelf_files()
+    key = content_key(files)
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_VERSION', snapshot.SNAPSHOT_VERSION + 1)
+    assert content_key(files) != key
+
+
+def test_oldest_snapshots_are_evicted(tmp_path):
+    cache = SnapshotCache(str(tmp_path), 1 << 30)
+    keys = []
+    for _ in range(3):
+        files = bookshelf_files()
+        keys.append(content_key(files))
+        cache.store(keys[-1], *parsed(files))
+    size = max(size for _, size, _ in cache.entries())
+    cache.max_bytes = 2 * size
+    cache.evict()
+    assert cache.load(keys[0]) is None
+    assert cache.load(keys[2]) is not None
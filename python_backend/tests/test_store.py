@@ -0,0 +1,71 @@
+# python_backend/tests/test_store.py
+import numpy as np
+import pytest
+
+import app as backend
+from netlist import Netlist
+from store import DesignStore
+from tests.test_versions import ROWS, move
+from tests.test_legalize import make_design
+
+
+def add(store, n=200):
+    nodes, placements = make_design(np.arange(n, dtype=float), np.zeros(n), np.ones(n))
+    nets = Netlist.from_columns(nodes, ['n0'], np.array([0, 2]), ['c0', 'c1'])
+    return store.add(nodes, placements, nets, ROWS)
+
+
+def test_least_recently_used_design_is_evicted():
+    store = DesignStore(1 << 30)
+    first, second = add(store), add(store)
+    store.max_bytes = 2 * first.nbytes() + first.nbytes() // 2
+    assert store.get(first.id) is first
+    third = add(store)
+    assert store.get(second.id) is None
+    assert store.get(first.id) is first and store.get(third.id) is third
+    assert store.stats()['evictions'] == 1
+
+
+def test_latest_upload_is_the_default_and_never_evicted():
+    store = DesignStore(1)
+    first = add(store)
+    second = add(store)
+    assert store.get() is second
+    assert store.get(first.id) is None
+
+
+def test_shared_design_survives_eviction_and_sees_moves(tmp_path):
+    # Private memory for one design only; the shared directory keeps them all
+    first_worker = DesignStore(1, str(tmp_path), shared_max_bytes=1 << 30)
+    second_worker = DesignStore(1 << 30, str(tmp_path))
+    design = add(first_worker)
+    add(first_worker)
+    assert first_worker.get(design.id) is not design
+    other = second_worker.get(design.id)
+    move(design, 0, 50.0, 0.0)
+    with other.lock:
+        other.sync()
+        assert other.placements.x[0] == 50.0
+        assert other.wirelength.total == pytest.approx(design.wirelength.total)
+
+
+@pytest.mark.parametrize('path', ['/calculate_wire_length', '/get_node_coordinates/cell0', '/versions'])
+def test_unknown_or_evicted_design_is_not_found(client, upload, monkeypatch, path):
+    response = client.get(path, query_string={'design_id': 'f' * 32})
+    assert response.status_code == 404
+    assert response.get_json() == {"error": f"Design {'f' * 32} not found"}
+
+    design_id = upload().headers['X-Design-Id']
+    assert client.get(path, query_string={'design_id': design_id}).status_code == 200
+    monkeypatch.setattr(backend.designs, 'max_bytes', 0)
+    upload()
+    assert client.get(path, query_string={'design_id': design_id}).status_code == 404
+
+
+def test_designs_are_chosen_by_header_or_json(client, upload):
+    ids = [upload().headers['X-Design-Id'] for _ in range(2)]
+    client.post('/modify_node_coordinates', json={'design_id': ids[0], 'node_id': 'cell0', 'x': 9, 'y': 1})
+    by_header = client.get('/get_node_coordinates/cell0', headers={'X-Design-Id': ids[0]}).get_json()
+    latest = client.get('/get_node_coordinates/cell0').get_json()
+    assert by_header == {'coordinates': {'x': 9.0, 'y': 1.0}}
+    assert latest == {'coordinates': {'x': 0.0, 'y': 0.0}}
@@ -0,0 +1,33 @@
+# python_backend/tests/test_tiles.py
+from tests.test_legalize import make_design, make_rows
+from tiles import TileLayer
+
+
+def tile_of(layer, z, x, y):
+    # Tile (x, y) at zoom z holding layout point (x, y)
+    size = layer.span / (1 << z)
+    return int((x - layer.x_min) // size), (1 << z) - 1 - int((y - layer.y_min) // size)
+
+
+def test_cell_moved_out_of_the_world_is_drawn():
+    row_index = make_rows(4, 20)
+    nodes, placements = make_design([0.0, 5.0], [0.0, 1.0], [2.0, 2.0])
+    layer = TileLayer(nodes, placements, row_index)
+    layer.before_move([1])
+    placements.move(1, 100.0, 100.0)
+    layer.after_move([1])
+    assert layer.x_min + layer.span >= 102.0 and layer.y_min + layer.span >= 101.0
+    assert 1 in layer.grid.query(100.5, 100.5, 101.0, 100.8)
+    assert layer.tile(4, *tile_of(layer, 4, 101.0, 100.5)) is not None
+
+
+def test_move_inside_the_world_keeps_the_bounds():
+    row_index = make_rows(4, 20)
+    nodes, placements = make_design([0.0, 5.0], [0.0, 1.0], [2.0, 2.0])
+    layer = TileLayer(nodes, placements, row_index)
+    bounds = layer.info()
+    layer.before_move([1])
+    placements.move(1, 12.0, 2.0)
+    layer.after_move([1])
+    assert layer.info() == bounds
+    assert 1 in layer.grid.query(12.5, 2.5, 13.0, 2.8)
@@ -0,0 +1,162 @@
+# python_backend/tests/test_versions.py
+import shutil
+
+import numpy as np
+import pytest
+
+from design import Placement
+from netlist import Netlist
+from store import DesignStore
+from versions import MAX_CHAIN, PlacementVersions
+from tests.test_legalize import make_design
+
+ROWS = [{'coordinate': float(k), 'height': 1.0, 'subrow_origin': 0.0,
+         'numsites': 20, 'sitewidth': 1.0, 'sitespacing': 1.0} for k in range(2)]
+
+
+def shared_design(tmp_path):
+    # One design seen by two worker processes, each with its own store
+    nodes, placements = make_design([0.0, 3.0, 6.0, 9.0], [0.0, 0.0, 1.0, 1.0], [2.0, 2.0, 2.0, 2.0])
+    nets = Netlist.from_columns(nodes, ['n0', 'n1'], np.array([0, 2, 4]), ['c0', 'c1', 'c2', 'c3'])
+    first = DesignStore(1 << 30, str(tmp_path)).add(nodes, placements, nets, ROWS)
+    second = DesignStore(1 << 30, str(tmp_path)).get(first.id)
+    return first, second
+
+
+def move(design, node, x, y):
+    with design.lock:
+        design.sync()
+        design.before_move(design.placements, [node])
+        design.wirelength.move(node, x, y)
+        return design.changed(design.placements, [node])
+
+
+def test_versions_resolve_in_every_worker(tmp_path):
+    first, second = shared_design(tmp_path)
+    assert dict(first.history.heads) == dict(second.history.heads) == {'placement': 1}
+
+    moved = move(first, 1, 12.0, 1.0)
+    with second.lock:
+        second.sync()
+        assert moved in second.history
+        assert second.head(second.placements) == moved
+        assert second.history.placement(moved).x.tolist() == [0.0, 12.0, 6.0, 9.0]
+        assert second.history.placement(1).x.tolist() == [0.0, 3.0, 6.0, 9.0]
+
+    # Ids keep counting across workers, and the second worker's versions reach the first
+    legalized = second.placements.copy()
+    legalized.x[0] = 1.0
+    with second.lock:
+        saved = second.history.commit(legalized, moved, 'legalized')
+    moved_again = move(first, 2, 15.0, 0.0)
+    assert moved < saved < moved_again
+    with first.lock:
+        assert first.history.placement(saved).x.tolist() == [1.0, 12.0, 6.0, 9.0]
+        assert first.history.get(saved).parent == moved
+    listed = [[(v['version_id'], v['parent'], v['head_of']) for v in d.history.list()] for d in (first, second)]
+    assert listed[0] == listed[1] == [(1, None, None), (moved, 1, None), (saved, moved, None),
+                                      (moved_again, moved, 'placement')]
+
+
+def test_unknown_versions_are_not_found(client, upload):
+    design_id = upload().headers['X-Design-Id']
+    for path in ('/calculate_wire_length', '/visualize_layout'):
+        response = client.get(path, query_string={'design_id': design_id, 'version': 999})
+        assert response.status_code == 404
+        assert response.get_json() == {"error": "Version 999 not found"}
+    response = client.get('/diff', query_string={'design_id': design_id, 'from': 1, 'to': 999})
+    assert response.status_code == 404
+
+
+def test_versions_outlive_an_evicted_shared_directory(tmp_path):
+    first, _ = shared_design(tmp_path)
+    shutil.rmtree(first.path)
+    moved = move(first, 1, 12.0, 1.0)
+    with first.lock:
+        assert first.history.placement(moved).x.tolist() == [0.0, 12.0, 6.0, 9.0]
+
+
+def placement_of(nodes, rng):
+    return Placement(nodes, rng.uniform(0, 100, len(nodes)), rng.uniform(0, 100, len(nodes)), rng.random(len(nodes)) > 0.1)
+
+
+@pytest.mark.parametrize('max_versions', [8, 40, 1000])
+def test_versions_match_full_copies_after_folding(max_versions):
+    # Long chains of small edits on two branches, with every version checked
+    # against a full copy after the oldest ones were dropped and folded
+    rng = np.random.default_rng(max_versions)
+    nodes = make_design(np.zeros(400), np.zeros(400), np.ones(400))[0]
+    history = PlacementVersions(nodes, max_versions)
+    current = placement_of(nodes, rng)
+    copies = {history.commit_head('placement', current, 'loaded'): current.copy()}
+    for step in range(3 * MAX_CHAIN):
+        if step % 50 == 49:
+            # A whole new placement, or a branch off an old version
+            parent = rng.choice(list(history.versions))
+            branch = history.placement(parent).copy()
+            branch.x[:5] += 1.0
+            copies[history.commit(branch, parent, 'branch')] = branch
+            current = placement_of(nodes, rng)
+            node_ids = None
+        else:
+            # Few distinct nodes, so folded deltas overlap
+            node_ids = rng.choice(20, 3, replace=False)
+            current.move(node_ids, rng.uniform(0, 100, 3), rng.uniform(0, 100, 3))
+        copies[history.commit_head('placement', current, 'edit', node_ids)] = current.copy()
+
+    assert len(history.versions) <= max_versions
+    assert any(not version.full for version in history.versions.values())
+    for version_id, version in history.versions.items():
+        assert version.depth <= MAX_CHAIN
+        rebuilt, expected = history.placement(version_id), copies[version_id]
+        assert np.array_equal(rebuilt.x, expected.x) and np.array_equal(rebuilt.y, expected.y)
+        assert np.array_equal(rebuilt.placed, expected.placed)
+    assert history.heads['placement'] == max(copies)
+
+
+def test_deltas_fold_into_their_children():
+    # A chain of deltas hanging off a head that is never dropped: the oldest
+    # delta is merged into its child, the child's values winning
+    rng = np.random.default_rng(1)
+    nodes = make_design(np.zeros(100), np.zeros(100), np.ones(100))[0]
+    history = PlacementVersions(nodes, max_versions=4)
+    current = placement_of(nodes, rng)
+    parent = history.commit_head('pinned', current)
+    copies = {}
+    for _ in range(40):
+        node_ids = rng.choice(5, 2, replace=False)
+        current.move(node_ids, rng.uniform(0, 100, 2), rng.uniform(0, 100, 2))
+        parent = history.commit(current, parent, 'edit', node_ids)
+        copies[parent] = current.copy()
+    assert [v.full for v in history.versions.values()] == [True, False, False, False]
+    for version_id in list(history.versions)[1:]:
+        rebuilt, expected = history.placement(version_id), copies[version_id]
+        assert np.array_equal(rebuilt.x, expected.x) and np.array_equal(rebuilt.y, expected.y)
+        assert np.array_equal(rebuilt.placed, expected.placed)
+
+
+def test_saved_versions_are_read_only():
+    nodes = make_design(np.zeros(10), np.zeros(10), np.ones(10))[0]
+    history = PlacementVersions(nodes)
+    placement = placement_of(nodes, np.random.default_rng(0))
+    version_id = history.commit(placement)
+    placement.x[0] = -1.0
+    with pytest.raises(ValueError):
+        history.placement(version_id).x[0] = -1.0
+    assert history.placement(version_id).x[0] != -1.0
+
+
+def test_diff_between_versions(client, upload):
+    design_id = upload().headers['X-Design-Id']
+    query = {'design_id': design_id}
+    moved = client.post('/modify_node_coordinates', query_string=query,
+                        json={'node_id': 'cell0', 'x': 2, 'y': 0}).get_json()['version_id']
+    diff = client.get('/diff', query_string={**query, 'from': 1, 'to': 'placement'}).get_json()
+    assert diff['to'] == moved
+    assert diff['summary']['changed_cells'] == diff['summary']['moved_cells'] == 1
+    assert diff['summary']['total_displacement'] == 2.0
+    assert diff['cells'] == [{'node_id': 'cell0', 'from': {'x': 0.0, 'y': 0.0}, 'to': {'x': 2.0, 'y': 0.0},
+                              'displacement': 2.0}]
+    # Pins sit 0.5 right of cell0's centre and 0.5 left of cell1's: they now meet
+    assert diff['summary']['hpwl_delta'] == pytest.approx(-2.0)
+    assert [net['net_id'] for net in diff['nets']] == ['n0']
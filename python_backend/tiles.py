@@ -0,0 +1,203 @@
+# python_backend/tiles.py
+#
+# Zoomable layout tiles. The die is a square world split into 2^z x 2^z tiles
+# of TILE_SIZE pixels at zoom z, with tile (0, 0) in the top-left corner.
+#
+# CellGrid is a uniform bucket grid over the placement. Each cell is stored in
+# the bucket holding its lower-left corner, so a query scans the buckets of
+# the tile grown by the largest cell size and never sees a cell twice; the
+# few cells larger than a bucket are kept in a side list. Moved nodes go to a
+# small overlay that is searched directly until the grid is rebuilt.
+#
+# TileLayer keeps rendered tiles in an LRU cache and, when nodes move,
+# drops only the cached tiles under their old and new boxes. A node moved out
+# of the world grows it to the new extents, which starts the pyramid over.
+from collections import OrderedDict
+
+import numpy as np
+
+from raster import Canvas, cell_boxes, paint
+
+TILE_SIZE = 256
+MAX_ZOOM = 20
+
+
+class CellGrid:
+    def __init__(self, nodes, placements, bounds, cells_per_bucket=8):
+        self.nodes = nodes
+        self.placements = placements
+        self.x_min, self.y_min, span = bounds
+        self.ids = placements.placed_ids
+        n = max(len(self.ids), 1)
+        self.size = int(np.clip(np.sqrt(n / cells_per_bucket), 1, 1024))
+        self.bucket = span / self.size
+
+        x, y, width, height, _ = cell_boxes(nodes, placements, self.ids)
+        large = (width > self.bucket) | (height > self.bucket)
+        self.large = self.ids[large]
+        small = self.ids[~large]
+        bx, by = self._bucket_of(x[~large], y[~large])
+        keys = by * self.size + bx
+        order = np.argsort(keys, kind='stable')
+        self.members = small[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(keys, minlength=self.size * self.size))])
+        self.max_width = float(width[~large].max()) if len(small) else 0.0
+        self.max_height = float(height[~large].max()) if len(small) else 0.0
+
+        self.moved = np.zeros(len(nodes), dtype=bool)
+        self.overlay = []
+
+    def _bucket_of(self, x, y):
+        bx = np.clip(((x - self.x_min) / self.bucket).astype(np.int64), 0, self.size - 1)
+        by = np.clip(((y - self.y_min) / self.bucket).astype(np.int64), 0, self.size - 1)
+        return bx, by
+
+    def mark_moved(self, node_ids):
+        fresh = np.asarray(node_ids, dtype=np.int64)
+        fresh = fresh[~self.moved[fresh]]
+        self.moved[fresh] = True
+        self.overlay.extend(fresh.tolist())
+
+    @property
+    def stale(self):
+        return len(self.overlay) > max(1024, len(self.ids) // 64)
+
+    def query(self, x0, y0, x1, y1):
+        # Ids of placed nodes whose drawn box intersects [x0, x1] x [y0, y1]
+        (bx0, by0), (bx1, by1) = (
+            self._bucket_of(np.array([x0 - self.max_width]), np.array([y0 - self.max_height])),
+            self._bucket_of(np.array([x1]), np.array([y1])))
+        bx0, by0, bx1, by1 = int(bx0[0]), int(by0[0]), int(bx1[0]), int(by1[0])
+        # One contiguous CSR slice per bucket row
+        grid_rows = np.arange(by0, by1 + 1)
+        starts = self.offsets[grid_rows * self.size + bx0]
+        ends = self.offsets[grid_rows * self.size + bx1 + 1]
+        lengths = ends - starts
+        total = int(lengths.sum())
+        within = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        candidates = self.members[np.repeat(starts, lengths) + within]
+        candidates = candidates[~self.moved[candidates]]
+
+        extra = [self.large]
+        if self.overlay:
+            overlay = np.array(self.overlay, dtype=np.int64)
+            extra.append(overlay[self.placements.placed[overlay]])
+        candidates = np.concatenate([candidates] + extra)
+
+        x, y, width, height, _ = cell_boxes(self.nodes, self.placements, candidates)
+        hit = (x <= x1) & (x + width >= x0) & (y <= y1) & (y + height >= y0)
+        return candidates[hit]
+
+
+class TileLayer:
+    # Tiles of one placement of a design
+    def __init__(self, nodes, placements, row_index, max_tiles=2048):
+        self.nodes = nodes
+        self.placements = placements
+        self.row_index = row_index
+        self.max_tiles = max_tiles
+        self.tiles = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.x_min, self.y_min, self.span = self._world()
+        self.grid = CellGrid(nodes, placements, (self.x_min, self.y_min, self.span))
+
+    def _world(self):
+        # (x_min, y_min, span) of a square holding the rows and every placed cell
+        nodes, placements, row_index = self.nodes, self.placements, self.row_index
+        x, y, width, height, _ = cell_boxes(nodes, placements, placements.placed_ids)
+        lo_x = [x.min()] if len(x) else []
+        lo_y = [y.min()] if len(y) else []
+        hi_x = [(x + width).max()] if len(x) else []
+        hi_y = [(y + height).max()] if len(y) else []
+        if len(row_index):
+            lo_x.append(row_index.x0.min())
+            lo_y.append(row_index.y0.min())
+            hi_x.append(row_index.max_x)
+            hi_y.append(row_index.max_y)
+        x_min, y_min = (min(lo_x), min(lo_y)) if lo_x else (0.0, 0.0)
+        span = max(max(hi_x) - x_min, max(hi_y) - y_min, 1.0) if hi_x else 1.0
+        # A small margin like the full view, and a square world
+        return float(x_min) - 10, float(y_min) - 10, float(span) + 20
+
+    def info(self):
+        return {
+            "tile_size": TILE_SIZE,
+            "max_zoom": MAX_ZOOM,
+            "x_min": self.x_min,
+            "y_min": self.y_min,
+            "span": self.span
+        }
+
+    def tile_bounds(self, z, x, y):
+        # Layout rectangle of tile (z, x, y); also works on arrays of tiles
+        count = np.left_shift(1, z)
+        size = self.span / count
+        x0 = self.x_min + x * size
+        y0 = self.y_min + (count - 1 - y) * size
+        return x0, y0, x0 + size, y0 + size
+
+    def tile(self, z, x, y):
+        # PNG bytes of one tile, or None outside the pyramid
+        if not (0 <= z <= MAX_ZOOM and 0 <= x < (1 << z) and 0 <= y < (1 << z)):
+            return None
+        key = (z, x, y)
+        png = self.tiles.get(key)
+        if png is not None:
+            self.tiles.move_to_end(key)
+            self.hits += 1
+            return png
+        self.misses += 1
+
+        x0, y0, x1, y1 = self.tile_bounds(z, x, y)
+        rows = np.flatnonzero((self.row_index.x0 <= x1) & (self.row_index.x1 >= x0) &
+                              (self.row_index.y0 <= y1) & (self.row_index.y1 >= y0))
+        ids = self.grid.query(x0, y0, x1, y1)
+        canvas = Canvas(x0, y0, TILE_SIZE / (x1 - x0), TILE_SIZE, TILE_SIZE)
+        png = paint(canvas, self.row_index, rows, cell_boxes(self.nodes, self.placements, ids))
+
+        self.tiles[key] = png
+        while len(self.tiles) > self.max_tiles:
+            self.tiles.popitem(last=False)
+        return png
+
+    def before_move(self, node_ids):
+        # Call with the old positions still in place; after_move() finishes the job
+        self._invalidate(node_ids)
+
+    def after_move(self, node_ids):
+        self._invalidate(node_ids)
+        x, y, width, height, _ = cell_boxes(self.nodes, self.placements, np.asarray(node_ids, dtype=np.int64))
+        x_max, y_max = self.x_min + self.span, self.y_min + self.span
+        if ((x < self.x_min) | (x + width > x_max) | (y < self.y_min) | (y + height > y_max)).any():
+            self.reset()
+            return
+        self.grid.mark_moved(node_ids)
+        if self.grid.stale:
+            self.grid = CellGrid(self.nodes, self.placements, (self.x_min, self.y_min, self.span))
+
+    def reset(self):
+        # Bounds, grid and tiles of the current placement
+        self.tiles.clear()
+        self.x_min, self.y_min, self.span = self._world()
+        self.grid = CellGrid(self.nodes, self.placements, (self.x_min, self.y_min, self.span))
+
+    def _invalidate(self, node_ids):
+        if not self.tiles:
+            return
+        if len(self.tiles) * len(node_ids) > (1 << 24):
+            # A batch this large touches most cached tiles anyway
+            self.tiles.clear()
+            return
+        x, y, width, height, _ = cell_boxes(self.nodes, self.placements, np.asarray(node_ids, dtype=np.int64))
+        keys = list(self.tiles)
+        z, tx, ty = np.array(keys, dtype=np.int64).T
+        x0, y0, x1, y1 = self.tile_bounds(z, tx, ty)
+        # (tiles, nodes) intersection test
+        touched = ((x <= x1[:, None]) & (x + width >= x0[:, None]) &
+                   (y <= y1[:, None]) & (y + height >= y0[:, None])).any(axis=1)
+        for k in np.flatnonzero(touched):
+            del self.tiles[keys[k]]
+
+    def stats(self):
+        return {"tiles": len(self.tiles), "hits": self.hits, "misses": self.misses}
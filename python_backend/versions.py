@@ -0,0 +1,324 @@
+# python_backend/versions.py
+#
+# Version history of a design's placements. Every edit, random or global
+# placement and legalization result becomes a version with an integer id.
+# A version is either full (x, y and placed for every node) or a sparse delta
+# over its parent: the ids of the nodes that differ and their new values. A
+# delta chain is cut by a full version once it grows past MAX_CHAIN links or a
+# delta would hold more than a quarter of the nodes, so a version is rebuilt
+# from at most MAX_CHAIN deltas.
+#
+# Arrays are copy-on-write: full versions and materialized placements are
+# read-only and shared by everyone who reads them; only rebuilding a version
+# from its deltas copies. The oldest versions that are no branch head are
+# dropped past max_versions, their delta folded into their children.
+#
+# With a directory (a design in the shared store) every version is also
+# written there as v<id>.npz, ids come from a counter and the branch heads
+# from an array mapped by every worker process, so an id made by one worker
+# resolves in all of them. Callers hold the design lock, which locks the
+# directory across processes. max_versions then bounds what each process
+# keeps in memory; the files stay until the design leaves the shared store.
+import itertools
+import json
+import os
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+import numpy as np
+
+from design import Placement
+from hpwl import subset_hpwl
+
+MAX_CHAIN = 64
+
+
+def _frozen(a):
+    a = np.asarray(a)
+    a.setflags(write=False)
+    return a
+
+
+class Version:
+    __slots__ = ('id', 'parent', 'label', 'created', 'depth', 'ids', 'x', 'y', 'placed', 'changed')
+
+    def __init__(self, version_id, parent, label, depth, ids, x, y, placed, changed):
+        self.id = version_id
+        self.parent = parent
+        self.label = label
+        self.created = time.time()
+        self.depth = depth
+        # ids is None for a full version
+        self.ids = ids
+        self.x = x
+        self.y = y
+        self.placed = placed
+        # Nodes that differ from the parent (all nodes for a root)
+        self.changed = changed
+
+    @property
+    def full(self):
+        return self.ids is None
+
+    def nbytes(self):
+        arrays = (self.ids, self.x, self.y, self.placed)
+        return sum(a.nbytes for a in arrays if a is not None)
+
+    def to_dict(self):
+        return {
+            "version_id": self.id,
+            "parent": self.parent,
+            "label": self.label,
+            "created": self.created,
+            "changed_cells": self.changed,
+            "stored": "full" if self.full else "delta",
+        }
+
+
+class SharedHeads(MutableMapping):
+    # Head version id per placement name, one slot each of a shared int64
+    # array; 0 means no head
+    def __init__(self, names, slots):
+        self.names = names
+        self.slots = slots
+
+    def __getitem__(self, name):
+        version_id = int(self.slots[self.names.index(name)]) if name in self.names else 0
+        if not version_id:
+            raise KeyError(name)
+        return version_id
+
+    def __setitem__(self, name, version_id):
+        self.slots[self.names.index(name)] = version_id
+
+    def __delitem__(self, name):
+        self[name]
+        self.slots[self.names.index(name)] = 0
+
+    def __iter__(self):
+        return (name for name, version_id in zip(self.names, self.slots) if version_id)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.slots))
+
+
+class PlacementVersions:
+    def __init__(self, nodes, max_versions=1024, cache_size=4, directory=None, heads=None, last_id=None):
+        # directory, heads (a SharedHeads) and last_id (a shared one-element
+        # int64 array) are given together for a design in the shared store
+        self.nodes = nodes
+        self.max_versions = max_versions
+        self.cache_size = cache_size
+        self.versions = OrderedDict()
+        # Latest version of each named placement
+        self.heads = heads if heads is not None else {}
+        self.directory = directory
+        self._last_id = last_id
+        self._ids = itertools.count(1)
+        self._cache = OrderedDict()
+
+    def __contains__(self, version_id):
+        return version_id in self.versions or (
+            self.directory is not None and os.path.exists(self._path(version_id)))
+
+    def get(self, version_id):
+        if version_id not in self:
+            return None
+        return self._version(version_id)
+
+    def _path(self, version_id):
+        return os.path.join(self.directory, f"v{int(version_id)}.npz")
+
+    def _next_id(self):
+        if self._last_id is None:
+            return next(self._ids)
+        self._last_id[0] += 1
+        return int(self._last_id[0])
+
+    def _version(self, version_id):
+        # A version from memory, or read back from the directory
+        version = self.versions.get(version_id)
+        if version is None and self.directory is not None:
+            version = self.versions[version_id] = self._load(version_id)
+        if version is None:
+            raise KeyError(version_id)
+        return version
+
+    def _save(self, version):
+        meta = {"parent": version.parent, "label": version.label, "created": version.created,
+                "depth": version.depth, "changed": version.changed}
+        arrays = {"x": version.x, "y": version.y, "placed": version.placed}
+        if not version.full:
+            arrays["ids"] = version.ids
+        path = self._path(version.id)
+        tmp = f"{path}.tmp{os.getpid()}"
+        try:
+            with open(tmp, 'wb') as f:
+                np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+            os.replace(tmp, path)
+        except OSError as e:
+            # The shared store evicted the design; this process still has the version
+            print(f"Version {version.id} not saved: {e}")
+
+    def _meta(self, version_id):
+        with np.load(self._path(version_id)) as data:
+            return json.loads(str(data["meta"]))
+
+    def _load(self, version_id):
+        with np.load(self._path(version_id)) as data:
+            meta = json.loads(str(data["meta"]))
+            ids = _frozen(data["ids"]) if "ids" in data else None
+            version = Version(version_id, meta["parent"], meta["label"], meta["depth"], ids,
+                              _frozen(data["x"]), _frozen(data["y"]), _frozen(data["placed"]), meta["changed"])
+        version.created = meta["created"]
+        return version
+
+    def commit(self, placement, parent=None, label='', node_ids=None, owned=False):
+        # Records `placement` as a child of version `parent` and returns its id.
+        # node_ids, when given, are the only nodes that may differ from the
+        # parent. owned=True adopts the placement's arrays instead of copying.
+        n = len(self.nodes)
+        base = self.get(parent) if parent is not None else None
+        if base is None:
+            ids = None
+        elif node_ids is not None:
+            ids = np.unique(np.asarray(node_ids, dtype=np.int64))
+        else:
+            before = self.placement(parent)
+            ids = np.flatnonzero((before.x != placement.x) | (before.y != placement.y) |
+                                 (before.placed != placement.placed))
+
+        if ids is None or base.depth >= MAX_CHAIN or len(ids) > n // 4:
+            copy = (lambda a: a) if owned else np.array
+            version = Version(self._next_id(), parent if base is not None else None, label, 0, None,
+                              _frozen(copy(placement.x)), _frozen(copy(placement.y)),
+                              _frozen(copy(placement.placed)), n if ids is None else len(ids))
+        else:
+            version = Version(self._next_id(), parent, label, base.depth + 1, _frozen(ids),
+                              _frozen(placement.x[ids]), _frozen(placement.y[ids]),
+                              _frozen(placement.placed[ids]), len(ids))
+        if self.directory is not None:
+            self._save(version)
+        self.versions[version.id] = version
+        self._trim()
+        return version.id
+
+    def commit_head(self, name, placement, label='', node_ids=None):
+        # New version of the named placement on top of its current head
+        self.heads[name] = self.commit(placement, self.heads.get(name), label, node_ids)
+        return self.heads[name]
+
+    def placement(self, version_id):
+        # Read-only Placement of a version
+        cached = self._cache.get(version_id)
+        if cached is not None:
+            self._cache.move_to_end(version_id)
+            return cached
+
+        # Walk up to a cached or full version, then apply the deltas back down
+        path = []
+        version = self._version(version_id)
+        while not version.full and version.id not in self._cache:
+            path.append(version)
+            version = self._version(version.parent)
+        if not path:
+            if version.id in self._cache:
+                return self._cache[version.id]
+            return self._remember(version.id, Placement(self.nodes, version.x, version.y, version.placed))
+
+        start = self._cache.get(version.id)
+        if start is None:
+            start = Placement(self.nodes, version.x, version.y, version.placed)
+        x, y, placed = start.x.copy(), start.y.copy(), start.placed.copy()
+        for delta in reversed(path):
+            x[delta.ids] = delta.x
+            y[delta.ids] = delta.y
+            placed[delta.ids] = delta.placed
+        return self._remember(version_id, Placement(self.nodes, _frozen(x), _frozen(y), _frozen(placed)))
+
+    def version_of(self, placement):
+        # Id of a placement returned by placement(), while it is still cached
+        for version_id, cached in self._cache.items():
+            if cached is placement:
+                return version_id
+        return None
+
+    def _remember(self, version_id, placement):
+        self._cache[version_id] = placement
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return placement
+
+    def _trim(self):
+        # Drop the oldest versions that are no head, folding each into its children
+        heads = set(self.heads.values())
+        for version_id in list(self.versions):
+            if len(self.versions) <= self.max_versions:
+                break
+            if version_id not in heads:
+                self._drop(version_id)
+
+    def _drop(self, version_id):
+        version = self.versions.pop(version_id)
+        self._cache.pop(version_id, None)
+        for child in self.versions.values():
+            if child.parent != version_id:
+                continue
+            child.parent = version.parent
+            if child.full:
+                continue
+            if version.full:
+                # The child becomes full: the dropped version with the child's delta on top
+                x, y, placed = version.x.copy(), version.y.copy(), version.placed.copy()
+                x[child.ids], y[child.ids], placed[child.ids] = child.x, child.y, child.placed
+                child.ids, child.x, child.y, child.placed = None, _frozen(x), _frozen(y), _frozen(placed)
+                child.depth = 0
+                continue
+            # Union of both deltas, the child's values winning
+            ids = np.concatenate([child.ids, version.ids])
+            ids, first = np.unique(ids, return_index=True)
+            child.ids = _frozen(ids)
+            child.x = _frozen(np.concatenate([child.x, version.x])[first])
+            child.y = _frozen(np.concatenate([child.y, version.y])[first])
+            child.placed = _frozen(np.concatenate([child.placed, version.placed])[first])
+            child.depth -= 1
+            child.changed = len(ids)
+
+    def list(self):
+        heads = {v: name for name, v in self.heads.items()}
+        if self.directory is None:
+            return [{**v.to_dict(), "head_of": heads.get(v.id)} for v in self.versions.values()]
+        # Every worker's versions, as saved
+        ids = sorted(int(name[1:-4]) for name in os.listdir(self.directory)
+                     if name.startswith('v') and name.endswith('.npz') and name[1:-4].isdigit())
+        listed = []
+        for version_id in ids:
+            meta = self._meta(version_id)
+            listed.append({
+                "version_id": version_id,
+                "parent": meta["parent"],
+                "label": meta["label"],
+                "created": meta["created"],
+                "changed_cells": meta["changed"],
+                "stored": "delta" if meta["depth"] else "full",
+                "head_of": heads.get(version_id),
+            })
+        return listed
+
+    def nbytes(self):
+        cached = sum(p.nbytes() for vid, p in self._cache.items()
+                     if vid not in self.versions or not self.versions[vid].full)
+        return cached + sum(v.nbytes() for v in self.versions.values())
+
+
+def placement_diff(nets, before, after):
+    # Nodes whose position or placed flag differ, their Manhattan displacement
+    # (NaN unless placed in both), and the nets touching them with their HPWL
+    # before and after
+    changed = np.flatnonzero((before.x != after.x) | (before.y != after.y) | (before.placed != after.placed))
+    both = before.placed[changed] & after.placed[changed]
+    distance = np.abs(after.x[changed] - before.x[changed]) + np.abs(after.y[changed] - before.y[changed])
+    distance = np.where(both, distance, np.nan)
+    affected = nets.nets_of_nodes(changed) if len(changed) else np.empty(0, dtype=np.int64)
+    return changed, distance, affected, subset_hpwl(nets, before, affected), subset_hpwl(nets, after, affected)